@@ -1,21 +1,189 @@
-from typing import Callable, List, Any
+"""
+Runtime mínimo de agentes: ferramentas registradas com @function_tool, despacho por nome e
+execução assíncrona.
 
-def function_tool(func: Callable) -> Callable:
-    """Decorador para marcar funções como ferramentas de agente."""
-    func.is_tool = True
-    return func
+Todas as chamadas rodam em um event loop compartilhado pelo processo (em uma thread própria),
+então os agentes dividem o mesmo loop e os clientes assíncronos criados para ele (ex.: um único
+AsyncOpenAI com pool de conexões). Ferramentas async def rodam no loop; as síncronas, em threads.
+
+Em código async use await agente.run_async(...) e agente.chamar(...); código síncrono continua
+usando agente.run(...), run_many(...) e run_as_completed(...), que aguardam o loop.
+"""
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Any, Dict, Iterator, Tuple
+
+from telemetria import ativar, span, span_atual
+
+# Threads para ferramentas síncronas (o executor padrão do asyncio é pequeno demais para I/O)
+MAX_THREADS_FERRAMENTAS = 64
+
+def function_tool(func: Callable = None, *, name: str = None, cache: Any = None, cache_context: Any = None) -> Callable:
+    """Decorador para marcar funções (síncronas ou async def) como ferramentas de agente.
+
+    Uso: @function_tool ou @function_tool(name=..., cache=..., cache_context=...). A ferramenta é
+    despachada pelo nome (padrão: o nome da função). Com cache (um objeto com memoizar(func,
+    contexto), ex.: cache_llm.CacheLLM), a saída da ferramenta é reaproveitada para argumentos
+    iguais; cache_context identifica modelo/prompt que também alteram a saída.
+    """
+    def decorar(f: Callable) -> Callable:
+        if cache is not None:
+            f = cache.memoizar(f, contexto=cache_context)
+        f.is_tool = True
+        f.tool_name = name or f.__name__
+        return f
+    if func is None:
+        return decorar
+    return decorar(func)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def loop_compartilhado() -> asyncio.AbstractEventLoop:
+    """
+    Event loop dos agentes, iniciado em uma thread daemon no primeiro uso.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(max_workers=MAX_THREADS_FERRAMENTAS, thread_name_prefix="agente"))
+                threading.Thread(target=loop.run_forever, daemon=True, name="agentes-loop").start()
+                _loop = loop
+    return _loop
+
+def agendar(coro) -> concurrent.futures.Future:
+    """
+    Agenda a corrotina no loop compartilhado a partir de qualquer thread. O span atual de quem
+    agenda continua sendo o pai dos spans criados na corrotina.
+    """
+    pai = span_atual()
+    async def no_contexto():
+        if pai is None:
+            return await coro
+        with ativar(pai):
+            return await coro
+    return asyncio.run_coroutine_threadsafe(no_contexto(), loop_compartilhado())
+
+def executar_sincrono(coro) -> Any:
+    """
+    Executa a corrotina no loop compartilhado e bloqueia até o resultado.
+    """
+    try:
+        rodando = asyncio.get_running_loop()
+    except RuntimeError:
+        rodando = None
+    if rodando is not None and rodando is _loop:
+        coro.close()
+        raise RuntimeError("Chamada síncrona dentro do loop dos agentes: use await agente.run_async(...)")
+    return agendar(coro).result()
 
 class Agent:
-    def __init__(self, name: str, instructions: str, model: str, tools: List[Callable]):
+    def __init__(self, name: str, instructions: str, model: str, tools: List[Callable], max_concurrency: int = 8, timeout: float = None):
         self.name = name
         self.instructions = instructions
         self.model = model
         self.tools = tools
+        # Limite de chamadas simultâneas deste agente (somando todos os chamadores) e tempo máximo por chamada
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._por_nome = {getattr(tool, "tool_name", tool.__name__): tool for tool in tools}
+        self._semaforos = {}
 
-    def run(self, **kwargs) -> Any:
-        # Busca a função correta pelo nome do primeiro argumento
+    def _semaforo(self) -> asyncio.Semaphore:
+        # Um semáforo por event loop (só é acessado de dentro do próprio loop)
+        loop = asyncio.get_running_loop()
+        semaforo = self._semaforos.get(loop)
+        if semaforo is None:
+            semaforo = self._semaforos[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaforo
+
+    def resolver_ferramenta(self, tool_name: str = None, kwargs: Dict[str, Any] = None) -> Callable:
+        """
+        Ferramenta pelo nome; sem nome, a única ferramenta ou a primeira cujos parâmetros
+        aceitam os argumentos recebidos.
+        """
         if not self.tools:
             raise Exception("Nenhuma ferramenta registrada para este agente.")
-        # Usa a primeira ferramenta (função) da lista
-        tool = self.tools[0]
-        return tool(**kwargs) 
\ No newline at end of file
+        if tool_name is not None:
+            if tool_name not in self._por_nome:
+                raise ValueError(f"Ferramenta desconhecida para o agente {self.name}: {tool_name}")
+            return self._por_nome[tool_name]
+        if len(self.tools) == 1:
+            return self.tools[0]
+        for tool in self.tools:
+            try:
+                inspect.signature(tool).bind(**(kwargs or {}))
+            except TypeError:
+                continue
+            return tool
+        return self.tools[0]
+
+    async def run_async(self, tool_name: str = None, **kwargs) -> Any:
+        tool = self.resolver_ferramenta(tool_name, kwargs)
+        async with self._semaforo():
+            with span(f"agente.{getattr(tool, 'tool_name', tool.__name__)}", agente=self.name):
+                if inspect.iscoroutinefunction(tool):
+                    chamada = tool(**kwargs)
+                else:
+                    chamada = asyncio.to_thread(tool, **kwargs)
+                if self.timeout:
+                    return await asyncio.wait_for(chamada, self.timeout)
+                return await chamada
+
+    async def chamar(self, chamadas: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """
+        Executa chamadas independentes [(nome da ferramenta, argumentos), ...] concorrentemente,
+        respeitando o limite do agente. Os resultados mantêm a ordem das chamadas.
+        """
+        return await asyncio.gather(*(self.run_async(nome, **kwargs) for nome, kwargs in chamadas))
+
+    async def run_many_async(self, lista_kwargs: List[Dict[str, Any]], max_concurrency: int = None) -> List[Any]:
+        limite = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        async def uma(kwargs):
+            async with limite:
+                return await self.run_async(**kwargs)
+        return await asyncio.gather(*(uma(kwargs) for kwargs in lista_kwargs))
+
+    def run(self, **kwargs) -> Any:
+        """
+        Versão síncrona de run_async, para quem não está em código async.
+        """
+        return executar_sincrono(self.run_async(**kwargs))
+
+    def run_many(self, lista_kwargs: List[Dict[str, Any]], max_concurrency: int = None) -> List[Any]:
+        """
+        Executa run() para cada conjunto de argumentos em paralelo no loop dos agentes,
+        limitado a max_concurrency chamadas simultâneas. Os resultados mantêm a ordem da entrada.
+        """
+        lista_kwargs = list(lista_kwargs)
+        resultados = [None] * len(lista_kwargs)
+        for indice, resultado in self.run_as_completed(lista_kwargs, max_concurrency):
+            resultados[indice] = resultado
+        return resultados
+
+    def run_as_completed(self, lista_kwargs: List[Dict[str, Any]], max_concurrency: int = None) -> Iterator[Tuple[int, Any]]:
+        """
+        Como run_many, mas gera (índice, resultado) assim que cada chamada termina.
+        """
+        lista_kwargs = list(lista_kwargs)
+        limite = max_concurrency or self.max_concurrency
+        if len(lista_kwargs) <= 1 or limite <= 1:
+            for indice, kwargs in enumerate(lista_kwargs):
+                yield indice, self.run(**kwargs)
+            return
+        semaforo = asyncio.Semaphore(limite)
+        async def uma(kwargs):
+            async with semaforo:
+                return await self.run_async(**kwargs)
+        futuros = {agendar(uma(kwargs)): indice for indice, kwargs in enumerate(lista_kwargs)}
+        try:
+            for futuro in concurrent.futures.as_completed(futuros):
+                yield futuros[futuro], futuro.result()
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
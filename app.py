@@ -1,74 +1,198 @@
 # 📦 #### Imports
-import os
+# Apenas dependências leves no import: os clientes (OpenAI, BigQuery, BigDataCorp) e as
+# bibliotecas pesadas são carregados sob demanda, no primeiro uso.
 import re
 import json
 import datetime
-import requests
-
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-from google.cloud import bigquery
-from google.auth import default
-import openai
-from dotenv import load_dotenv
+import threading
+
 from agents import Agent, function_tool
+from configuracao import obter_config
+from cache_llm import CacheLLM
+from cache_bdc import CacheBDC, POLITICA_FRESCOR_PADRAO
+from classificador import classificador_padrao
+from prompt_risco import ajustar_payload_risco, contar_tokens, deduplicar_decisoes
+from relatorio import html_parecer, html_sancoes
+from pre_triagem import ROTA_LLM, avaliar, parecer_padronizado, estatisticas_roteamento
+from telemetria import span, iniciar_span, registrar_uso_llm
 
-# Carregar variáveis de ambiente
-load_dotenv()
-openai_api_key = os.getenv('OPENAI_API_KEY')
-if not openai_api_key:
-    raise ValueError('A variável de ambiente OPENAI_API_KEY não está definida.')
-openai_client = openai.OpenAI(api_key=openai_api_key)
+# ⚙️ #### Clientes criados sob demanda
+_clientes_lock = threading.Lock()
+_openai_client = None
+_openai_async_client = None
+_bq_client = None
 
-# Função para resumir decisões
-@function_tool
-def resumir_decisao(decisao: str) -> str:
-    prompt = f"""
+def obter_cliente_openai():
+    """
+    Retorna o cliente OpenAI compartilhado, criando-o no primeiro uso.
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _clientes_lock:
+            if _openai_client is None:
+                openai_api_key = obter_config('OPENAI_API_KEY')
+                if not openai_api_key:
+                    raise ValueError('A variável de ambiente OPENAI_API_KEY não está definida.')
+                import openai
+                _openai_client = openai.OpenAI(api_key=openai_api_key)
+    return _openai_client
+
+def obter_cliente_openai_async():
+    """
+    Retorna o cliente AsyncOpenAI compartilhado pelos agentes: as ferramentas async rodam todas
+    no mesmo event loop (agents.loop_compartilhado), então um único pool de conexões atende a todas.
+    """
+    global _openai_async_client
+    if _openai_async_client is None:
+        with _clientes_lock:
+            if _openai_async_client is None:
+                openai_api_key = obter_config('OPENAI_API_KEY')
+                if not openai_api_key:
+                    raise ValueError('A variável de ambiente OPENAI_API_KEY não está definida.')
+                import openai
+                _openai_async_client = openai.AsyncOpenAI(api_key=openai_api_key)
+    return _openai_async_client
+
+def obter_cliente_bigquery():
+    """
+    Retorna o cliente BigQuery compartilhado, criando-o no primeiro uso.
+    Se necessário, configure as credenciais do Google Cloud via variável de ambiente ou arquivo json
+    Exemplo: export GOOGLE_APPLICATION_CREDENTIALS='caminho/para/credenciais.json'
+    """
+    global _bq_client
+    if _bq_client is None:
+        with _clientes_lock:
+            if _bq_client is None:
+                from google.cloud import bigquery
+                _bq_client = bigquery.Client(project='ai-services-sae')
+    return _bq_client
+
+# 🔐 #### Credenciais
+def obter_credenciais_bdc() -> tuple:
+    """
+    Retorna (token_hash, token_id) da BigDataCorp.
+    """
+    bigdata_token_id = obter_config('BIGDATA_TOKEN_ID')
+    bigdata_token_hash = obter_config('BIGDATA_TOKEN_HASH')
+    if not bigdata_token_id or not bigdata_token_hash:
+        raise ValueError('As variáveis de ambiente BIGDATA_TOKEN_ID e/ou BIGDATA_TOKEN_HASH não estão definidas.')
+    return bigdata_token_hash, bigdata_token_id
+
+def __getattr__(nome):
+    # Compatibilidade com código que acessava os clientes como atributos do módulo
+    if nome == 'openai_client':
+        return obter_cliente_openai()
+    if nome == 'bq_client':
+        return obter_cliente_bigquery()
+    if nome == 'bigdata_token_hash':
+        return obter_credenciais_bdc()[0]
+    if nome == 'bigdata_token_id':
+        return obter_credenciais_bdc()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+# Cache persistente dos resumos (desative com CACHE_LLM_DESATIVADO=1)
+cache_resumos = CacheLLM()
+
+MODELO_RESUMO = "gpt-4o-mini"
+SISTEMA_RESUMO = "Você é um analista jurídico especializado em resumir decisões judiciais e sanções."
+PROMPT_RESUMO = """
 Resuma de forma clara, objetiva e técnica a decisão judicial e as informações de sanções abaixo, destacando o que foi decidido, as penas aplicadas, absolvições, homologações, sanções, fontes, datas ou outros pontos relevantes para análise de risco:
 
 {decisao}
 """
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "Você é um analista jurídico especializado em resumir decisões judiciais e sanções."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        temperature=0.3
+
+# Parâmetros das chamadas, compartilhados com o modo Batch da OpenAI (lote_batch.py)
+PARAMETROS_RESUMO = {"model": MODELO_RESUMO, "max_tokens": 500, "temperature": 0.3}
+# Tudo o que, além da decisão, altera o resumo (chave do cache_resumos)
+CONTEXTO_RESUMO = (MODELO_RESUMO, SISTEMA_RESUMO, PROMPT_RESUMO, 500, 0.3)
+
+def montar_mensagens_resumo(decisao: str) -> list:
+    return [
+        {"role": "system", "content": SISTEMA_RESUMO},
+        {"role": "user", "content": PROMPT_RESUMO.format(decisao=decisao)}
+    ]
+
+# Função para resumir decisões
+@function_tool(cache=cache_resumos, cache_context=CONTEXTO_RESUMO)
+async def resumir_decisao(decisao: str) -> str:
+    response = await obter_cliente_openai_async().chat.completions.create(
+        messages=montar_mensagens_resumo(decisao),
+        **PARAMETROS_RESUMO
     )
+    registrar_uso_llm(response.usage, MODELO_RESUMO)
     return response.choices[0].message.content
 
 # Função para análise de risco
-@function_tool
-def analisar_risco(dados: dict, resumos: list) -> str:
-    prompt = f"""
+SISTEMA_RISCO = "Você é um assistente que resume dados de pessoas."
+PROMPT_RISCO = """
 Você é um analista jurídico de uma fintech, especializado em compliance e avaliação de risco de clientes. Seja cético e criterioso. Analise os dados abaixo e, para cada processo criminal, avalie o tipo, contexto, partes envolvidas, decisões (traga um resumo detalhado do conteúdo da decisão), homologações e demais detalhes relevantes. Considere o histórico, quantidade, gravidade e natureza dos processos para emitir um parecer objetivo sobre o risco de manter esse cliente na base (baixo, médio ou alto risco), justificando sua conclusão de forma clara e técnica.
 
 Dados cadastrais e de compliance:
-{json.dumps(dados, ensure_ascii=False, indent=2)}
+{dados}
 
 Resumos das decisões:
-{json.dumps(resumos, ensure_ascii=False, indent=2)}
+{resumos}
 """
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "Você é um assistente que resume dados de pessoas."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=1000,
-        temperature=0.3
+
+def montar_mensagens_risco(dados: dict, resumos: list) -> list:
+    """
+    Monta as mensagens do parecer, ajustando o payload ao orçamento ORCAMENTO_TOKENS_RISCO
+    (padrão 16000 tokens) — veja prompt_risco.ajustar_payload_risco.
+    """
+    orcamento = int(obter_config('ORCAMENTO_TOKENS_RISCO', '16000'))
+    tokens_fixos = contar_tokens(SISTEMA_RISCO) + contar_tokens(PROMPT_RISCO.format(dados="", resumos=""))
+    dados, resumos, _ = ajustar_payload_risco(dados, resumos, orcamento, tokens_fixos=tokens_fixos)
+    prompt = PROMPT_RISCO.format(
+        dados=json.dumps(dados, ensure_ascii=False, indent=2),
+        resumos=json.dumps(resumos, ensure_ascii=False, indent=2),
+    )
+    return [
+        {"role": "system", "content": SISTEMA_RISCO},
+        {"role": "user", "content": prompt}
+    ]
+
+PARAMETROS_RISCO = {"model": "gpt-4o-mini", "max_tokens": 1000, "temperature": 0.3}
+
+@function_tool
+async def analisar_risco(dados: dict, resumos: list) -> str:
+    response = await obter_cliente_openai_async().chat.completions.create(
+        messages=montar_mensagens_risco(dados, resumos),
+        **PARAMETROS_RISCO
     )
+    registrar_uso_llm(response.usage, PARAMETROS_RISCO["model"])
     return response.choices[0].message.content
 
+def analisar_risco_stream(dados: dict, resumos: list):
+    """
+    Igual a analisar_risco, mas gera o parecer em trechos à medida que o modelo os produz.
+    """
+    # O span não vira o span atual: o contexto não deve atravessar os yields
+    s = iniciar_span("agente.analisar_risco_stream")
+    try:
+        stream = obter_cliente_openai().chat.completions.create(
+            messages=montar_mensagens_risco(dados, resumos),
+            **PARAMETROS_RISCO,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                registrar_uso_llm(chunk.usage, PARAMETROS_RISCO["model"], alvo=s)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        s.finalizar(erro=e)
+        raise
+    finally:
+        s.finalizar()
+
 # Criação dos agentes
 agente_resumo = Agent(
     name="Resumidor de Decisões",
     instructions="Resuma decisões judiciais de forma clara, técnica e objetiva, destacando pontos relevantes para análise de risco.",
     model="gpt-4o-mini",
     tools=[resumir_decisao],
+    max_concurrency=64,
 )
 
 agente_risco = Agent(
@@ -76,21 +200,36 @@ agente_risco = Agent(
     instructions="Analise o histórico, contexto e gravidade dos processos e emita um parecer de risco (baixo, médio, alto), justificando tecnicamente.",
     model="gpt-4o-mini",
     tools=[analisar_risco],
+    max_concurrency=32,
 )
 
-# ⚙️ #### Setup BigQuery (ambiente local)
-# Se necessário, configure as credenciais do Google Cloud via variável de ambiente ou arquivo json
-# Exemplo: export GOOGLE_APPLICATION_CREDENTIALS='caminho/para/credenciais.json'
-
-bq_client = bigquery.Client(project='ai-services-sae')
-
-# 🔐 #### Credenciais 
-bigdata_token_id = os.getenv('BIGDATA_TOKEN_ID')
-bigdata_token_hash = os.getenv('BIGDATA_TOKEN_HASH')
-if not bigdata_token_id or not bigdata_token_hash:
-    raise ValueError('As variáveis de ambiente BIGDATA_TOKEN_ID e/ou BIGDATA_TOKEN_HASH não estão definidas.')
+# 🧠 #### Cliente da API BigDataCorp
+# Limites configuráveis: BDC_QPS (vazão contratada), BDC_TIMEOUT_CONEXAO, BDC_TIMEOUT_LEITURA e BDC_MAX_TENTATIVAS;
+# BDC_INGESTAO_STREAMING=1 lê as respostas em streaming, só com os campos usados (ingestao_bdc)
+_clientes_bdc = {}
+_clientes_bdc_lock = threading.Lock()
 
-# 🧠 #### Função para buscar dados na API
+def obter_cliente_bdc(token_hash: str = None, token_id: str = None) -> "ClienteBigDataCorp":
+    """
+    Retorna o cliente BigDataCorp compartilhado (uma sessão com pool de conexões por par de tokens).
+    """
+    if not token_hash or not token_id:
+        token_hash, token_id = obter_credenciais_bdc()
+    with _clientes_bdc_lock:
+        cliente = _clientes_bdc.get((token_hash, token_id))
+        if cliente is None:
+            from bigdatacorp import ClienteBigDataCorp
+            cliente = ClienteBigDataCorp(
+                token_hash=token_hash,
+                token_id=token_id,
+                qps=float(obter_config('BDC_QPS', '10')),
+                timeout_conexao=float(obter_config('BDC_TIMEOUT_CONEXAO', '5')),
+                timeout_leitura=float(obter_config('BDC_TIMEOUT_LEITURA', '60')),
+                max_tentativas=int(obter_config('BDC_MAX_TENTATIVAS', '4')),
+                streaming=bool(obter_config('BDC_INGESTAO_STREAMING')),
+            )
+            _clientes_bdc[(token_hash, token_id)] = cliente
+        return cliente
 
 def fetch_bdc_data(
     document_number: str,
@@ -99,19 +238,8 @@ def fetch_bdc_data(
     token_hash: str,
     token_id: str
 ):
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "AccessToken": token_hash,
-        "TokenId": token_id
-    }
-    payload = {
-        "q": f"doc{{{document_number}}}",
-        "Datasets": dataset
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    with span("fetch", documento=document_number):
+        return obter_cliente_bdc(token_hash, token_id).consultar(document_number, url, dataset)
 
 def formatar_sancoes_detalhadas(sancoes):
     if not sancoes or sancoes == "Nenhuma sanção detalhada encontrada":
@@ -136,181 +264,285 @@ def formatar_sancoes_detalhadas(sancoes):
     return '\n'.join(texto)
 
 def formatar_sancoes_detalhadas_html(sancoes):
-    if not sancoes or sancoes == "Nenhuma sanção detalhada encontrada":
-        return "<div class='no-sanction'>Nenhuma sanção detalhada encontrada.</div>"
-    html = []
-    for idx, s in enumerate(sancoes, 1):
-        html.append(f"""
-        <div class='sanction-block'>
-            <div class='sanction-title'>Sanção #{idx}</div>
-            <div><b>Fonte:</b> {s.get('Fonte', '')}</div>
-            <div><b>Tipo:</b> {s.get('Tipo', '')} ({s.get('Tipo Padronizado', '')})</div>
-            <div><b>Status:</b> {s.get('Status', '')}</div>
-            <div><b>Órgão:</b> {s.get('Órgão', '')}</div>
-            <div><b>Data de Início:</b> {s.get('Data de Início', '')}</div>
-            <div><b>Data de Fim:</b> {s.get('Data de Fim', '')}</div>
-            <div><b>Número do Processo:</b> {s.get('Número do Processo', '')}</div>
-            <div><b>Número do Mandado:</b> {s.get('Número do Mandado', '')}</div>
-            <div><b>Regime:</b> {s.get('Regime', '')}</div>
-            <div><b>Tempo de Pena:</b> {s.get('Tempo de Pena', '')}</div>
-            <div><b>Recaptura:</b> {s.get('Recaptura', '')}</div>
-            <div><b>Nome na Lista:</b> {s.get('Nome na Lista', '')}</div>
-            <div><b>Data de Nascimento:</b> {s.get('Data de Nascimento', '')}</div>
-            <div><b>Descrição da Decisão:</b> <pre style='white-space:pre-wrap'>{s.get('Descrição', '')}</pre></div>
-        </div>
-        """)
-    return '\n'.join(html)
+    return html_sancoes(sancoes)
+
+BDC_URL_PESSOAS = "https://plataforma.bigdatacorp.com.br/pessoas"
+BDC_DATASET_PESSOAS = """basic_data,
+                   processes.filter(partypolarity = PASSIVE, courttype = CRIMINAL),
+                   kyc.filter(standardized_type, standardized_sanction_type, type, sanctions_source = Conselho Nacional de Justiça)"""
+
+def sanitizar_cpf(cpf_input: str) -> str:
+    return re.sub(r'\D', '', cpf_input)
+
+# Cache das respostas da BigDataCorp compartilhado pelo processo (ex.: sessões do Streamlit).
+# CACHE_BDC_POLITICA aceita um JSON {dataset: idade máxima em segundos} para sobrescrever o padrão;
+# CACHE_BDC_MAX_MB (padrão 256) limita o tamanho total das respostas guardadas.
+_cache_bdc = None
+
+def obter_cache_bdc() -> CacheBDC:
+    global _cache_bdc
+    if _cache_bdc is None:
+        with _clientes_lock:
+            if _cache_bdc is None:
+                politica = {**POLITICA_FRESCOR_PADRAO, **json.loads(obter_config('CACHE_BDC_POLITICA', '{}'))}
+                max_bytes = int(float(obter_config('CACHE_BDC_MAX_MB', '256')) * 1024 * 1024)
+                _cache_bdc = CacheBDC(politica=politica, max_bytes=max_bytes)
+    return _cache_bdc
+
+def buscar_dados_bdc(cpf_sanitizado: str, forcar_atualizacao: bool = False, gravar_cache: bool = True):
+    """
+    Consulta a BigDataCorp para um CPF já sanitizado (etapa de I/O da pipeline),
+    reaproveitando respostas ainda frescas do cache_bdc. Com gravar_cache=False (modos de
+    lote, que consultam cada CPF uma vez) as respostas novas não ficam na memória.
+    """
+    url = obter_config('BDC_URL_PESSOAS', BDC_URL_PESSOAS)
+    with span("fetch", documento=cpf_sanitizado, origem="cache") as s:
+        def buscar():
+            s.definir(origem="api")
+            return obter_cliente_bdc().consultar(cpf_sanitizado, url, BDC_DATASET_PESSOAS)
+        if obter_config('CACHE_BDC_DESATIVADO'):
+            return buscar()
+        if not gravar_cache:
+            valor = None if forcar_atualizacao else obter_cache_bdc().obter(cpf_sanitizado, BDC_DATASET_PESSOAS, url)
+            return buscar() if valor is None else valor
+        return obter_cache_bdc().obter_ou_buscar(cpf_sanitizado, BDC_DATASET_PESSOAS, url, buscar, forcar=forcar_atualizacao)
+
+def buscar_dados_bdc_lote(cpfs_sanitizados: list, forcar_atualizacao: bool = False, tamanho_lote: int = None,
+                          gravar_cache: bool = True) -> dict:
+    """
+    Versão em lote de buscar_dados_bdc: os CPFs sem resposta fresca no cache são consultados
+    juntos, até BDC_TAMANHO_LOTE (padrão 50) por requisição. Retorna {cpf: bdc_data}, com a
+    exceção no lugar de bdc_data para os CPFs que falharam.
+    """
+    url = obter_config('BDC_URL_PESSOAS', BDC_URL_PESSOAS)
+    tamanho_lote = tamanho_lote or int(obter_config('BDC_TAMANHO_LOTE', '50'))
+    usar_cache = not obter_config('CACHE_BDC_DESATIVADO')
+    resultados = {}
+    with span("fetch_lote", documentos=len(cpfs_sanitizados)) as s:
+        faltantes = []
+        for cpf in dict.fromkeys(cpfs_sanitizados):
+            valor = obter_cache_bdc().obter(cpf, BDC_DATASET_PESSOAS, url) if usar_cache and not forcar_atualizacao else None
+            if valor is None:
+                faltantes.append(cpf)
+            else:
+                resultados[cpf] = valor
+        s.definir(do_cache=len(resultados))
+        if faltantes:
+            buscados = obter_cliente_bdc().consultar_varios(faltantes, url, BDC_DATASET_PESSOAS, tamanho_lote=tamanho_lote)
+            for cpf, valor in buscados.items():
+                if usar_cache and gravar_cache and not isinstance(valor, Exception):
+                    obter_cache_bdc().gravar(cpf, BDC_DATASET_PESSOAS, url, valor)
+                resultados[cpf] = valor
+    return resultados
 
 def pipeline_analise_cpf(cpf_input: str):
     """
     Executa toda a pipeline de análise de risco a partir de um CPF, retornando os dados principais, resumos e parecer.
     """
-    cpf_sanitizado = re.sub(r'\D', '', cpf_input)
-    bdc_data = fetch_bdc_data(
-        document_number=cpf_sanitizado,
-        url="https://plataforma.bigdatacorp.com.br/pessoas",
-        dataset="""basic_data,
-                   processes.filter(partypolarity = PASSIVE, courttype = CRIMINAL),
-                   kyc.filter(standardized_type, standardized_sanction_type, type, sanctions_source = Conselho Nacional de Justiça)""",
-        token_hash=bigdata_token_hash,
-        token_id=bigdata_token_id
-    )
-    print("\n===== RESULTADO BRUTO DA API (bdc_data) =====\n")
-    print(json.dumps(bdc_data, ensure_ascii=False, indent=2))
-    print("\n===== FIM DO RESULTADO BRUTO =====\n")
+    cpf = sanitizar_cpf(cpf_input)
+    with span("pipeline", documento=cpf):
+        bdc_data = buscar_dados_bdc(cpf)
+        return analisar_dados_bdc(bdc_data)
+
+def parsear_resultado_bdc(bdc_data: dict):
+    """
+    Etapa de parse: uma única passada pela resposta gera as tabelas de processos, partes,
+    decisões e sanções (veja parser_bdc). Retorna (tabelas, kyc).
+    """
+    # pandas só é importado quando há uma resposta para interpretar
+    from parser_bdc import tabelas_bdc
+    pessoa = bdc_data["Result"][0]
+    return tabelas_bdc({"Result": [pessoa]}), pessoa.get("KycData", {})
+
+def montar_dados_principais(tabelas: dict) -> dict:
+    from parser_bdc import detalhes_processos, sancoes_detalhadas
+    basic = tabelas["pessoas"].to_dict("records")[0]
+    detalhes = detalhes_processos(tabelas)
+    return {
+        "Nome": basic["Nome"],
+        "CPF": basic["CPF"],
+        "Idade": basic["Idade"],
+        "Situação Cadastral": basic["Situação Cadastral"],
+        "Órgão de Origem": basic["Órgão de Origem"],
+        "Processos": basic["Processos"],
+        "Sanções": basic["Sanções"],
+        "PEP": basic["PEP"],
+        "Última Sanção": basic["Última Sanção"],
+        "Sanções Detalhadas": formatar_sancoes_detalhadas(sancoes_detalhadas(tabelas)),
+        "Processos Criminais Detalhes": detalhes if detalhes else "Nenhum processo criminal encontrado"
+    }
+
+def decisoes_para_resumo(tabelas: dict) -> list:
+    """
+    Decisões criminais a resumir, no formato de extrair_decisoes. Versões truncadas/integrais
+    da mesma decisão de um processo viram uma só (a integral, veja deduplicar_decisoes): o
+    parecer recebe um resumo por decisão distinta, não um por registro da BigDataCorp. Os
+    processos citados não mudam.
+    """
+    from parser_bdc import decisoes_criminais
+    with span("extrair_decisoes") as s:
+        decisoes = deduplicar_decisoes(decisoes_criminais(tabelas))
+        s.definir(decisoes=len(decisoes))
+    return decisoes
+
+def interpretar_dados_bdc(bdc_data: dict):
+    """
+    Etapas de parse e de dados principais. Retorna (tabelas, dados_principais, kyc); se a
+    resposta não puder ser interpretada, tabelas é None e dados_principais traz a chave "erro".
+    """
+    # O dump da resposta bruta é caro em payloads grandes: só com THEMIS_DEBUG=1
+    if obter_config('THEMIS_DEBUG'):
+        print("\n===== RESULTADO BRUTO DA API (bdc_data) =====\n")
+        print(json.dumps(bdc_data, ensure_ascii=False, indent=2))
+        print("\n===== FIM DO RESULTADO BRUTO =====\n")
     try:
-        pessoa = bdc_data["Result"][0]
-        basic = pessoa.get("BasicData", {})
-        kyc = pessoa.get("KycData", {})
-        processos = pessoa.get("Processes", {})
-        detalhes_processos = []
-        if processos.get("Lawsuits"):
-            for proc in processos["Lawsuits"]:
-                if proc.get("CourtType") == "CRIMINAL":
-                    conteudo = proc.get("Content", "")
-                    decisao = proc.get("Decision", "")
-                    descricao = proc.get("Description") or proc.get("Summary") or proc.get("Details") or ""
-                    homologacao = False
-                    for texto in [conteudo, decisao, descricao]:
-                        if texto and "homologada" in texto.lower():
-                            homologacao = True
-                            break
-                    partes = proc.get("Parties", [])
-                    is_reu = False
-                    partes_resumo = []
-                    for parte in partes:
-                        papel = parte.get("Type", "")
-                        nome = parte.get("Name", "")
-                        espec = parte.get("PartyDetails", {}).get("SpecificType", "")
-                        partes_resumo.append(f"{nome} ({papel}{' - ' + espec if espec else ''})")
-                        if papel.upper() == "DEFENDANT" or papel.upper() == "RÉU" or espec.upper() == "RÉU":
-                            if basic.get("Name", "").strip().upper() in nome.strip().upper():
-                                is_reu = True
-                    detalhes_processos.append({
-                        "Número": proc.get("CaseNumber") or proc.get("Number"),
-                        "É Réu": "Sim" if is_reu else "Não",
-                        "Tipo": proc.get("Type"),
-                        "Assunto Principal": proc.get("MainSubject"),
-                        "Assunto CNJ": proc.get("InferredCNJSubjectName"),
-                        "Tipo Procedimento CNJ": proc.get("InferredCNJProcedureTypeName"),
-                        "Outros Assuntos": proc.get("OtherSubjects"),
-                        "Data": proc.get("FilingDate"),
-                        "Órgão": proc.get("CourtName"),
-                        "Órgão Julgador": proc.get("JudgingBody"),
-                        "Nível da Corte": proc.get("CourtLevel"),
-                        "Comarca": proc.get("CourtDistrict"),
-                        "Estado": proc.get("State"),
-                        "Juiz": proc.get("Judge"),
-                        "Situação": proc.get("Status"),
-                        "Data de Encerramento": proc.get("CloseDate"),
-                        "Última Movimentação": proc.get("LastMovementDate"),
-                        "Partes": partes_resumo,
-                        "Decisão": decisao,
-                        "Descrição": descricao,
-                        "Conteúdo": conteudo,
-                        "Homologação": "Sim" if homologacao else "Não"
-                    })
-        # Extrair todas as sanções detalhadas
-        sancoes_detalhadas = []
-        for sancao in kyc.get("SanctionsHistory", []):
-            detalhes = sancao.get("Details", {})
-            sancoes_detalhadas.append({
-                "Fonte": sancao.get("Source"),
-                "Tipo": sancao.get("Type"),
-                "Tipo Padronizado": sancao.get("StandardizedSanctionType"),
-                "Data de Início": sancao.get("StartDate"),
-                "Data de Fim": sancao.get("EndDate"),
-                "Status": detalhes.get("Status"),
-                "Órgão": detalhes.get("Agency"),
-                "Número do Processo": detalhes.get("ProcessNumber"),
-                "Número do Mandado": detalhes.get("ArrestWarrantNumber"),
-                "Descrição": detalhes.get("Decision"),
-                "Regime": detalhes.get("PrisonRegime"),
-                "Tempo de Pena": detalhes.get("PenaltyTime"),
-                "Recaptura": detalhes.get("Recapture"),
-                "Data de Nascimento": detalhes.get("BirthDate"),
-                "Nome na Lista": detalhes.get("NameInSanctionList"),
-                "Outros Detalhes": detalhes
-            })
-        dados_principais = {
-            "Nome": basic.get("Name"),
-            "CPF": basic.get("TaxIdNumber"),
-            "Idade": basic.get("Age"),
-            "Situação Cadastral": basic.get("TaxIdStatus"),
-            "Órgão de Origem": basic.get("TaxIdOrigin"),
-            "Processos": processos.get("TotalLawsuits"),
-            "Sanções": kyc.get("IsCurrentlySanctioned"),
-            "PEP": kyc.get("IsCurrentlyPEP"),
-            "Última Sanção": kyc.get("LastSanctionDate"),
-            "Sanções Detalhadas": formatar_sancoes_detalhadas(sancoes_detalhadas),
-            "Processos Criminais Detalhes": detalhes_processos if detalhes_processos else "Nenhum processo criminal encontrado"
-        }
+        with span("parse") as s:
+            tabelas, kyc = parsear_resultado_bdc(bdc_data)
+            dados_principais = montar_dados_principais(tabelas)
+            s.definir(processos=len(tabelas["processos"]), partes=len(tabelas["partes"]), sancoes=len(tabelas["sancoes"]))
     except Exception as e:
-        dados_principais = {"erro": f"Não foi possível extrair dados principais: {e}"}
-        processos = {}
-        kyc = {}
-    lista_decision_content = []
-    if processos.get("Lawsuits"):
-        lista_decision_content = extrair_decisoes([
-            proc for proc in processos["Lawsuits"] if proc.get("CourtType") == "CRIMINAL"
-        ])
-    resumos = []
-    if lista_decision_content:
-        sanctions_info = ""
-        if kyc:
-            sanctions_info = f"""
+        return None, {"erro": f"Não foi possível extrair dados principais: {e}"}, {}
+    return tabelas, dados_principais, kyc
+
+def extrair_dados_principais(bdc_data: dict):
+    """
+    Extrai da resposta da BigDataCorp os dados principais (cadastro, processos criminais e sanções)
+    e as decisões criminais a resumir. Retorna (dados_principais, decisoes, kyc).
+    """
+    tabelas, dados_principais, kyc = interpretar_dados_bdc(bdc_data)
+    if tabelas is None:
+        return dados_principais, [], kyc
+    try:
+        decisoes = decisoes_para_resumo(tabelas)
+    except Exception as e:
+        return {"erro": f"Não foi possível extrair dados principais: {e}"}, [], {}
+    return dados_principais, decisoes, kyc
+
+def montar_textos_decisao(lista_decision_content: list, kyc: dict) -> list:
+    """
+    Monta o texto enviado ao agente de resumo para cada decisão, com o contexto de sanções.
+    """
+    sanctions_info = ""
+    if kyc:
+        sanctions_info = f"""
 Sanções:
 - Atualmente sancionado: {kyc.get('IsCurrentlySanctioned')}
 - Última sanção: {kyc.get('LastSanctionDate')}
 - PEP: {kyc.get('IsCurrentlyPEP')}
 """
-        for item in lista_decision_content:
-            texto_decisao = f"""
+    return [f"""
 Processo: {item['Número']}
 Tipo: {item['TipoDecisao']}
 Data: {item.get('DecisionDate', '')}
 Decisão: {item['DecisionContent']}
 {sanctions_info}
-"""
-            resumo = agente_resumo.run(decisao=texto_decisao)
+""" for item in lista_decision_content]
+
+def rotear_parecer(dados_principais: dict, decisoes: list, kyc: dict) -> dict:
+    """
+    Pré-triagem por regras (veja pre_triagem.py): decide se o parecer sai de um modelo
+    padronizado (casos claros de risco baixo/alto) ou do agente de risco.
+    """
+    with span("pre_triagem") as s:
+        avaliacao = avaliar(dados_principais, decisoes, kyc)
+        s.definir(rota=avaliacao["rota"])
+    estatisticas_roteamento.registrar(avaliacao["rota"])
+    return avaliacao
+
+def emitir_parecer(dados_principais: dict, resumos: list, avaliacao: dict) -> str:
+    if avaliacao["rota"] != ROTA_LLM:
+        return parecer_padronizado(dados_principais, avaliacao)
+    return agente_risco.run(dados=dados_principais, resumos=resumos)
+
+def registrar_triagem(dados_principais: dict, decisoes: list, kyc: dict, resumos: list, parecer: str, avaliacao: dict = None):
+    """
+    Grava a triagem concluída no repositório de resultados (veja resultados.py), quando
+    RESULTADOS_DIRETORIO está definido.
+    """
+    if not obter_config('RESULTADOS_DIRETORIO') or "erro" in dados_principais:
+        return
+    from resultados import repositorio_padrao
+    repositorio_padrao().registrar(dados_principais, decisoes, kyc, resumos, parecer, avaliacao)
+
+def resumir_decisoes(decisoes: list, kyc: dict = None) -> list:
+    # Resumos disparados em paralelo; run_many preserva a ordem de extrair_decisoes
+    # MAX_RESUMOS_PARALELOS limita os resumos simultâneos por CPF
+    return agente_resumo.run_many(
+        [{"decisao": texto} for texto in montar_textos_decisao(decisoes, kyc)],
+        max_concurrency=int(obter_config('MAX_RESUMOS_PARALELOS', '8')),
+    )
+
+def analisar_dados_bdc(bdc_data: dict, indice=None):
+    """
+    Executa a parte da pipeline posterior à consulta na BigDataCorp: extração dos dados,
+    pré-triagem, resumos das decisões e parecer de risco (etapa de LLM). Com um
+    indice_processos.IndiceProcessos, as decisões de processos já resumidas para outro CPF
+    do lote são reaproveitadas.
+    """
+    dados_principais, lista_decision_content, kyc = extrair_dados_principais(bdc_data)
+    avaliacao = rotear_parecer(dados_principais, lista_decision_content, kyc)
+    resumos = []
+    if lista_decision_content:
+        if indice is None:
+            resultados = resumir_decisoes(lista_decision_content, kyc)
+        else:
+            # Resumos compartilhados no lote: sem o bloco de sanções do CPF (veja indice_processos.py)
+            resultados = indice.resumir(dados_principais.get("CPF"), lista_decision_content, resumir_decisoes)
+        for item, resumo in zip(lista_decision_content, resultados):
             resumos.append({
                 "Processo": item['Número'],
                 "Resumo": resumo
             })
-    parecer = agente_risco.run(dados=dados_principais, resumos=resumos)
+    parecer = emitir_parecer(dados_principais, resumos, avaliacao)
+    registrar_triagem(dados_principais, lista_decision_content, kyc, resumos, parecer, avaliacao)
     return dados_principais, resumos, parecer
 
+def pipeline_analise_cpf_stream(cpf_input: str, forcar_atualizacao: bool = False):
+    """
+    Versão incremental de pipeline_analise_cpf. Gera eventos (tipo, conteúdo) à medida que
+    cada etapa termina:
+    - ("dados", dados_principais) logo após a consulta à BigDataCorp;
+    - ("resumo", {"Indice", "Processo", "Resumo"}) para cada decisão, na ordem em que concluem;
+    - ("parecer_parcial", trecho) para cada trecho do parecer recebido em streaming;
+    - ("concluido", (dados_principais, resumos, parecer)) com o mesmo retorno de pipeline_analise_cpf.
+    """
+    cpf = sanitizar_cpf(cpf_input)
+    # O span atravessa os yields: o consumidor deve iterar o gerador no mesmo contexto
+    with span("pipeline", documento=cpf, modo="stream"):
+        bdc_data = buscar_dados_bdc(cpf, forcar_atualizacao=forcar_atualizacao)
+        dados_principais, lista_decision_content, kyc = extrair_dados_principais(bdc_data)
+        avaliacao = rotear_parecer(dados_principais, lista_decision_content, kyc)
+        yield ("dados", dados_principais)
+        resumos_por_indice = {}
+        if lista_decision_content:
+            textos_decisao = montar_textos_decisao(lista_decision_content, kyc)
+            for indice, resumo in agente_resumo.run_as_completed(
+                [{"decisao": texto} for texto in textos_decisao],
+                max_concurrency=int(obter_config('MAX_RESUMOS_PARALELOS', '8')),
+            ):
+                resumos_por_indice[indice] = {
+                    "Processo": lista_decision_content[indice]['Número'],
+                    "Resumo": resumo
+                }
+                yield ("resumo", {"Indice": indice, **resumos_por_indice[indice]})
+        # O parecer recebe os resumos na ordem de extrair_decisoes, como no modo não incremental
+        resumos = [resumos_por_indice[i] for i in range(len(lista_decision_content))]
+        if avaliacao["rota"] != ROTA_LLM:
+            trechos = [parecer_padronizado(dados_principais, avaliacao)]
+            yield ("parecer_parcial", trechos[0])
+        else:
+            trechos = []
+            for trecho in analisar_risco_stream(dados=dados_principais, resumos=resumos):
+                trechos.append(trecho)
+                yield ("parecer_parcial", trecho)
+        parecer = ''.join(trechos)
+        registrar_triagem(dados_principais, lista_decision_content, kyc, resumos, parecer, avaliacao)
+        yield ("concluido", (dados_principais, resumos, parecer))
+
 def classificar_tipo_decisao(texto):
-    texto_lower = texto.lower()
-    if "homolog" in texto_lower:
-        return "Homologação"
-    if "conden" in texto_lower:
-        return "Condenação"
-    if "absolv" in texto_lower:
-        return "Absolvição"
-    if "suspensão condicional" in texto_lower:
-        return "Suspensão Condicional"
-    return "Outro"
+    # Regras e prioridade em classificador.REGRAS_PADRAO; use classificador_padrao.classificar
+    # para obter todas as categorias e os trechos encontrados
+    return classificador_padrao.tipo_principal(texto)
 
 def extrair_decisoes(lista_lawsuits):
     """
@@ -348,105 +580,105 @@ def extrair_decisoes(lista_lawsuits):
 
 # Remover execução automática ao importar
 if __name__ == "__main__":
-    cpf_input = '01130380114'
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Análise de risco jurídico por CPF.")
+    parser.add_argument("cpf", nargs="?", default='01130380114', help="CPF a analisar (modo individual)")
+    parser.add_argument("--lote", help="Arquivo com um CPF por linha ('-' para stdin) para triagem em lote")
+    parser.add_argument("--saida", help="Arquivo JSON-lines para os resultados do lote (padrão: stdout)")
+    parser.add_argument("--max-bdc", type=int, default=4, help="Consultas simultâneas à BigDataCorp no lote")
+    parser.add_argument("--max-llm", type=int, default=8, help="CPFs simultâneos na etapa de LLM no lote (resumos simultâneos com --esteira)")
+    parser.add_argument("--esteira", action="store_true", help="Lote em esteira de etapas com filas limitadas (Ctrl+C conclui os CPFs em andamento)")
+    parser.add_argument("--max-risco", type=int, default=2, help="Pareceres simultâneos com --esteira")
+    parser.add_argument("--tamanho-lote-bdc", type=int, default=1, help="CPFs por requisição à BigDataCorp com --esteira ou --batch-openai (ex.: 50 na retriagem da base)")
+    parser.add_argument("--incremental", action="store_true", help="Retriagem: só resume decisões novas e refaz o parecer de CPFs com mudanças (snapshots em SNAPSHOTS_CAMINHO)")
+    parser.add_argument("--retomar", action="store_true", help="Com --saida, pula os CPFs já concluídos no arquivo e acrescenta os novos resultados")
+    parser.add_argument("--batch-openai", action="store_true", help="Resumos e pareceres do lote pela Batch API da OpenAI (retriagem noturna; veja lote_batch.py)")
+    parser.add_argument("--compartilhar-processos", action="store_true", help="No lote, resume uma vez as decisões de processos citados por vários CPFs (corréus; veja indice_processos.py)")
+    args = parser.parse_args()
+    if args.incremental and args.esteira:
+        parser.error("--incremental ainda não é suportado com --esteira")
+    if args.batch_openai and (args.esteira or args.incremental):
+        parser.error("--batch-openai não pode ser combinado com --esteira nem com --incremental")
+    if args.compartilhar_processos and args.incremental:
+        parser.error("--compartilhar-processos não pode ser combinado com --incremental")
+
+    if args.lote:
+        from lote import analisar_lote, analisar_lote_esteira, criar_esteira_lote, cpfs_concluidos, ler_cpfs, EstatisticasLote
+
+        estatisticas = EstatisticasLote()
+        indice = None
+        if args.compartilhar_processos:
+            from indice_processos import IndiceProcessos
+            indice = IndiceProcessos()
+        origem = sys.stdin if args.lote == '-' else args.lote
+        if args.retomar and args.saida:
+            concluidos = cpfs_concluidos(args.saida)
+            origem = [cpf for cpf in ler_cpfs(origem) if cpf not in concluidos]
+            print(f"Retomando: {len(concluidos)} CPFs já concluídos, {len(origem)} restantes", file=sys.stderr)
+        saida = sys.stdout
+        if args.saida:
+            saida = open(args.saida, "a" if args.retomar else "w", encoding="utf-8")
+            if args.retomar and saida.tell() > 0:
+                # Uma interrupção pode ter deixado a última linha sem quebra
+                with open(args.saida, "rb") as anterior:
+                    anterior.seek(-1, 2)
+                    if anterior.read(1) != b"\n":
+                        saida.write("\n")
+        if args.batch_openai:
+            from lote_batch import analisar_lote_batch
+
+            resultados = analisar_lote_batch(origem, estatisticas=estatisticas, tamanho_lote_bdc=args.tamanho_lote_bdc if args.tamanho_lote_bdc > 1 else None, indice=indice)
+        elif args.esteira:
+            import signal
+
+            esteira = criar_esteira_lote(args.max_bdc, args.max_llm, args.max_risco, estatisticas, tamanho_lote_bdc=args.tamanho_lote_bdc, indice=indice)
+            def interromper(sinal, quadro):
+                if esteira.parando:
+                    raise KeyboardInterrupt
+                print("\nEncerrando: concluindo os CPFs em andamento (Ctrl+C de novo para abortar)", file=sys.stderr)
+                esteira.parar()
+            signal.signal(signal.SIGINT, interromper)
+            resultados = analisar_lote_esteira(origem, estatisticas=estatisticas, esteira=esteira)
+        else:
+            repositorio = None
+            if args.incremental:
+                from retriagem import RepositorioSnapshots
+                repositorio = RepositorioSnapshots()
+            resultados = analisar_lote(origem, max_bdc=args.max_bdc, max_llm=args.max_llm, estatisticas=estatisticas, repositorio=repositorio, indice=indice)
+        status_retriagem = {}
+        try:
+            for resultado in resultados:
+                if "retriagem" in resultado:
+                    status = resultado["retriagem"]["status"]
+                    status_retriagem[status] = status_retriagem.get(status, 0) + 1
+                saida.write(json.dumps(resultado, ensure_ascii=False, default=str) + "\n")
+                saida.flush()
+        finally:
+            if saida is not sys.stdout:
+                saida.close()
+        print("\nVazão por etapa:\n" + estatisticas.formatar(), file=sys.stderr)
+        print("\nPré-triagem:\n" + json.dumps(estatisticas_roteamento.relatorio(), ensure_ascii=False, indent=2), file=sys.stderr)
+        if indice is not None:
+            print("\nProcessos compartilhados:\n" + json.dumps(indice.relatorio(), indent=2), file=sys.stderr)
+        if status_retriagem:
+            print("\nRetriagem: " + ", ".join(f"{n} {status}" for status, n in sorted(status_retriagem.items())), file=sys.stderr)
+        # lote importa o módulo como "app" (não "__main__"): o cliente usado no lote está lá
+        import app
+        print("\nChamadas BigDataCorp:\n" + json.dumps(app.obter_cliente_bdc().metricas.resumo(), indent=2), file=sys.stderr)
+        import telemetria
+        print("\nTelemetria:\n" + json.dumps(telemetria.resumo(), ensure_ascii=False, indent=2), file=sys.stderr)
+        sys.exit(0)
+
+    cpf_input = args.cpf
     dados_principais, resumos, parecer = pipeline_analise_cpf(cpf_input)
     print("\nResumo das decisões (por agente):\n")
     for r in resumos:
         print(f"Processo: {r['Processo']}\nResumo: {r['Resumo']}\n")
     print("\nParecer final de risco (por agente):\n")
     print(parecer)
-    # Geração do HTML com CSS para sanções detalhadas
-    sancoes_html = ""
-    if isinstance(dados_principais.get('Sanções Detalhadas'), str):
-        sancoes_html = f"<div class='no-sanction'>{dados_principais.get('Sanções Detalhadas')}</div>"
-    else:
-        sancoes_html = formatar_sancoes_detalhadas_html([s for s in dados_principais.get('Sanções Detalhadas', []) if isinstance(s, dict)])
-    html_content = f"""
-<html>
-<head>
-<meta charset='utf-8'>
-<title>Parecer de Risco</title>
-<style>
-    body {{
-        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
-        background: linear-gradient(120deg, #f0f4f8 0%, #e9eefa 100%);
-        color: #23272f;
-        margin: 0;
-        padding: 0 0 40px 0;
-    }}
-    h2 {{
-        color: #2d6cdf;
-        margin-top: 32px;
-        margin-bottom: 18px;
-        letter-spacing: 0.5px;
-    }}
-    .container {{
-        max-width: 900px;
-        margin: 32px auto 0 auto;
-        background: #fff;
-        border-radius: 18px;
-        box-shadow: 0 6px 32px rgba(44, 62, 80, 0.10);
-        padding: 36px 32px 32px 32px;
-    }}
-    .sanction-block {{
-        background: linear-gradient(100deg, #f7faff 60%, #eaf1fb 100%);
-        border: 1.5px solid #e3e8f0;
-        border-radius: 12px;
-        margin: 28px 0;
-        padding: 22px 28px 18px 28px;
-        box-shadow: 0 2px 12px rgba(44, 62, 80, 0.07);
-        transition: box-shadow 0.2s, border 0.2s;
-        position: relative;
-    }}
-    .sanction-block:hover {{
-        box-shadow: 0 6px 24px rgba(44, 62, 80, 0.13);
-        border: 1.5px solid #b3cdf6;
-    }}
-    .sanction-title {{
-        font-size: 1.18em;
-        font-weight: 600;
-        color: #2563eb;
-        margin-bottom: 14px;
-        letter-spacing: 0.2px;
-    }}
-    .no-sanction {{
-        color: #888;
-        font-style: italic;
-        margin: 18px 0;
-    }}
-    pre {{
-        background: #f3f6fa;
-        border-radius: 6px;
-        padding: 10px 12px;
-        font-size: 1em;
-        margin: 0;
-        color: #2d3748;
-        font-family: 'Fira Mono', 'Consolas', 'Menlo', monospace;
-        white-space: pre-wrap;
-    }}
-    .sanction-block div {{
-        margin-bottom: 7px;
-        line-height: 1.6;
-    }}
-    @media (max-width: 700px) {{
-        .container {{
-            padding: 12px 4vw 18px 4vw;
-        }}
-        .sanction-block {{
-            padding: 14px 6vw 12px 6vw;
-        }}
-    }}
-</style>
-</head>
-<body>
-<div class='container'>
-<h2>Parecer final de risco (por agente)</h2>
-<pre style='font-family:inherit'>{parecer}</pre>
-<h2>Sanções Detalhadas</h2>
-{sancoes_html}
-</div>
-</body>
-</html>
-"""
+    # Relatório HTML com CSS para sanções detalhadas (modelos em relatorio.py)
+    html_content = html_parecer(dados_principais, parecer)
     with open("parecer.html", "w", encoding="utf-8") as f:
         f.write(html_content)
\ No newline at end of file
@@ -1,169 +1,178 @@
 import re
+import threading
+import time
+import requests
 import streamlit as st
-from app import pipeline_analise_cpf
-from datetime import datetime
-
-def highlight_keywords(text):
-    if not text:
-        return ''
-    keywords = [r'condena[çc][aã]o', r'pena[s]?', r'pris[aã]o']
-    pattern = re.compile(r'(' + '|'.join(keywords) + r')', re.IGNORECASE)
-    return pattern.sub(r"<span style='color:#e53935;font-weight:bold;'>\\1</span>", text)
-
-def format_date(date_str):
-    if not date_str or not isinstance(date_str, str):
-        return ''
-    try:
-        if 'T' in date_str:
-            dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        else:
-            dt = datetime.strptime(date_str, '%Y/%m/%d')
-        return dt.strftime('%d/%m/%Y')
-    except Exception:
-        return date_str
+from configuracao import obter_config
+from relatorio import CSS_CARTOES, html_cartao_sancao, realcar_palavras_chave
+
+# O app é um cliente do servidor de triagem (servidor.py): clientes, caches e a pipeline
+# ficam aquecidos lá e são compartilhados por todas as sessões
+URL_SERVIDOR = obter_config('THEMIS_SERVIDOR_URL', 'http://127.0.0.1:8000').rstrip('/')
+
+@st.cache_resource
+def obter_sessao_http():
+    return requests.Session()
+
+def eventos_servidor(cpf_input, forcar_atualizacao=False):
+    """
+    Inicia a análise no servidor e gera os eventos (tipo, conteúdo) da pipeline à medida que
+    ficam prontos (mesmo formato de app.pipeline_analise_cpf_stream).
+    """
+    sessao = obter_sessao_http()
+    resposta = sessao.post(f"{URL_SERVIDOR}/analises", json={"cpf": cpf_input, "forcar_atualizacao": forcar_atualizacao, "assincrono": True}, timeout=30)
+    if resposta.status_code >= 400:
+        raise RuntimeError(resposta.json().get("erro", resposta.text))
+    trabalho = resposta.json()
+    desde = 0
+    while True:
+        for tipo, conteudo in trabalho["eventos"]:
+            yield tipo, conteudo
+        desde = trabalho["proximo"]
+        if trabalho["status"] == "erro":
+            raise RuntimeError(trabalho["erro"])
+        if trabalho["status"] == "concluido":
+            return
+        resposta = sessao.get(f"{URL_SERVIDOR}/analises/{trabalho['id']}", params={"desde": desde, "espera": 10}, timeout=40)
+        resposta.raise_for_status()
+        trabalho = resposta.json()
+
+def renderizar_dados_principais(dados_principais):
+    st.subheader("Dados Principais")
+    st.json(dados_principais)
+
+    # Exibir sanções detalhadas com visual super moderno e limpo
+    sancoes = dados_principais.get('Sanções Detalhadas', [])
+    st.subheader("Sanções Detalhadas")
+    st.markdown(f"<style>\n{CSS_CARTOES}</style>", unsafe_allow_html=True)
+    if isinstance(sancoes, str):
+        st.markdown(f"<div class='no-sanction-streamlit'>{realcar_palavras_chave(sancoes)}</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("".join(html_cartao_sancao(idx, s) for idx, s in enumerate(sancoes, 1)), unsafe_allow_html=True)
+
+def renderizar_resumos(area, resumos):
+    with area.container():
+        for r in resumos:
+            st.markdown(f"**Processo:** {r['Processo']}")
+            st.write(r['Resumo'])
+            st.markdown("---")
+
+def sanitizar_cpf(cpf_input):
+    return re.sub(r'\D', '', cpf_input or '')
+
+class CacheResultados:
+    """
+    Resultados concluídos por CPF sanitizado, reaproveitados por CACHE_RESULTADOS_TTL_S
+    segundos (padrão 900) por todas as sessões do app.
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._itens = {}
+
+    def obter(self, cpf):
+        with self._lock:
+            entrada = self._itens.get(cpf)
+            if entrada is not None and time.time() - entrada["concluido_em"] > self.ttl:
+                del self._itens[cpf]
+                entrada = None
+            return entrada
+
+    def gravar(self, cpf, entrada):
+        with self._lock:
+            self._itens[cpf] = entrada
+
+@st.cache_resource
+def obter_cache_resultados():
+    return CacheResultados(float(obter_config('CACHE_RESULTADOS_TTL_S', '900')))
+
+def formatar_idade(segundos):
+    if segundos < 60:
+        return f"{segundos:.0f}s"
+    if segundos < 3600:
+        return f"{segundos / 60:.0f} min"
+    return f"{segundos / 3600:.1f} h"
+
+def renderizar_resultado(entrada):
+    dados_principais, resumos, parecer = entrada["resultado"]
+    renderizar_dados_principais(dados_principais)
+    st.subheader("Resumos das Decisões")
+    area_resumos = st.empty()
+    if resumos:
+        renderizar_resumos(area_resumos, resumos)
+    else:
+        area_resumos.info("Nenhum resumo de decisão encontrado.")
+    st.subheader("Parecer Final de Risco")
+    st.code(parecer, language="markdown")
+
+def analisar_com_progresso(cpf, forcar_atualizacao):
+    """
+    Executa a análise no servidor exibindo cada parte assim que fica pronta. Retorna a
+    entrada para o cache de resultados.
+    """
+    inicio = time.perf_counter()
+    resumos_recebidos = {}
+    area_resumos = None
+    area_parecer = None
+    parecer_parcial = ""
+    for tipo, conteudo in eventos_servidor(cpf, forcar_atualizacao):
+        if tipo == "dados":
+            renderizar_dados_principais(conteudo)
+            st.subheader("Resumos das Decisões")
+            area_resumos = st.empty()
+            area_resumos.info("Gerando resumos das decisões...")
+            st.subheader("Parecer Final de Risco")
+            area_parecer = st.empty()
+        elif tipo == "resumo":
+            resumos_recebidos[conteudo["Indice"]] = conteudo
+            renderizar_resumos(area_resumos, [resumos_recebidos[i] for i in sorted(resumos_recebidos)])
+        elif tipo == "parecer_parcial":
+            parecer_parcial += conteudo
+            area_parecer.code(parecer_parcial, language="markdown")
+        elif tipo == "concluido":
+            dados_principais, resumos, parecer = conteudo
+            if resumos:
+                renderizar_resumos(area_resumos, resumos)
+            else:
+                area_resumos.info("Nenhum resumo de decisão encontrado.")
+            area_parecer.code(parecer, language="markdown")
+            return {"cpf": cpf, "resultado": conteudo, "concluido_em": time.time(), "duracao_s": time.perf_counter() - inicio}
+    raise RuntimeError("A análise terminou sem resultado.")
 
 st.set_page_config(page_title="Análise de Risco Jurídico", layout="wide")
 st.title("Análise de Risco Jurídico")
 
+st.session_state.setdefault("tempo_economizado_s", 0.0)
 cpf_input = st.text_input("Digite o CPF para análise:")
+forcar_atualizacao = st.checkbox("Forçar atualização (ignora os resultados em cache)")
 
+exibido = False
 if st.button("Analisar"):
-    if not cpf_input or len(cpf_input) < 11:
+    cpf = sanitizar_cpf(cpf_input)
+    if len(cpf) < 11:
         st.warning("Por favor, digite um CPF válido.")
     else:
-        with st.spinner("Analisando dados, por favor aguarde..."):
-            try:
-                dados_principais, resumos, parecer = pipeline_analise_cpf(cpf_input)
-                st.subheader("Dados Principais")
-                st.json(dados_principais)
-
-                # Exibir sanções detalhadas com visual super moderno e limpo
-                sancoes = dados_principais.get('Sanções Detalhadas', [])
-                st.subheader("Sanções Detalhadas")
-                css = '''
-                <style>
-                .sanction-card {
-                    background: #fff;
-                    border-radius: 18px;
-                    box-shadow: 0 4px 24px rgba(44, 62, 80, 0.13);
-                    margin: 32px 0 32px 0;
-                    padding: 30px 32px 24px 32px;
-                    position: relative;
-                    transition: box-shadow 0.2s, border 0.2s;
-                    border: 1.5px solid #e3e8f0;
-                    max-width: 700px;
-                    display: flex;
-                    flex-direction: column;
-                    gap: 10px;
-                }
-                .sanction-card:hover {
-                    box-shadow: 0 8px 32px rgba(44, 62, 80, 0.18);
-                    border: 1.5px solid #b3cdf6;
-                }
-                .sanction-title-modern {
-                    font-size: 1.35em;
-                    font-weight: 700;
-                    color: #2563eb;
-                    margin-bottom: 10px;
-                    display: flex;
-                    align-items: center;
-                    gap: 10px;
-                }
-                .sanction-badge {
-                    display: inline-block;
-                    padding: 4px 14px;
-                    border-radius: 16px;
-                    font-size: 0.95em;
-                    font-weight: 600;
-                    color: #fff;
-                    background: #f59e42;
-                    margin-left: 10px;
-                }
-                .sanction-badge.pendente { background: #f59e42; }
-                .sanction-badge.cumprido { background: #22c55e; }
-                .sanction-badge.outro { background: #64748b; }
-                .sanction-field {
-                    margin-bottom: 0px;
-                    font-size: 1.08em;
-                    display: flex;
-                    gap: 8px;
-                }
-                .sanction-label {
-                    font-weight: 600;
-                    color: #374151;
-                    min-width: 170px;
-                    display: inline-block;
-                }
-                .sanction-icon {
-                    font-size: 1.5em;
-                    margin-right: 6px;
-                }
-                .sanction-desc {
-                    background: #f3f6fa;
-                    border-radius: 8px;
-                    padding: 12px 14px;
-                    font-size: 1em;
-                    color: #2d3748;
-                    font-family: 'Fira Mono', 'Consolas', 'Menlo', monospace;
-                    white-space: pre-wrap;
-                    margin-top: 8px;
-                }
-                .sanction-separator {
-                    border-top: 2px dashed #e3e8f0;
-                    margin: 36px 0 0 0;
-                }
-                @media (max-width: 700px) {
-                    .sanction-card { padding: 14px 4vw 12px 4vw; }
-                    .sanction-label { min-width: 110px; }
-                }
-                </style>
-                '''
-                st.markdown(css, unsafe_allow_html=True)
-                if isinstance(sancoes, str):
-                    st.markdown(f"<div class='no-sanction-streamlit'>{highlight_keywords(sancoes)}</div>", unsafe_allow_html=True)
-                else:
-                    for idx, s in enumerate(sancoes, 1):
-                        status = (s.get('Status', '') or '').strip().lower()
-                        badge_class = 'outro'
-                        badge_text = status.capitalize() if status else 'Outro'
-                        if 'pendente' in status:
-                            badge_class = 'pendente'
-                        elif 'cumprido' in status or 'preso' in status:
-                            badge_class = 'cumprido'
-                        icon = '⚖️'
-                        html = f"""
-                        <div class='sanction-card'>
-                            <div class='sanction-title-modern'>{icon} Sanção #{idx}
-                                <span class='sanction-badge {badge_class}'>{badge_text}</span>
-                            </div>
-                            <div class='sanction-field'><span class='sanction-label'>Fonte:</span> {highlight_keywords(s.get('Fonte', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Tipo:</span> {highlight_keywords(s.get('Tipo', ''))} ({highlight_keywords(s.get('Tipo Padronizado', ''))})</div>
-                            <div class='sanction-field'><span class='sanction-label'>Órgão:</span> {highlight_keywords(s.get('Órgão', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Data de Início:</span> {format_date(s.get('Data de Início', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Data de Fim:</span> {format_date(s.get('Data de Fim', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Número do Processo:</span> {s.get('Número do Processo', '')}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Número do Mandado:</span> {s.get('Número do Mandado', '')}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Regime:</span> {highlight_keywords(s.get('Regime', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Tempo de Pena:</span> {highlight_keywords(s.get('Tempo de Pena', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Recaptura:</span> {highlight_keywords(s.get('Recaptura', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Nome na Lista:</span> {highlight_keywords(s.get('Nome na Lista', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Data de Nascimento:</span> {format_date(s.get('Data de Nascimento', ''))}</div>
-                            <div class='sanction-field'><span class='sanction-label'>Descrição da Decisão:</span></div>
-                            <div class='sanction-desc'>{highlight_keywords(s.get('Descrição', ''))}</div>
-                        </div>
-                        <div class='sanction-separator'></div>
-                        """
-                        st.markdown(html, unsafe_allow_html=True)
-
-                st.subheader("Resumos das Decisões")
-                if resumos:
-                    for r in resumos:
-                        st.markdown(f"**Processo:** {r['Processo']}")
-                        st.write(r['Resumo'])
-                        st.markdown("---")
-                else:
-                    st.info("Nenhum resumo de decisão encontrado.")
-                st.subheader("Parecer Final de Risco")
-                st.code(parecer, language="markdown")
-            except Exception as e:
-                st.error(f"Erro ao processar análise: {e}") 
\ No newline at end of file
+        entrada = None if forcar_atualizacao else obter_cache_resultados().obter(cpf)
+        if entrada is not None:
+            st.session_state["tempo_economizado_s"] += entrada["duracao_s"]
+        else:
+            with st.spinner("Analisando dados, por favor aguarde..."):
+                try:
+                    # A pipeline incremental permite exibir cada parte assim que fica pronta
+                    entrada = analisar_com_progresso(cpf, forcar_atualizacao)
+                    obter_cache_resultados().gravar(cpf, entrada)
+                    exibido = True
+                except Exception as e:
+                    st.error(f"Erro ao processar análise: {e}")
+        if entrada is not None:
+            st.session_state["analise_atual"] = entrada
+
+# Outras interações (reruns) reexibem a última análise da sessão sem refazer a pipeline
+entrada = st.session_state.get("analise_atual")
+if entrada is not None and not exibido:
+    st.caption(
+        f"CPF {entrada['cpf']} · resultado em cache há {formatar_idade(time.time() - entrada['concluido_em'])} "
+        f"(a análise levou {entrada['duracao_s']:.1f}s) · tempo economizado nesta sessão: "
+        f"{st.session_state['tempo_economizado_s']:.1f}s"
+    )
+    renderizar_resultado(entrada)
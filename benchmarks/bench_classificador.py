@@ -0,0 +1,98 @@
+"""
+Benchmark do classificador de decisões sobre um corpus grande.
+
+Monta um corpus replicando as decisões de decision_contents.json com variações de caixa
+e acentuação, e compara a cadeia de substrings antiga com o classificador compilado:
+vazão (textos/s) e quantos textos cada um deixa como "Outro". Também mede como cada
+abordagem escala com uma tabela de regras maior (--regras-extras regras literais sintéticas).
+A cadeia antiga não normaliza acentos: é mais rápida, mas a comparação justa de custo é com a
+cadeia de substrings sobre o texto normalizado.
+
+Uso:
+    python benchmarks/bench_classificador.py [--textos 200000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from classificador import REGRAS_PADRAO, ClassificadorDecisoes, classificador_padrao, normalizar  # noqa: E402
+
+VARIACOES_EXTRAS = [
+    "HOMOLOGO O ACORDO DE NAO PERSECUCAO PENAL",
+    "CONDENAÇÃO DO RÉU À PENA DE 2 ANOS",
+    "julgo improcedente a denúncia e absolvo o acusado",
+    "DEFIRO A SUSPENSAO CONDICIONAL DO PROCESSO",
+    "Concedida a suspensão condicional do processo pelo prazo de 2 anos",
+    "DECLARO EXTINTA A PUNIBILIDADE",
+]
+
+
+def classificar_antigo(texto):
+    texto_lower = texto.lower()
+    if "homolog" in texto_lower:
+        return "Homologação"
+    if "conden" in texto_lower:
+        return "Condenação"
+    if "absolv" in texto_lower:
+        return "Absolvição"
+    if "suspensão condicional" in texto_lower:
+        return "Suspensão Condicional"
+    return "Outro"
+
+
+def montar_corpus(quantidade: int, semente: int = 42) -> list:
+    with open(os.path.join(RAIZ, "decision_contents.json"), encoding="utf-8") as f:
+        base = [d["DecisionContent"] for d in json.load(f)] + VARIACOES_EXTRAS
+    aleatorio = random.Random(semente)
+    transformacoes = [str, str.upper, str.lower, str.title]
+    return [aleatorio.choice(transformacoes)(aleatorio.choice(base)) for _ in range(quantidade)]
+
+
+def medir(nome, func, corpus):
+    inicio = time.perf_counter()
+    resultados = [func(t) for t in corpus]
+    duracao = time.perf_counter() - inicio
+    outros = sum(1 for r in resultados if r == "Outro")
+    print(f"{nome:<28} {len(corpus) / duracao:>12,.0f} textos/s   {duracao:6.2f}s   'Outro': {outros}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do classificador de decisões")
+    parser.add_argument("--textos", type=int, default=200000)
+    parser.add_argument("--regras-extras", type=int, default=40)
+    args = parser.parse_args()
+
+    corpus = montar_corpus(args.textos)
+    print(f"Corpus: {len(corpus)} textos, {sum(map(len, corpus)) / 1e6:.1f} M caracteres")
+    antigos = medir("substrings (antigo)", classificar_antigo, corpus)
+    novos = medir("regex compilado (tipo)", classificador_padrao.tipo_principal, corpus)
+    medir("regex compilado (completo)", lambda t: classificador_padrao.classificar(t)["TipoDecisao"], corpus)
+    divergentes = sum(1 for a, n in zip(antigos, novos) if a != n)
+    print(f"Classificações diferentes do método antigo: {divergentes} (variações sem acento antes não reconhecidas)")
+
+    # Custo com uma tabela de regras maior, comparando com a cadeia de substrings sobre o texto já normalizado
+    extras = [(f"Categoria {i}", [f"termo{i:03d}x"]) for i in range(args.regras_extras)]
+    regras = REGRAS_PADRAO + extras
+    literais = [(categoria, padroes[0].replace("\\s+", " ")) for categoria, padroes in regras]
+
+    def cadeia(texto):
+        texto = normalizar(texto)
+        for categoria, literal in literais:
+            if literal in texto:
+                return categoria
+        return "Outro"
+
+    print(f"\nCom {len(regras)} regras:")
+    medir("substrings normalizadas", cadeia, corpus)
+    medir("regex compilado (tipo)", ClassificadorDecisoes(regras).tipo_principal, corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark dos processos compartilhados entre CPFs de um lote (corréus).
+
+Monta um lote em que os CPFs formam grupos de corréus com processos em comum (além dos
+processos próprios de cada um) e executa cada modo de lote com e sem o IndiceProcessos
+(veja indice_processos.py), reportando tempo, chamadas de resumo ao LLM e o relatório do
+índice. Com o índice, as chamadas crescem com os processos distintos do lote, não com o
+número de réus.
+
+Uso:
+    python benchmarks/bench_compartilhados.py --grupos 10 --tamanho-grupo 4 \\
+        --processos-proprios 2 --processos-comuns 5 --modos lote,esteira,batch
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simuladores import ServidorSimulado  # noqa: E402
+
+
+def executar(modo: str, cpfs: list, indice) -> list:
+    import lote
+
+    if modo == "lote":
+        return list(lote.analisar_lote(cpfs, max_bdc=8, max_llm=8, indice=indice))
+    if modo == "esteira":
+        return list(lote.analisar_lote_esteira(cpfs, max_bdc=8, max_llm=32, max_risco=4, indice=indice))
+    import lote_batch
+    return list(lote_batch.analisar_lote_batch(cpfs, indice=indice))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--grupos", type=int, default=10)
+    parser.add_argument("--tamanho-grupo", type=int, default=4, help="CPFs por grupo de corréus")
+    parser.add_argument("--processos-proprios", type=int, default=2)
+    parser.add_argument("--processos-comuns", type=int, default=5, help="Processos em comum por grupo")
+    parser.add_argument("--modos", default="lote,esteira,batch")
+    parser.add_argument("--latencia-llm", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cpfs = [f"{20000000000 + i:011d}" for i in range(args.grupos * args.tamanho_grupo)]
+    grupos = [cpfs[i:i + args.tamanho_grupo] for i in range(0, len(cpfs), args.tamanho_grupo)]
+    with ServidorSimulado(
+        latencia_bdc=0.05, latencia_llm=args.latencia_llm, tokens_por_segundo=2000, jitter=0, latencia_batch=0.2,
+        processos_por_cpf=lambda cpf: args.processos_proprios, grupos_processos=grupos, processos_por_grupo=args.processos_comuns,
+    ) as servidor:
+        servidor.configurar_ambiente()
+        os.environ["OPENAI_BATCH_INTERVALO_S"] = "0.1"
+        from indice_processos import IndiceProcessos
+
+        print(f"{len(cpfs)} CPFs em {len(grupos)} grupos de {args.tamanho_grupo} corréus\n")
+        print(f"{'modo':>8} {'índice':>7} {'tempo':>7} {'chamadas LLM':>13} {'erros':>6}")
+        for modo in args.modos.split(","):
+            for com_indice in (False, True):
+                indice = IndiceProcessos() if com_indice else None
+                antes = servidor.contadores["llm"] + servidor.contadores["llm_batch"]
+                inicio = time.perf_counter()
+                resultados = executar(modo, cpfs, indice)
+                duracao = time.perf_counter() - inicio
+                chamadas = servidor.contadores["llm"] + servidor.contadores["llm_batch"] - antes
+                erros = sum("erro" in r for r in resultados)
+                print(f"{modo:>8} {'sim' if com_indice else 'não':>7} {duracao:>6.2f}s {chamadas:>13} {erros:>6}")
+                if indice is not None:
+                    print(f"{'':>8} {json.dumps(indice.relatorio())}")
+
+
+if __name__ == "__main__":
+    main()
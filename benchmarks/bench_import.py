@@ -0,0 +1,74 @@
+"""
+Benchmark do tempo de `import app`.
+
+Cada rodada importa o módulo em um processo Python novo, sem credenciais no ambiente,
+e mede o tempo de parede do import. Também verifica que nenhuma biblioteca pesada
+(openai, pandas, numpy, matplotlib, google.cloud, requests) foi carregada no import.
+
+Uso:
+    python benchmarks/bench_import.py [--rodadas 10] [--limite-ms 150]
+Sai com código 1 se a mediana ultrapassar o limite ou se alguma biblioteca pesada for importada.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_PESADOS = ["openai", "pandas", "numpy", "matplotlib", "google.cloud", "requests", "dotenv"]
+
+SCRIPT = """
+import json, sys, time
+inicio = time.perf_counter()
+import app
+duracao = time.perf_counter() - inicio
+print(json.dumps({"duracao_s": duracao, "modulos": sorted(sys.modules)}))
+"""
+
+
+def medir_import() -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "BIGDATA_TOKEN_ID", "BIGDATA_TOKEN_HASH")}
+    saida = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=RAIZ,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rodadas", type=int, default=10)
+    parser.add_argument("--limite-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    duracoes = []
+    carregados = set()
+    for _ in range(args.rodadas):
+        resultado = medir_import()
+        duracoes.append(resultado["duracao_s"] * 1000)
+        for modulo in resultado["modulos"]:
+            for pesado in MODULOS_PESADOS:
+                if modulo == pesado or modulo.startswith(pesado + "."):
+                    carregados.add(pesado)
+
+    mediana = statistics.median(duracoes)
+    print(f"import app: mediana {mediana:.1f} ms, mín {min(duracoes):.1f} ms, máx {max(duracoes):.1f} ms ({args.rodadas} rodadas)")
+    ok = True
+    if carregados:
+        print(f"ERRO: bibliotecas pesadas carregadas no import: {', '.join(sorted(carregados))}")
+        ok = False
+    if mediana > args.limite_ms:
+        print(f"ERRO: mediana acima do limite de {args.limite_ms:.0f} ms")
+        ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
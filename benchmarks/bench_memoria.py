@@ -0,0 +1,86 @@
+"""
+Benchmark de memória da ingestão das respostas da BigDataCorp.
+
+Para cada quantidade de processos por réu, consulta o simulador e interpreta a resposta
+(fetch + parse + extração das decisões) em um processo Python novo, uma vez com o caminho
+atual (response.json() completo) e outra com a ingestão em streaming (BDC_INGESTAO_STREAMING,
+veja ingestao_bdc.py), e reporta o pico de RSS do processo, o acréscimo sobre o RSS após os
+imports, o tempo e o tamanho do payload.
+
+Uso:
+    python benchmarks/bench_memoria.py --tamanhos 100,500,2000 --movimentacoes 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simuladores import ServidorSimulado  # noqa: E402
+
+SCRIPT = """
+import json, resource, sys, time
+import app
+import pandas, ingestao_bdc  # noqa: F401 (fora da medição do acréscimo)
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+inicio = time.perf_counter()
+bdc_data = app.buscar_dados_bdc(sys.argv[1])
+tabelas, dados_principais, kyc = app.interpretar_dados_bdc(bdc_data)
+decisoes = app.decisoes_para_resumo(tabelas)
+duracao = time.perf_counter() - inicio
+pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+cliente = app.obter_cliente_bdc()
+print(json.dumps({
+    "pico_mb": pico / 1024,
+    "acrescimo_mb": (pico - base) / 1024,
+    "duracao_s": duracao,
+    "processos": len(tabelas["processos"]),
+    "decisoes": len(decisoes),
+}))
+"""
+
+
+def medir(cpf: str, streaming: bool) -> dict:
+    env = dict(os.environ)
+    env.pop("BDC_INGESTAO_STREAMING", None)
+    if streaming:
+        env["BDC_INGESTAO_STREAMING"] = "1"
+    saida = subprocess.run([sys.executable, "-c", SCRIPT, cpf], cwd=RAIZ, env=env, capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tamanhos", default="100,500,2000", help="Processos por réu, separados por vírgula")
+    parser.add_argument("--movimentacoes", type=int, default=20, help="Movimentações (campo não usado) por processo")
+    args = parser.parse_args()
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+
+    try:
+        import ijson  # noqa: F401
+    except ImportError:
+        print("Aviso: ijson não instalado; o modo streaming só reduz a resposta depois de carregá-la inteira.\n")
+
+    cpfs = {f"{90000000000 + n:011d}": n for n in tamanhos}
+    with ServidorSimulado(latencia_bdc=0, latencia_bdc_por_processo=0, movimentacoes_por_processo=args.movimentacoes) as servidor:
+        servidor.processos_por_cpf = cpfs
+        servidor.configurar_ambiente()
+        tamanho_payload = {
+            cpf: len(json.dumps(servidor.resposta_bdc({"q": f"doc{{{cpf}}}"}), ensure_ascii=False).encode("utf-8"))
+            for cpf in cpfs
+        }
+        print(f"{'processos':>9} {'payload':>10} {'modo':>10} {'pico RSS':>10} {'acréscimo':>10} {'tempo':>8}")
+        for cpf, n in cpfs.items():
+            for streaming in (False, True):
+                r = medir(cpf, streaming)
+                print(
+                    f"{n:>9} {tamanho_payload[cpf] / 2**20:>8.1f}MB {'streaming' if streaming else 'atual':>10} "
+                    f"{r['pico_mb']:>8.1f}MB {r['acrescimo_mb']:>8.1f}MB {r['duracao_s']:>7.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark da correspondência de nomes do É Réu (correspondencia_nomes.py).
+
+Para cada réu sintético monta um processo com muitas partes: uma variação do nome do réu
+(exata, sem acentos, abreviada, sem nome do meio, com erro de digitação no último nome, com
+um sufixo JUNIOR só no nome da parte, que a regra antiga e a nova aceitam), nomes aleatórios
+e homônimos parciais difíceis: mesmo primeiro e último nome com outro nome do meio, outro
+primeiro nome com o mesmo sobrenome, a variante de gênero ou próxima do primeiro nome (MARIA /
+MARIO, PAULO / PAULA, LUCAS / LÚCIA) e um sobrenome que começa pelo do réu (SILVA / SILVANO).
+Compara o teste antigo por substring (nome do réu em maiúsculas contido no nome da parte,
+normalizando o nome do réu a cada parte), a mesma similaridade aproximada calculada parte a
+parte, sem índice, e o IndiceNomes: acertos por tipo de variação, falsos positivos e custo
+por processo. O custo é medido sem a memória de tokens_nome (nomes nunca vistos); com só 14
+primeiros nomes sintéticos, cerca de um décimo das partes é candidata no índice, bem mais que
+em processos reais.
+
+Uso:
+    python benchmarks/bench_nomes.py --reus 300 --partes 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from correspondencia_nomes import IndiceNomes, limiar_padrao, similaridade_nomes, tokens_nome  # noqa: E402
+
+PRENOMES = ["JOSÉ", "JOÃO", "ANTÔNIO", "MARIA", "ANA", "FRANCISCO", "LUÍS", "MÁRCIO", "SÉRGIO", "CONCEIÇÃO", "FÁBIO", "JÚLIA", "PAULO", "LUCAS"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "CONCEIÇÃO", "ASSUNÇÃO", "ARAÚJO", "GONÇALVES", "FERREIRA", "LIMA", "GOMES", "RIBEIRO", "BRANDÃO"]
+PARTICULAS = ["DA", "DE", "DOS", ""]
+SEM_ACENTO = str.maketrans("ÁÂÃÉÊÍÓÔÕÚÇ", "AAAEEIOOOUC")
+VARIANTES_PRENOME = {
+    "JOSÉ": "JOSEFA", "JOÃO": "JOANA", "ANTÔNIO": "ANTÔNIA", "MARIA": "MARIO", "ANA": "ANO", "FRANCISCO": "FRANCISCA",
+    "LUÍS": "LUÍSA", "MÁRCIO": "MÁRCIA", "SÉRGIO": "SÉRGIA", "CONCEIÇÃO": "CONCEPÇÃO", "FÁBIO": "FÁBIA", "JÚLIA": "JÚLIO",
+    "PAULO": "PAULA", "LUCAS": "LÚCIA",
+}
+SOBRENOMES_COM_PREFIXO = {"SILVA": "SILVANO", "SANTOS": "SANTOSO", "SOUZA": "SOUZANETO", "LIMA": "LIMAS", "GOMES": "GOMESIO"}
+
+
+def gerar_nome(aleatorio: random.Random) -> list:
+    prenome = aleatorio.choice(PRENOMES)
+    meio = aleatorio.sample([n for n in PRENOMES + SOBRENOMES if n != prenome], aleatorio.randint(1, 2))
+    particula = aleatorio.choice(PARTICULAS)
+    ultimo = aleatorio.choice([s for s in SOBRENOMES if s not in meio])
+    return [prenome, *meio, *([particula] if particula else []), ultimo]
+
+
+def erro_digitacao(palavra: str, aleatorio: random.Random) -> str:
+    i = aleatorio.randrange(1, len(palavra))
+    return palavra[:i] + aleatorio.choice("AEIOUSZ") + palavra[i + 1:]
+
+
+VARIACOES = {
+    "exata": lambda n, a: " ".join(n),
+    "sem_acento": lambda n, a: " ".join(n).translate(SEM_ACENTO),
+    "caixa_mista": lambda n, a: " ".join(n).title(),
+    "abreviada": lambda n, a: " ".join([n[0], *(p[0] + "." for p in n[1:-1] if len(p) > 3), n[-1]]),
+    "sem_nome_do_meio": lambda n, a: " ".join([n[0], n[-1]]),
+    "erro_digitacao": lambda n, a: " ".join([n[0], *n[1:-1], erro_digitacao(n[-1], a)]),
+    "sufixo_na_parte": lambda n, a: " ".join(n) + " JUNIOR",
+}
+
+
+def homonimos(nome: list, aleatorio: random.Random) -> dict:
+    outro_meio = aleatorio.choice([p for p in PRENOMES if p not in nome])
+    return {
+        "outro_nome_do_meio": f"{nome[0]} {outro_meio} {nome[-1]}",
+        "outro_prenome": " ".join([aleatorio.choice([p for p in PRENOMES if p != nome[0]]), *nome[1:]]),
+        "variante_prenome": " ".join([VARIANTES_PRENOME[nome[0]], *nome[1:]]),
+        "sobrenome_prefixo": " ".join([*nome[:-1], SOBRENOMES_COM_PREFIXO.get(nome[-1], nome[-1] + "NO")]),
+    }
+
+
+def corresponde_antigo(nome_reu: str, partes: list) -> list:
+    # Teste original: o nome do réu é normalizado de novo para cada parte
+    return [nome_reu.strip().upper() in (parte or "").strip().upper() for parte in partes]
+
+
+def corresponde_sem_indice(nome_reu: str, partes: list, limiar: float) -> list:
+    return [similaridade_nomes(nome_reu, parte) >= limiar for parte in partes]
+
+
+METODOS = ("antigo", "sem_indice", "indice")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reus", type=int, default=300)
+    parser.add_argument("--partes", type=int, default=500, help="Partes por processo")
+    parser.add_argument("--limiar", type=float, default=None, help="Padrão: NOME_LIMIAR_SIMILARIDADE (0.85)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    limiar = limiar_padrao() if args.limiar is None else args.limiar
+    aleatorio = random.Random(args.semente)
+
+    acertos = {m: {v: 0 for v in VARIACOES} for m in METODOS}
+    falsos = {m: {} for m in METODOS}
+    tempos = dict.fromkeys(METODOS, 0.0)
+    total_falsos_aleatorios = dict.fromkeys(METODOS, 0)
+    for _ in range(args.reus):
+        nome = gerar_nome(aleatorio)
+        nome_reu = " ".join(nome)
+        variacoes = {v: f(nome, aleatorio) for v, f in VARIACOES.items()}
+        dificeis = homonimos(nome, aleatorio)
+        aleatorios = []
+        while len(aleatorios) < args.partes - len(variacoes) - len(dificeis):
+            candidato = " ".join(gerar_nome(aleatorio))
+            if candidato.split()[0] != nome[0] or candidato.split()[-1] != nome[-1]:
+                aleatorios.append(candidato)
+        partes = [*variacoes.values(), *dificeis.values(), *aleatorios]
+        rotulos = [*variacoes, *dificeis, *["aleatorio"] * len(aleatorios)]
+        ordem = list(range(len(partes)))
+        aleatorio.shuffle(ordem)
+        partes = [partes[i] for i in ordem]
+        rotulos = [rotulos[i] for i in ordem]
+
+        resultados = {}
+        for metodo, executar in (
+            ("antigo", lambda: corresponde_antigo(nome_reu, partes)),
+            ("sem_indice", lambda: corresponde_sem_indice(nome_reu, partes, limiar)),
+            ("indice", lambda: IndiceNomes(partes).correspondencias(nome_reu, limiar)),
+        ):
+            # Sem aproveitar os nomes já separados em tokens por outro método ou réu
+            tokens_nome.cache_clear()
+            inicio = time.perf_counter()
+            resultados[metodo] = executar()
+            tempos[metodo] += time.perf_counter() - inicio
+
+        for metodo, resultado in resultados.items():
+            for rotulo, casou in zip(rotulos, resultado):
+                if rotulo in VARIACOES:
+                    acertos[metodo][rotulo] += casou
+                elif rotulo == "aleatorio":
+                    total_falsos_aleatorios[metodo] += casou
+                else:
+                    falsos[metodo][rotulo] = falsos[metodo].get(rotulo, 0) + casou
+
+    print(f"{args.reus} réus, {args.partes} partes por processo, limiar {limiar}\n")
+    print(f"{'':>22} {'antigo':>10} {'sem índice':>10} {'índice':>10}")
+    print("Réu reconhecido (de %d):" % args.reus)
+    for variacao in VARIACOES:
+        print(f"  {variacao:>20}" + "".join(f" {acertos[m][variacao]:>10}" for m in METODOS))
+    print("Falsos positivos:")
+    for rotulo in homonimos([PRENOMES[0], SOBRENOMES[0]], random.Random(0)):
+        print(f"  {rotulo:>20}" + "".join(f" {falsos[m].get(rotulo, 0):>10}" for m in METODOS))
+    print(f"  {'nomes aleatórios':>20}" + "".join(f" {total_falsos_aleatorios[m]:>10}" for m in METODOS))
+    print("Custo por processo:")
+    print(f"  {'ms':>20}" + "".join(f" {1000 * tempos[m] / args.reus:>10.3f}" for m in METODOS))
+
+
+if __name__ == "__main__":
+    main()
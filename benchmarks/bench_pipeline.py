@@ -0,0 +1,136 @@
+"""
+Benchmark ponta a ponta da pipeline contra os simuladores locais (sem credenciais).
+
+1. Escala por tamanho: para cada quantidade de processos por réu (ex.: 1 a 500), executa a
+   pipeline etapa por etapa e reporta p50/p95/p99 de cada etapa (fetch, parse,
+   extrair_decisoes, resumos, risco).
+2. Vazão por concorrência: para cada nível de concorrência, executa um lote de CPFs com
+   lote.analisar_lote e reporta CPFs/s e percentis da duração por CPF.
+
+Uso:
+    python benchmarks/bench_pipeline.py --tamanhos 1,10,100,500 --concorrencias 1,4,16 \\
+        --latencia-bdc 0.2 --latencia-llm 0.4 [--gravacoes diretorio_com_<CPF>.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simuladores import ServidorSimulado  # noqa: E402
+
+ETAPAS = ["fetch", "parse", "extrair_decisoes", "resumos", "risco"]
+
+
+def percentis(valores: list) -> dict:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    def p(q):
+        return ordenados[min(len(ordenados) - 1, int(round(q / 100 * (len(ordenados) - 1))))]
+    return {"p50": p(50), "p95": p(95), "p99": p(99)}
+
+
+def executar_etapas(app, cpf: str) -> dict:
+    """
+    Executa a pipeline de um CPF etapa por etapa, retornando a duração (s) de cada uma.
+    """
+    duracoes = {}
+    inicio = time.perf_counter()
+    bdc_data = app.buscar_dados_bdc(cpf)
+    duracoes["fetch"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    tabelas, kyc = app.parsear_resultado_bdc(bdc_data)
+    dados_principais = app.montar_dados_principais(tabelas)
+    duracoes["parse"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    decisoes = app.decisoes_para_resumo(tabelas)
+    duracoes["extrair_decisoes"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    textos = app.montar_textos_decisao(decisoes, kyc)
+    resultados = app.agente_resumo.run_many([{"decisao": t} for t in textos], max_concurrency=int(app.obter_config('MAX_RESUMOS_PARALELOS', '8')))
+    resumos = [{"Processo": d["Número"], "Resumo": r} for d, r in zip(decisoes, resultados)]
+    duracoes["resumos"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    app.agente_risco.run(dados=dados_principais, resumos=resumos)
+    duracoes["risco"] = time.perf_counter() - inicio
+    return duracoes
+
+
+def bench_tamanhos(app, servidor, tamanhos, repeticoes):
+    print("\n== Escala por quantidade de processos (segundos) ==")
+    print(f"{'processos':>9}  " + "  ".join(f"{e:>26}" for e in ETAPAS))
+    print(f"{'':>9}  " + "  ".join(f"{'p50 / p95 / p99':>26}" for _ in ETAPAS))
+    for tamanho in tamanhos:
+        cpfs = [f"9{tamanho:05d}{i:05d}" for i in range(repeticoes)]
+        servidor.processos_por_cpf = {cpf: tamanho for cpf in cpfs}
+        medicoes = {e: [] for e in ETAPAS}
+        for cpf in cpfs:
+            for etapa, duracao in executar_etapas(app, cpf).items():
+                medicoes[etapa].append(duracao)
+        colunas = []
+        for etapa in ETAPAS:
+            p = percentis(medicoes[etapa])
+            colunas.append(f"{p['p50']:8.3f} /{p['p95']:8.3f} /{p['p99']:8.3f}")
+        print(f"{tamanho:>9}  " + "  ".join(f"{c:>26}" for c in colunas))
+
+
+def bench_concorrencia(servidor, concorrencias, cpfs_por_nivel, processos):
+    from lote import analisar_lote, EstatisticasLote
+
+    print(f"\n== Vazão por concorrência ({cpfs_por_nivel} CPFs, {processos} processos cada) ==")
+    for nivel in concorrencias:
+        cpfs = [f"8{nivel:04d}{i:06d}" for i in range(cpfs_por_nivel)]
+        servidor.processos_por_cpf = {cpf: processos for cpf in cpfs}
+        estatisticas = EstatisticasLote()
+        inicio = time.perf_counter()
+        duracoes = [r["duracao_s"] for r in analisar_lote(cpfs, max_bdc=nivel, max_llm=nivel, estatisticas=estatisticas) if "duracao_s" in r]
+        decorrido = time.perf_counter() - inicio
+        p = percentis(duracoes)
+        print(
+            f"concorrência {nivel:>3}: {len(duracoes) / decorrido:6.2f} CPFs/s  "
+            f"duração por CPF p50 {p['p50']:.2f}s  p95 {p['p95']:.2f}s  p99 {p['p99']:.2f}s"
+        )
+        for etapa, dados in estatisticas.relatorio()["etapas"].items():
+            print(f"    {etapa:<12} {dados['vazao_por_s']:6.2f}/s  latência média {dados['latencia_media_s']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da pipeline com BigDataCorp e OpenAI simuladas")
+    parser.add_argument("--tamanhos", default="1,10,50,100,250,500")
+    parser.add_argument("--repeticoes", type=int, default=5, help="CPFs medidos por tamanho")
+    parser.add_argument("--concorrencias", default="1,4,16")
+    parser.add_argument("--cpfs-por-nivel", type=int, default=32)
+    parser.add_argument("--processos-lote", type=int, default=10, help="processos por CPF no teste de vazão")
+    parser.add_argument("--latencia-bdc", type=float, default=0.2)
+    parser.add_argument("--latencia-llm", type=float, default=0.4)
+    parser.add_argument("--tokens-por-segundo", type=float, default=400)
+    parser.add_argument("--gravacoes", help="diretório com respostas gravadas da BigDataCorp (<CPF>.json)")
+    args = parser.parse_args()
+
+    with ServidorSimulado(
+        latencia_bdc=args.latencia_bdc,
+        latencia_llm=args.latencia_llm,
+        tokens_por_segundo=args.tokens_por_segundo,
+        diretorio_gravacoes=args.gravacoes,
+    ) as servidor:
+        servidor.configurar_ambiente()
+        import app
+
+        bench_tamanhos(app, servidor, [int(t) for t in args.tamanhos.split(",")], args.repeticoes)
+        bench_concorrencia(servidor, [int(c) for c in args.concorrencias.split(",")], args.cpfs_por_nivel, args.processos_lote)
+        print(f"\nRequisições atendidas pelo simulador: {servidor.contadores}")
+        import telemetria
+        print("Tokens de LLM (telemetria): " + json.dumps(telemetria.resumo()["tokens"]))
+
+
+if __name__ == "__main__":
+    main()
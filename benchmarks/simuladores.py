@@ -0,0 +1,471 @@
+"""
+Simuladores locais da BigDataCorp e da OpenAI para medir a pipeline sem credenciais.
+
+ServidorSimulado sobe um único servidor HTTP em 127.0.0.1 que atende:
+- POST /pessoas: resposta no formato da BigDataCorp, gravada (arquivo <CPF>.json em um
+  diretório) ou sintética (gerar_pessoa, mais os processos em comum dos grupos de corréus
+  em grupos_processos), com latência configurável;
+- POST /v1/chat/completions: API compatível com a OpenAI (inclusive stream=True), com
+  latência base mais um tempo proporcional aos tokens gerados;
+- Batch API da OpenAI (POST /v1/files, POST /v1/batches, GET /v1/batches/<id> e
+  GET /v1/files/<id>/content): cada batch conclui latencia_batch segundos após a criação.
+
+Uso típico:
+    with ServidorSimulado(latencia_bdc=0.2, latencia_llm=0.4) as servidor:
+        servidor.configurar_ambiente()   # aponta app para o simulador
+        ...
+"""
+import json
+import os
+from email.parser import BytesParser
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NOMES = ["MARIA", "JOSE", "ANA", "JOAO", "ANTONIO", "FRANCISCA", "CARLOS", "PAULO", "LUCAS", "JULIANA"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES", "PEREIRA", "LIMA", "GOMES"]
+DECISOES = [
+    "JULGO PROCEDENTE A PRETENSAO PUNITIVA ESTATAL E CONDENO {nome} NAS PENAS DO ARTIGO 33, CAPUT, DA LEI N 11.343/06",
+    "JULGADO PROCEDENTE O PEDIDO",
+    "DECLARO FINDA A INSTRUCAO.",
+    "HOMOLOGO O ACORDO DE NAO PERSECUCAO PENAL CELEBRADO ENTRE O MINISTERIO PUBLICO E {nome}",
+    "JULGO IMPROCEDENTE A DENUNCIA E ABSOLVO {nome}, COM FUNDAMENTO NO ART. 386, VII, DO CPP",
+    "DEFIRO A SUSPENSAO CONDICIONAL DO PROCESSO PELO PRAZO DE 2 ANOS",
+    "CONDENO A RE NAS CUSTAS, NOS TERMOS DO ART. 804.",
+]
+
+
+def gerar_pessoa(cpf: str, processos: int, semente: int = None) -> dict:
+    """
+    Gera um item de Result sintético com `processos` processos criminais, cada um com
+    algumas partes e decisões, e um histórico de sanções proporcional.
+    """
+    aleatorio = random.Random(semente if semente is not None else cpf)
+    nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+    lawsuits = []
+    for i in range(processos):
+        numero = f"{aleatorio.randrange(10**19):020d}"
+        partes = [{"Name": nome, "Type": "DEFENDANT", "PartyDetails": {"SpecificType": "RÉU"}}]
+        for _ in range(aleatorio.randint(1, 6)):
+            partes.append({
+                "Name": f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}",
+                "Type": aleatorio.choice(["DEFENDANT", "AUTHOR", "LAWYER", "OTHER"]),
+                "PartyDetails": {},
+            })
+        decisoes = []
+        for _ in range(aleatorio.randint(1, 4)):
+            texto = aleatorio.choice(DECISOES).format(nome=nome)
+            decisoes.append({"DecisionContent": texto, "DecisionDate": f"20{aleatorio.randint(10, 24)}-{aleatorio.randint(1, 12):02d}-01T00:00:00"})
+        lawsuits.append({
+            "CaseNumber": numero,
+            "Type": "ACAO PENAL",
+            "CourtType": "CRIMINAL",
+            "MainSubject": "TRAFICO DE DROGAS E CONDUTAS AFINS",
+            "CourtName": "TJRJ",
+            "CourtDistrict": "RIO DE JANEIRO",
+            "Status": aleatorio.choice(["ATIVO", "ARQUIVADO", "BAIXADO"]),
+            "FilingDate": f"20{aleatorio.randint(10, 24)}-01-01T00:00:00",
+            "Content": "PROCESSO CRIMINAL " * aleatorio.randint(5, 50),
+            "Parties": partes,
+            "Decisions": decisoes,
+        })
+    sancoes = [
+        {
+            "Source": "Conselho Nacional de Justiça",
+            "Type": "arrest warrants",
+            "StandardizedSanctionType": "ARREST WARRANTS",
+            "StartDate": "2019-01-01T00:00:00",
+            "EndDate": "0001-01-01T00:00:00",
+            "Details": {"Status": aleatorio.choice(["Pendente de Cumprimento", "Cumprido"]), "Decision": "Mandado de prisão"},
+        }
+        for _ in range(processos // 10)
+    ]
+    return {
+        "BasicData": {"Name": nome, "TaxIdNumber": cpf, "Age": aleatorio.randint(18, 80), "TaxIdStatus": "REGULAR"},
+        "KycData": {"IsCurrentlySanctioned": bool(sancoes), "IsCurrentlyPEP": False, "LastSanctionDate": "2019-01-01T00:00:00" if sancoes else None, "SanctionsHistory": sancoes},
+        "Processes": {"TotalLawsuits": processos, "Lawsuits": lawsuits},
+    }
+
+
+def nome_sintetico(cpf: str) -> str:
+    # O mesmo nome que gerar_pessoa sorteia para o CPF
+    aleatorio = random.Random(cpf)
+    return f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+
+
+def gerar_processos_compartilhados(grupo: int, cpfs: list, processos: int) -> list:
+    """
+    Processos criminais em que todos os CPFs do grupo são réus (corréus), com as mesmas
+    decisões para todos.
+    """
+    aleatorio = random.Random(f"grupo-{grupo}")
+    nomes = [nome_sintetico(cpf) for cpf in cpfs]
+    lawsuits = []
+    for _ in range(processos):
+        decisoes = [
+            {
+                "DecisionContent": aleatorio.choice(DECISOES).format(nome=" E ".join(nomes)),
+                "DecisionDate": f"20{aleatorio.randint(10, 24)}-{aleatorio.randint(1, 12):02d}-01T00:00:00",
+            }
+            for _ in range(aleatorio.randint(1, 4))
+        ]
+        lawsuits.append({
+            "CaseNumber": f"{aleatorio.randrange(10**19):020d}",
+            "Type": "ACAO PENAL",
+            "CourtType": "CRIMINAL",
+            "MainSubject": "ASSOCIACAO PARA O TRAFICO",
+            "CourtName": "TJRJ",
+            "CourtDistrict": "RIO DE JANEIRO",
+            "Status": aleatorio.choice(["ATIVO", "ARQUIVADO"]),
+            "FilingDate": f"20{aleatorio.randint(10, 24)}-01-01T00:00:00",
+            "Parties": [{"Name": nome, "Type": "DEFENDANT", "PartyDetails": {"SpecificType": "RÉU"}} for nome in nomes]
+            + [{"Name": "MINISTERIO PUBLICO", "Type": "AUTHOR", "PartyDetails": {}}],
+            "Decisions": decisoes,
+        })
+    return lawsuits
+
+
+class ServidorSimulado:
+    def __init__(
+        self,
+        latencia_bdc: float = 0.2,
+        latencia_bdc_por_processo: float = 0.001,
+        latencia_llm: float = 0.4,
+        tokens_por_segundo: float = 200,
+        processos_por_cpf=None,
+        diretorio_gravacoes: str = None,
+        jitter: float = 0.2,
+        latencia_batch: float = 1.0,
+        movimentacoes_por_processo: int = 0,
+        grupos_processos: list = None,
+        processos_por_grupo: int = 5,
+    ):
+        self.latencia_bdc = latencia_bdc
+        self.latencia_bdc_por_processo = latencia_bdc_por_processo
+        self.latencia_llm = latencia_llm
+        self.tokens_por_segundo = tokens_por_segundo
+        # Quantidade de processos por CPF: dict, função cpf -> int ou None (10 para todos)
+        self.processos_por_cpf = processos_por_cpf
+        self.diretorio_gravacoes = diretorio_gravacoes
+        self.jitter = jitter
+        self.latencia_batch = latencia_batch
+        # Movimentações (campo Updates, não usado pela pipeline) por processo sintético, para
+        # aproximar o volume das respostas reais
+        self.movimentacoes_por_processo = movimentacoes_por_processo
+        # Grupos de CPFs (listas) que são corréus em processos_por_grupo processos em comum
+        self.grupos_processos = grupos_processos or []
+        self.processos_por_grupo = processos_por_grupo
+        # custom_ids que o batch simulado devolve com erro (ex.: lambda custom_id: ...)
+        self.falhar_no_batch = None
+        self.contadores = {"bdc": 0, "llm": 0, "batches": 0, "llm_batch": 0}
+        self.arquivos = {}
+        self.batches = {}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    # ---- configuração ----
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_port}"
+
+    def configurar_ambiente(self):
+        """
+        Aponta app para o simulador e desativa os caches, para que toda chamada chegue ao servidor.
+        """
+        os.environ.update({
+            "OPENAI_API_KEY": "simulador",
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "BIGDATA_TOKEN_ID": "simulador",
+            "BIGDATA_TOKEN_HASH": "simulador",
+            "BDC_URL_PESSOAS": f"{self.url}/pessoas",
+            "BDC_QPS": "0",
+            "CACHE_LLM_DESATIVADO": "1",
+            "CACHE_BDC_DESATIVADO": "1",
+        })
+
+    def _espera(self, segundos: float):
+        if segundos > 0:
+            time.sleep(segundos * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _quantidade_processos(self, cpf: str) -> int:
+        if callable(self.processos_por_cpf):
+            return self.processos_por_cpf(cpf)
+        if isinstance(self.processos_por_cpf, dict):
+            return self.processos_por_cpf.get(cpf, 10)
+        return 10
+
+    def resposta_bdc(self, payload: dict) -> dict:
+        resultados = []
+        # Aceita um ou vários documentos: doc{123} ou doc{123,456}
+        cpfs = [d for grupo in re.findall(r"doc\{([\d,\s]+)\}", payload.get("q", "")) for d in re.findall(r"\d+", grupo)]
+        for cpf in cpfs:
+            gravacao = os.path.join(self.diretorio_gravacoes, f"{cpf}.json") if self.diretorio_gravacoes else None
+            if gravacao and os.path.exists(gravacao):
+                with open(gravacao, encoding="utf-8") as f:
+                    resultados.extend(json.load(f).get("Result", []))
+            else:
+                pessoa = gerar_pessoa(cpf, self._quantidade_processos(cpf))
+                for grupo, membros in enumerate(self.grupos_processos):
+                    if cpf in membros:
+                        compartilhados = gerar_processos_compartilhados(grupo, membros, self.processos_por_grupo)
+                        pessoa["Processes"]["Lawsuits"].extend(compartilhados)
+                        pessoa["Processes"]["TotalLawsuits"] += len(compartilhados)
+                for i, processo in enumerate(pessoa["Processes"]["Lawsuits"]):
+                    processo["Updates"] = [
+                        {"Content": f"JUNTADA DE PETICAO E CONCLUSAO AO JUIZ ({i}/{j}) " * 8, "PublishDate": "2023-05-01T00:00:00"}
+                        for j in range(self.movimentacoes_por_processo)
+                    ]
+                resultados.append(pessoa)
+        return {"Result": resultados, "QueryId": str(uuid.uuid4()), "Status": {}}
+
+    def resposta_llm(self, payload: dict) -> tuple:
+        """
+        Retorna (texto, tokens_prompt, tokens_resposta) de uma conclusão simulada.
+        """
+        prompt = " ".join(str(m.get("content", "")) for m in payload.get("messages", []))
+        tokens_prompt = max(1, len(prompt) // 4)
+        tokens_resposta = min(int(payload.get("max_tokens") or 256), 40 + tokens_prompt // 20)
+        palavras = ["Resumo", "simulado:", "risco"] + ["análise"] * max(0, tokens_resposta - 3)
+        return " ".join(palavras[:tokens_resposta]), tokens_prompt, tokens_resposta
+
+    # ---- ciclo de vida ----
+    def iniciar(self):
+        simulador = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, corpo: dict):
+                dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _ler_json(self) -> dict:
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(tamanho) or b"{}")
+
+            def do_POST(self):
+                caminho = self.path.split("?", 1)[0]
+                if caminho.endswith("/pessoas"):
+                    payload = self._ler_json()
+                    with simulador._lock:
+                        simulador.contadores["bdc"] += 1
+                    resposta = simulador.resposta_bdc(payload)
+                    processos = sum(len(r.get("Processes", {}).get("Lawsuits", [])) for r in resposta["Result"])
+                    simulador._espera(simulador.latencia_bdc + simulador.latencia_bdc_por_processo * processos)
+                    self._json(200, resposta)
+                elif caminho.endswith("/chat/completions"):
+                    payload = self._ler_json()
+                    with simulador._lock:
+                        simulador.contadores["llm"] += 1
+                    texto, tokens_prompt, tokens_resposta = simulador.resposta_llm(payload)
+                    if payload.get("stream"):
+                        self._stream(payload, texto, tokens_prompt, tokens_resposta)
+                    else:
+                        simulador._espera(simulador.latencia_llm + tokens_resposta / simulador.tokens_por_segundo)
+                        self._json(200, conclusao_chat(payload.get("model"), texto, tokens_prompt, tokens_resposta))
+                else:
+                    self._rota_extra("POST", caminho)
+
+            def do_GET(self):
+                self._rota_extra("GET", self.path.split("?", 1)[0])
+
+            def _rota_extra(self, metodo, caminho):
+                rota = simulador.rota_batch(metodo, caminho) or simulador.rotas_extras(metodo, caminho)
+                if rota is None:
+                    self._json(404, {"error": {"message": f"rota desconhecida: {metodo} {caminho}"}})
+                else:
+                    rota(self)
+
+            def _stream(self, payload, texto, tokens_prompt, tokens_resposta):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                simulador._espera(simulador.latencia_llm)
+                identificador = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                intervalo = 1 / simulador.tokens_por_segundo if simulador.tokens_por_segundo else 0
+                for i, palavra in enumerate(texto.split(" ")):
+                    trecho = {
+                        "id": identificador,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": payload.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": palavra if i == 0 else " " + palavra}, "finish_reason": None}],
+                    }
+                    self._chunk(f"data: {json.dumps(trecho, ensure_ascii=False)}\n\n")
+                    time.sleep(intervalo)
+                if (payload.get("stream_options") or {}).get("include_usage"):
+                    uso = conclusao_chat(payload.get("model"), texto, tokens_prompt, tokens_resposta)["usage"]
+                    final = {"id": identificador, "object": "chat.completion.chunk", "created": int(time.time()), "model": payload.get("model"), "choices": [], "usage": uso}
+                    self._chunk(f"data: {json.dumps(final)}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, texto: str):
+                dados = texto.encode("utf-8")
+                self.wfile.write(f"{len(dados):X}\r\n".encode("ascii") + dados + b"\r\n")
+                self.wfile.flush()
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    # ---- Batch API ----
+    def _novo_arquivo(self, conteudo: bytes, nome: str, finalidade: str) -> dict:
+        arquivo = {
+            "id": f"file-{uuid.uuid4().hex[:24]}",
+            "object": "file",
+            "bytes": len(conteudo),
+            "created_at": int(time.time()),
+            "filename": nome,
+            "purpose": finalidade,
+            "status": "processed",
+        }
+        with self._lock:
+            self.arquivos[arquivo["id"]] = (arquivo, conteudo)
+        return arquivo
+
+    def _processar_batch(self, batch: dict):
+        _, entrada = self.arquivos[batch["input_file_id"]]
+        linhas = [json.loads(linha) for linha in entrada.decode("utf-8").splitlines() if linha.strip()]
+        with self._lock:
+            batch.update(status="in_progress", in_progress_at=int(time.time()))
+            batch["request_counts"]["total"] = len(linhas)
+        time.sleep(self.latencia_batch)
+        saidas, erros = [], []
+        for linha in linhas:
+            identificador = f"batch_req_{uuid.uuid4().hex[:12]}"
+            if self.falhar_no_batch and self.falhar_no_batch(linha["custom_id"]):
+                erros.append({"id": identificador, "custom_id": linha["custom_id"], "response": None,
+                              "error": {"code": "simulado", "message": "falha simulada no batch"}})
+                continue
+            texto, tokens_prompt, tokens_resposta = self.resposta_llm(linha["body"])
+            corpo = conclusao_chat(linha["body"].get("model"), texto, tokens_prompt, tokens_resposta)
+            saidas.append({"id": identificador, "custom_id": linha["custom_id"],
+                           "response": {"status_code": 200, "request_id": identificador, "body": corpo}, "error": None})
+        # A Batch API não garante a ordem das linhas de saída
+        random.shuffle(saidas)
+        atualizacao = {"status": "completed", "completed_at": int(time.time())}
+        atualizacao["request_counts"] = {"total": len(linhas), "completed": len(saidas), "failed": len(erros)}
+        if saidas:
+            conteudo = "".join(json.dumps(l, ensure_ascii=False) + "\n" for l in saidas).encode("utf-8")
+            atualizacao["output_file_id"] = self._novo_arquivo(conteudo, "batch_output.jsonl", "batch_output")["id"]
+        if erros:
+            conteudo = "".join(json.dumps(l, ensure_ascii=False) + "\n" for l in erros).encode("utf-8")
+            atualizacao["error_file_id"] = self._novo_arquivo(conteudo, "batch_errors.jsonl", "batch_output")["id"]
+        with self._lock:
+            self.contadores["llm_batch"] += len(linhas)
+            batch.update(atualizacao)
+
+    def rota_batch(self, metodo: str, caminho: str):
+        """
+        Rotas da Batch API simulada; retorna um callable(handler) ou None.
+        """
+        simulador = self
+        partes = caminho.strip("/").split("/")
+        if partes[:1] == ["v1"]:
+            partes = partes[1:]
+
+        if metodo == "POST" and partes == ["files"]:
+            def enviar_arquivo(handler):
+                corpo = handler.rfile.read(int(handler.headers.get("Content-Length") or 0))
+                mensagem = BytesParser().parsebytes(
+                    f"Content-Type: {handler.headers['Content-Type']}\r\n\r\n".encode("latin-1") + corpo
+                )
+                campos = {parte.get_param("name", header="content-disposition"): parte for parte in mensagem.get_payload()}
+                arquivo = campos["file"]
+                handler._json(200, simulador._novo_arquivo(
+                    arquivo.get_payload(decode=True),
+                    arquivo.get_filename() or "lote.jsonl",
+                    campos["purpose"].get_payload(decode=True).decode("utf-8"),
+                ))
+            return enviar_arquivo
+        if metodo == "POST" and partes == ["batches"]:
+            def criar_batch(handler):
+                payload = handler._ler_json()
+                if payload.get("input_file_id") not in simulador.arquivos:
+                    handler._json(404, {"error": {"message": "arquivo de entrada desconhecido"}})
+                    return
+                batch = {
+                    "id": f"batch_{uuid.uuid4().hex[:24]}",
+                    "object": "batch",
+                    "endpoint": payload.get("endpoint"),
+                    "input_file_id": payload["input_file_id"],
+                    "completion_window": payload.get("completion_window", "24h"),
+                    "status": "validating",
+                    "created_at": int(time.time()),
+                    "output_file_id": None,
+                    "error_file_id": None,
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                    "metadata": payload.get("metadata"),
+                }
+                with simulador._lock:
+                    simulador.batches[batch["id"]] = batch
+                    simulador.contadores["batches"] += 1
+                    resposta = dict(batch)
+                threading.Thread(target=simulador._processar_batch, args=(batch,), daemon=True).start()
+                handler._json(200, resposta)
+            return criar_batch
+        if metodo == "GET" and len(partes) == 2 and partes[0] == "batches":
+            def consultar_batch(handler):
+                with simulador._lock:
+                    batch = simulador.batches.get(partes[1])
+                    resposta = json.loads(json.dumps(batch)) if batch else None
+                if resposta is None:
+                    handler._json(404, {"error": {"message": "batch desconhecido"}})
+                else:
+                    handler._json(200, resposta)
+            return consultar_batch
+        if metodo == "GET" and len(partes) == 3 and partes[0] == "files" and partes[2] == "content":
+            def baixar_arquivo(handler):
+                if partes[1] not in simulador.arquivos:
+                    handler._json(404, {"error": {"message": "arquivo desconhecido"}})
+                    return
+                _, conteudo = simulador.arquivos[partes[1]]
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/octet-stream")
+                handler.send_header("Content-Length", str(len(conteudo)))
+                handler.end_headers()
+                handler.wfile.write(conteudo)
+            return baixar_arquivo
+        return None
+
+    def rotas_extras(self, metodo: str, caminho: str):
+        """
+        Ponto de extensão para outras rotas da API simulada; retorna um callable(handler) ou None.
+        """
+        return None
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def conclusao_chat(modelo: str, texto: str, tokens_prompt: int, tokens_resposta: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": modelo,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": tokens_prompt, "completion_tokens": tokens_resposta, "total_tokens": tokens_prompt + tokens_resposta},
+    }
@@ -0,0 +1,271 @@
+"""
+Cliente HTTP reutilizável para a API da BigDataCorp.
+
+Mantém um pool de conexões keep-alive, aplica timeouts de conexão/leitura, repete com
+backoff exponencial respostas 429/5xx e falhas de rede, limita a vazão por token bucket
+(QPS contratado) e registra a latência de cada chamada.
+
+Com streaming=True, o corpo é lido incrementalmente e só os campos usados pela pipeline são
+mantidos (veja ingestao_bdc).
+
+consultar_varios agrupa vários documentos por requisição e separa o Result de volta por
+documento (pelo TaxIdNumber), com falhas tratadas documento a documento.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from telemetria import span
+
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+ERROS_LEITURA = (requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError)
+
+
+class DocumentoAusente(LookupError):
+    """
+    O documento foi consultado, mas não veio no Result da resposta.
+    """
+
+
+def consulta_documentos(documentos: list) -> str:
+    """
+    Valor de "q" para consultar um ou vários documentos na mesma requisição.
+    """
+    return f"doc{{{','.join(documentos)}}}"
+
+
+def _so_digitos(valor) -> str:
+    return "".join(ch for ch in str(valor or "") if ch.isdigit())
+
+
+def separar_por_documento(resposta: dict, documentos: list) -> dict:
+    """
+    Divide uma resposta com vários itens em Result em uma resposta por documento (mesmo formato
+    de uma consulta individual), associando cada item pelo BasicData.TaxIdNumber.
+    Documentos sem item correspondente recebem DocumentoAusente.
+    """
+    pendentes = {_so_digitos(d): d for d in documentos}
+    demais_campos = {k: v for k, v in resposta.items() if k != "Result"}
+    separadas = {}
+    for item in resposta.get("Result") or []:
+        documento = pendentes.pop(_so_digitos((item.get("BasicData") or {}).get("TaxIdNumber")), None)
+        if documento is None and len(documentos) == 1 and not separadas:
+            # Consulta individual sem TaxIdNumber no retorno: o item só pode ser do documento pedido
+            documento = pendentes.pop(_so_digitos(documentos[0]), None)
+        if documento is not None:
+            separadas[documento] = {**demais_campos, "Result": [item]}
+    for documento in pendentes.values():
+        separadas[documento] = DocumentoAusente(f"Documento {documento} não retornado pela BigDataCorp")
+    return separadas
+
+
+class LimitadorTaxa:
+    """
+    Token bucket: libera até `qps` requisições por segundo, com rajadas de até `capacidade`.
+    relogio e dormir substituem time.monotonic e time.sleep (ex.: em testes).
+    """
+    def __init__(self, qps: float, capacidade: float = None, relogio=time.monotonic, dormir=time.sleep):
+        self.qps = qps
+        self.capacidade = capacidade if capacidade is not None else max(1.0, qps)
+        self._relogio = relogio
+        self._dormir = dormir
+        self._tokens = self.capacidade
+        self._ultimo = relogio()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        if not self.qps:
+            return
+        while True:
+            with self._lock:
+                agora = self._relogio()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.qps)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.qps
+            self._dormir(espera)
+
+
+class MetricasChamadas:
+    """
+    Contadores e janela das últimas latências para cálculo de percentis.
+    """
+    def __init__(self, janela: int = 1000):
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=janela)
+        self.chamadas = 0
+        self.erros = 0
+        self.tentativas_extras = 0
+
+    def registrar(self, latencia: float, sucesso: bool, tentativas: int):
+        with self._lock:
+            self.chamadas += 1
+            self.tentativas_extras += tentativas - 1
+            if not sucesso:
+                self.erros += 1
+            self._latencias.append(latencia)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            latencias = sorted(self._latencias)
+        def percentil(p):
+            if not latencias:
+                return 0.0
+            return latencias[min(len(latencias) - 1, int(round(p / 100 * (len(latencias) - 1))))]
+        return {
+            "chamadas": self.chamadas,
+            "erros": self.erros,
+            "tentativas_extras": self.tentativas_extras,
+            "latencia_media_s": sum(latencias) / len(latencias) if latencias else 0.0,
+            "latencia_p50_s": percentil(50),
+            "latencia_p95_s": percentil(95),
+            "latencia_p99_s": percentil(99),
+        }
+
+
+class ClienteBigDataCorp:
+    def __init__(
+        self,
+        token_hash: str,
+        token_id: str,
+        qps: float = 10,
+        timeout_conexao: float = 5,
+        timeout_leitura: float = 60,
+        max_tentativas: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+        tamanho_pool: int = 32,
+        streaming: bool = False,
+        dormir=time.sleep,
+    ):
+        self.token_hash = token_hash
+        self.token_id = token_id
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Lê o corpo em streaming mantendo só os campos usados (veja ingestao_bdc)
+        self.streaming = streaming
+        # Espera do backoff e da limitação de taxa (substituível em testes)
+        self._dormir = dormir
+        self.limitador = LimitadorTaxa(qps, dormir=dormir)
+        self.metricas = MetricasChamadas()
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool, max_retries=0)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.headers.update({
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "AccessToken": token_hash,
+            "TokenId": token_id,
+        })
+
+    def _espera_backoff(self, tentativa: int, resposta=None) -> float:
+        if resposta is not None:
+            retry_after = resposta.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        espera = min(self.backoff_max, self.backoff_base * (2 ** (tentativa - 1)))
+        # jitter evita que workers paralelos repitam todos no mesmo instante
+        return espera * (0.5 + random.random() / 2)
+
+    def post(self, url: str, payload: dict) -> dict:
+        """
+        POST com limitação de taxa, timeouts e novas tentativas; retorna o JSON da resposta.
+        """
+        inicio = time.perf_counter()
+        tentativa = 0
+        with span("bdc.post") as s:
+            try:
+                while True:
+                    tentativa += 1
+                    self.limitador.adquirir()
+                    try:
+                        resposta = self.sessao.post(url, json=payload, timeout=self.timeout, stream=self.streaming)
+                    except (requests.ConnectionError, requests.Timeout):
+                        if tentativa >= self.max_tentativas:
+                            raise
+                        self._dormir(self._espera_backoff(tentativa))
+                        continue
+                    if resposta.status_code in STATUS_REPETIVEIS and tentativa < self.max_tentativas:
+                        resposta.close()
+                        self._dormir(self._espera_backoff(tentativa, resposta))
+                        continue
+                    try:
+                        resposta.raise_for_status()
+                        dados, tamanho = self._ler(resposta)
+                    except ERROS_LEITURA:
+                        # Conexão interrompida no meio do corpo (só ocorre lendo em streaming)
+                        if tentativa >= self.max_tentativas:
+                            raise
+                        self._dormir(self._espera_backoff(tentativa))
+                        continue
+                    finally:
+                        resposta.close()
+                    break
+            except Exception:
+                self.metricas.registrar(time.perf_counter() - inicio, sucesso=False, tentativas=tentativa)
+                s.definir(tentativas=tentativa)
+                raise
+            self.metricas.registrar(time.perf_counter() - inicio, sucesso=True, tentativas=tentativa)
+            s.definir(tentativas=tentativa, status=resposta.status_code, bytes=tamanho, streaming=self.streaming)
+        return dados
+
+    def _ler(self, resposta) -> tuple:
+        # (dados, bytes do corpo); em streaming, só os campos de ingestao_bdc.ESQUEMA
+        if not self.streaming:
+            return resposta.json(), len(resposta.content)
+        from ingestao_bdc import LeitorContado, ler_resposta
+        resposta.raw.decode_content = True
+        leitor = LeitorContado(resposta.raw)
+        return ler_resposta(leitor), leitor.bytes
+
+    def consultar(self, documento: str, url: str, dataset: str) -> dict:
+        payload = {
+            "q": consulta_documentos([documento]),
+            "Datasets": dataset
+        }
+        return self.post(url, payload)
+
+    def consultar_varios(self, documentos: list, url: str, dataset: str, tamanho_lote: int = 50) -> dict:
+        """
+        Consulta vários documentos com até tamanho_lote por requisição. Retorna {documento:
+        resposta} com cada resposta no formato de consultar(), ou a exceção daquele documento.
+        Se uma requisição em lote falhar por inteiro, seus documentos são consultados um a um.
+        """
+        documentos = list(dict.fromkeys(documentos))
+        resultados = {}
+        for inicio in range(0, len(documentos), max(1, tamanho_lote)):
+            grupo = documentos[inicio:inicio + max(1, tamanho_lote)]
+            with span("bdc.lote", documentos=len(grupo)) as s:
+                try:
+                    resposta = self.post(url, {"q": consulta_documentos(grupo), "Datasets": dataset})
+                except Exception as e:
+                    if len(grupo) == 1:
+                        resultados[grupo[0]] = e
+                        continue
+                    s.definir(fallback_individual=True)
+                    for documento in grupo:
+                        try:
+                            resultados[documento] = self.consultar(documento, url, dataset)
+                        except Exception as erro:
+                            resultados[documento] = erro
+                    continue
+                separadas = separar_por_documento(resposta, grupo)
+                s.definir(ausentes=sum(isinstance(r, Exception) for r in separadas.values()))
+                resultados.update(separadas)
+        return resultados
+
+    def fechar(self):
+        self.sessao.close()
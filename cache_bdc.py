@@ -0,0 +1,206 @@
+"""
+Cache em memória das respostas da BigDataCorp, com política de frescor por dataset.
+
+As entradas são indexadas por (documento, dataset, url). Chamadas simultâneas para a mesma
+chave ainda não cacheada são agrupadas: apenas a primeira faz a requisição HTTP e as demais
+aguardam o mesmo resultado.
+
+O cache é LRU e limitado pelo tamanho total das respostas (max_bytes, estimado pelo JSON
+serializado) além do número de entradas: ao passar do limite, as menos usadas recentemente
+saem primeiro. Os modos de lote não gravam no cache (veja app.buscar_dados_bdc).
+"""
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Idade máxima (segundos) aceitável por dataset; consultas com vários datasets usam o menor valor
+POLITICA_FRESCOR_PADRAO = {
+    "basic_data": 7 * 24 * 3600,
+    "processes": 24 * 3600,
+    "kyc": 3600,
+}
+
+
+def separar_datasets(dataset: str) -> list:
+    """
+    Separa uma string de datasets da BigDataCorp nos nomes de cada dataset, ignorando
+    vírgulas dentro de filtros, ex.: "basic_data, kyc.filter(a, b)" -> ["basic_data", "kyc"].
+    """
+    nomes = []
+    profundidade = 0
+    atual = []
+    for ch in dataset:
+        if ch == '(':
+            profundidade += 1
+        elif ch == ')':
+            profundidade -= 1
+        if ch == ',' and profundidade == 0:
+            nomes.append(''.join(atual))
+            atual = []
+        else:
+            atual.append(ch)
+    nomes.append(''.join(atual))
+    return [n.strip().split('.', 1)[0].split('(', 1)[0].strip() for n in nomes if n.strip()]
+
+
+def tamanho_resposta(valor) -> int:
+    """
+    Tamanho aproximado (bytes) de uma resposta: o do JSON serializado.
+    """
+    return len(json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class CacheBDC:
+    def __init__(self, politica: dict = None, max_idade_padrao: float = 3600, max_entradas: int = 1000,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.politica = dict(POLITICA_FRESCOR_PADRAO if politica is None else politica)
+        self.max_idade_padrao = max_idade_padrao
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.agrupadas = 0
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # da menos para a mais recentemente usada
+        self._em_andamento = {}
+
+    @staticmethod
+    def chave(documento: str, dataset: str, url: str) -> tuple:
+        return (documento, re.sub(r'\s+', ' ', dataset).strip(), url)
+
+    def max_idade(self, dataset: str) -> float:
+        idades = [self.politica[nome] for nome in separar_datasets(dataset) if nome in self.politica]
+        return min(idades) if idades else self.max_idade_padrao
+
+    def obter_ou_buscar(self, documento: str, dataset: str, url: str, buscar, forcar: bool = False):
+        """
+        Retorna a resposta cacheada se ainda fresca; caso contrário chama buscar() uma única vez
+        por chave, mesmo com várias threads pedindo o mesmo documento ao mesmo tempo.
+        """
+        chave = self.chave(documento, dataset, url)
+        with self._lock:
+            entrada = None if forcar else self._fresca(chave)
+            if entrada is not None:
+                self.hits += 1
+                return entrada["valor"]
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                self.agrupadas += 1
+                responsavel = False
+            else:
+                self.misses += 1
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+                responsavel = True
+        if not responsavel:
+            return futuro.result()
+        try:
+            valor = buscar()
+            tamanho = tamanho_resposta(valor)
+        except BaseException as e:
+            futuro.set_exception(e)
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            raise
+        with self._lock:
+            self._inserir(chave, valor, dataset, tamanho)
+            self._em_andamento.pop(chave, None)
+        futuro.set_result(valor)
+        return valor
+
+    def _fresca(self, chave: tuple):
+        entrada = self._entradas.get(chave)
+        if entrada is None or time.time() - entrada["obtido_em"] > entrada["max_idade"]:
+            return None
+        self._entradas.move_to_end(chave)
+        return entrada
+
+    def _remover(self, chave: tuple):
+        self.bytes -= self._entradas.pop(chave)["bytes"]
+
+    def _inserir(self, chave: tuple, valor, dataset: str, tamanho: int):
+        if chave in self._entradas:
+            self._remover(chave)
+        if self.max_bytes and tamanho > self.max_bytes:
+            # Resposta maior que o cache inteiro: não é guardada
+            return
+        self._entradas[chave] = {"valor": valor, "obtido_em": time.time(), "max_idade": self.max_idade(dataset), "bytes": tamanho}
+        self.bytes += tamanho
+        while len(self._entradas) > self.max_entradas or (self.max_bytes and self.bytes > self.max_bytes):
+            # A primeira chave é a menos usada recentemente
+            self._remover(next(iter(self._entradas)))
+
+    def obter(self, documento: str, dataset: str, url: str):
+        """
+        Resposta cacheada ainda fresca, ou None (conta como hit/miss). Para consultas em lote,
+        que buscam os ausentes juntos e os registram com gravar().
+        """
+        chave = self.chave(documento, dataset, url)
+        with self._lock:
+            entrada = self._fresca(chave)
+            if entrada is not None:
+                self.hits += 1
+                return entrada["valor"]
+            self.misses += 1
+            return None
+
+    def gravar(self, documento: str, dataset: str, url: str, valor):
+        tamanho = tamanho_resposta(valor)
+        with self._lock:
+            self._inserir(self.chave(documento, dataset, url), valor, dataset, tamanho)
+
+    def entradas(self) -> list:
+        """
+        Lista as entradas cacheadas com idade, validade e se ainda estão frescas.
+        """
+        agora = time.time()
+        with self._lock:
+            return [
+                {
+                    "documento": documento,
+                    "dataset": dataset,
+                    "url": url,
+                    "idade_s": agora - e["obtido_em"],
+                    "max_idade_s": e["max_idade"],
+                    "fresca": agora - e["obtido_em"] <= e["max_idade"],
+                }
+                for (documento, dataset, url), e in self._entradas.items()
+            ]
+
+    def limpar(self, documento: str = None) -> int:
+        """
+        Remove todas as entradas, ou só as de um documento. Retorna quantas foram removidas.
+        """
+        with self._lock:
+            if documento is None:
+                removidas = len(self._entradas)
+                self._entradas.clear()
+                self.bytes = 0
+                return removidas
+            chaves = [c for c in self._entradas if c[0] == documento]
+            for c in chaves:
+                self._remover(c)
+            return len(chaves)
+
+    def expurgar_expirados(self) -> int:
+        agora = time.time()
+        with self._lock:
+            chaves = [c for c, e in self._entradas.items() if agora - e["obtido_em"] > e["max_idade"]]
+            for c in chaves:
+                self._remover(c)
+            return len(chaves)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "agrupadas": self.agrupadas,
+                "em_andamento": len(self._em_andamento),
+            }
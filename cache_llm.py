@@ -0,0 +1,200 @@
+"""
+Cache persistente (SQLite) para saídas de LLM, endereçado por conteúdo.
+
+A chave é o SHA-256 do modelo/template do prompt e dos argumentos da chamada, de modo
+que a mesma decisão resumida com o mesmo prompt nunca é enviada duas vezes à OpenAI.
+Entradas expiram por TTL e, acima de max_entradas, as menos usadas recentemente são removidas.
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from configuracao import obter_config
+
+
+class CacheLLM:
+    def __init__(self, caminho: str = None, ttl: float = None, max_entradas: int = None):
+        # Parâmetros omitidos são lidos de CACHE_LLM_CAMINHO, CACHE_LLM_TTL (segundos) e
+        # CACHE_LLM_MAX_ENTRADAS no primeiro uso, não na construção
+        self.caminho = caminho
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self.gravacoes = 0
+        self.remocoes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        # Limite superior das entradas, contado na abertura e a cada gravação; só quando passa de
+        # max_entradas a tabela é contada de novo (gravações podem substituir entradas existentes
+        # e outros processos podem ter removido algumas)
+        self._entradas = 0
+
+    def _configurar(self):
+        if self.caminho is None:
+            self.caminho = obter_config("CACHE_LLM_CAMINHO", os.path.join(".cache", "themis_llm.sqlite3"))
+        if self.ttl is None:
+            self.ttl = float(obter_config("CACHE_LLM_TTL", str(30 * 24 * 3600)))
+        if self.max_entradas is None:
+            self.max_entradas = int(obter_config("CACHE_LLM_MAX_ENTRADAS", "50000"))
+
+    def _conexao(self) -> sqlite3.Connection:
+        # A conexão é aberta só no primeiro uso, para que importar o módulo não toque o disco
+        if self._conn is None:
+            self._configurar()
+            diretorio = os.path.dirname(self.caminho)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_llm (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_llm_acesso ON cache_llm (ultimo_acesso)")
+            self._entradas = conn.execute("SELECT COUNT(*) FROM cache_llm").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def chave(*partes) -> str:
+        """
+        Gera a chave de conteúdo a partir de qualquer combinação serializável em JSON
+        (modelo, template do prompt, texto da decisão...).
+        """
+        bruto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    def obter(self, chave: str):
+        """
+        Retorna o valor armazenado ou None se ausente/expirado.
+        """
+        agora = time.time()
+        with self._lock:
+            conn = self._conexao()
+            linha = conn.execute("SELECT valor, criado_em FROM cache_llm WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                self.misses += 1
+                return None
+            valor, criado_em = linha
+            if self.ttl and agora - criado_em > self.ttl:
+                conn.execute("DELETE FROM cache_llm WHERE chave = ?", (chave,))
+                self.remocoes += 1
+                self._entradas -= 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE cache_llm SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+            self.hits += 1
+            return json.loads(valor)
+
+    def gravar(self, chave: str, valor):
+        agora = time.time()
+        with self._lock:
+            conn = self._conexao()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_llm (chave, valor, criado_em, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(valor, ensure_ascii=False), agora, agora),
+            )
+            self.gravacoes += 1
+            self._entradas += 1
+            if self.max_entradas and self._entradas > self.max_entradas:
+                self._entradas = conn.execute("SELECT COUNT(*) FROM cache_llm").fetchone()[0]
+                excedente = self._entradas - self.max_entradas
+                if excedente > 0:
+                    conn.execute(
+                        "DELETE FROM cache_llm WHERE chave IN "
+                        "(SELECT chave FROM cache_llm ORDER BY ultimo_acesso ASC LIMIT ?)",
+                        (excedente,),
+                    )
+                    self.remocoes += excedente
+                    self._entradas = self.max_entradas
+
+    def expurgar_expirados(self) -> int:
+        """
+        Remove todas as entradas com TTL vencido e retorna quantas foram apagadas.
+        """
+        if not self.ttl:
+            return 0
+        with self._lock:
+            cursor = self._conexao().execute("DELETE FROM cache_llm WHERE criado_em < ?", (time.time() - self.ttl,))
+            self.remocoes += cursor.rowcount
+            self._entradas -= cursor.rowcount
+            return cursor.rowcount
+
+    def limpar(self):
+        with self._lock:
+            self._conexao().execute("DELETE FROM cache_llm")
+            self._entradas = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            entradas = self._conexao().execute("SELECT COUNT(*) FROM cache_llm").fetchone()[0]
+            consultas = self.hits + self.misses
+            return {
+                "entradas": entradas,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / consultas if consultas else 0.0,
+                "gravacoes": self.gravacoes,
+                "remocoes": self.remocoes,
+            }
+
+    def memoizar(self, func, contexto=None):
+        """
+        Envolve func para consultar o cache antes de executá-la. contexto deve conter tudo o que,
+        além dos argumentos, altera a saída (modelo, template do prompt, parâmetros de amostragem).
+        """
+        assinatura = inspect.signature(func)
+
+        def argumentos(args, kwargs) -> dict:
+            # Chamadas posicionais e nomeadas geram a mesma chave: {parâmetro: valor}
+            ligados = assinatura.bind(*args, **kwargs).arguments
+            chave = {}
+            for nome, valor in ligados.items():
+                if assinatura.parameters[nome].kind is inspect.Parameter.VAR_KEYWORD:
+                    chave.update(valor)
+                else:
+                    chave[nome] = valor
+            return chave
+
+        if inspect.iscoroutinefunction(func):
+            # Versão async: o SQLite (e o lock) são usados em outra thread, sem bloquear o event loop
+            @functools.wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                if obter_config("CACHE_LLM_DESATIVADO"):
+                    return await func(*args, **kwargs)
+                chave = self.chave(func.__qualname__, contexto, argumentos(args, kwargs))
+                valor = await asyncio.to_thread(self.obter, chave)
+                if valor is not None:
+                    return valor
+                valor = await func(*args, **kwargs)
+                if valor is not None:
+                    await asyncio.to_thread(self.gravar, chave, valor)
+                return valor
+            wrapper_async.cache = self
+            return wrapper_async
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if obter_config("CACHE_LLM_DESATIVADO"):
+                return func(*args, **kwargs)
+            chave = self.chave(func.__qualname__, contexto, argumentos(args, kwargs))
+            valor = self.obter(chave)
+            if valor is not None:
+                return valor
+            valor = func(*args, **kwargs)
+            if valor is not None:
+                self.gravar(chave, valor)
+            return valor
+        wrapper.cache = self
+        return wrapper
@@ -0,0 +1,119 @@
+"""
+Classificador de decisões judiciais por regras, com um único regex pré-compilado.
+
+O texto é normalizado (minúsculas, sem acentos) preservando as posições dos caracteres, então
+os trechos encontrados apontam para o texto original. Em classificar, todas as regras viram
+uma única alternação com um grupo nomeado por regra, percorrida uma vez por texto (a regra de
+cada trecho vem de m.lastgroup). tipo_principal só precisa da regra de maior prioridade: testa
+uma regra por vez, em ordem, e para na primeira que casa.
+
+Diferente da antiga cadeia de substrings, o texto é comparado sem acentos (reconhece
+"SUSPENSAO CONDICIONAL", "CONDENACAO"...); isso custa a normalização de cada texto com acentos,
+então o classificador não é mais rápido que a cadeia antiga (veja bench_classificador.py).
+
+A tabela de regras é uma lista ordenada por prioridade de (categoria, [padrões regex]),
+escritos em minúsculas e sem acento. Para incluir uma categoria:
+
+    regras = REGRAS_PADRAO + [("Extinção da Punibilidade", [r"extin\\w* (?:da )?punibilidade"])]
+    classificador = ClassificadorDecisoes(regras)
+"""
+import re
+import unicodedata
+
+REGRAS_PADRAO = [
+    ("Homologação", [r"homolog"]),
+    ("Condenação", [r"conden"]),
+    ("Absolvição", [r"absolv"]),
+    ("Suspensão Condicional", [r"suspensao\s+condicional"]),
+]
+
+CATEGORIA_PADRAO = "Outro"
+
+
+def _tabela_normalizacao() -> dict:
+    # Cada caractere latino vira exatamente um caractere ASCII minúsculo, preservando offsets
+    tabela = {}
+    for codigo in range(0x41, 0x250):
+        ch = chr(codigo)
+        base = unicodedata.normalize("NFKD", ch)[0].lower()
+        if base != ch and len(base) == 1 and base.isascii():
+            tabela[codigo] = base
+    return str.maketrans(tabela)
+
+
+_TABELA = _tabela_normalizacao()
+_NAO_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+def _sem_acentos(m) -> str:
+    return m.group().translate(_TABELA)
+
+
+def normalizar(texto: str) -> str:
+    """
+    Minúsculas e sem acentos, com o mesmo comprimento do texto original.
+    """
+    if texto.isascii():
+        return texto.lower()
+    # Só os trechos não ASCII passam pela tabela; o restante é convertido por lower()
+    return _NAO_ASCII.sub(_sem_acentos, texto).lower()
+
+
+class ClassificadorDecisoes:
+    def __init__(self, regras: list = None, categoria_padrao: str = CATEGORIA_PADRAO):
+        self.regras = list(REGRAS_PADRAO if regras is None else regras)
+        self.categoria_padrao = categoria_padrao
+        self._categorias = [categoria for categoria, _ in self.regras]
+        padroes_regra = ["|".join(f"(?:{p})" for p in padroes) for _, padroes in self.regras]
+        # Um grupo nomeado vazio no fim de cada regra (r0, r1...): m.lastgroup diz qual regra casou
+        # o trecho. No fim, e não envolvendo o padrão, o grupo deixa o re saltar posições pelo
+        # conjunto de primeiros caracteres da alternação
+        self._regex = re.compile("|".join(f"(?:{p})(?P<r{i}>)" for i, p in enumerate(padroes_regra)))
+        self._indice_grupo = {f"r{i}": i for i in range(len(padroes_regra))}
+        # Para tipo_principal, em ordem de prioridade: (categoria, literal, None) para cada padrão
+        # literal, testado com `in`, e (categoria, None, busca) para as regras com regex
+        self._testes = []
+        for (categoria, padroes), padrao in zip(self.regras, padroes_regra):
+            if all(re.escape(p) == p for p in padroes):
+                self._testes.extend((categoria, p, None) for p in padroes)
+            else:
+                self._testes.append((categoria, None, re.compile(padrao).search))
+
+    def classificar(self, texto: str) -> dict:
+        """
+        Retorna {"TipoDecisao", "Categorias", "Ocorrencias"}: a categoria de maior prioridade
+        encontrada, todas as categorias encontradas (em ordem de prioridade) e cada trecho
+        casado com sua posição no texto original.
+        """
+        texto = texto or ""
+        normalizado = normalizar(texto)
+        ocorrencias = []
+        encontradas = set()
+        for m in self._regex.finditer(normalizado):
+            indice = self._indice_grupo[m.lastgroup]
+            encontradas.add(indice)
+            ocorrencias.append({
+                "Categoria": self._categorias[indice],
+                "Inicio": m.start(),
+                "Fim": m.end(),
+                "Trecho": texto[m.start():m.end()],
+            })
+        categorias = [self._categorias[i] for i in sorted(encontradas)]
+        return {
+            "TipoDecisao": categorias[0] if categorias else self.categoria_padrao,
+            "Categorias": categorias,
+            "Ocorrencias": ocorrencias,
+        }
+
+    def tipo_principal(self, texto: str) -> str:
+        """
+        Apenas a categoria de maior prioridade (equivalente ao antigo classificar_tipo_decisao).
+        """
+        normalizado = normalizar(texto or "")
+        for categoria, literal, buscar in self._testes:
+            if (literal in normalizado) if buscar is None else buscar(normalizado):
+                return categoria
+        return self.categoria_padrao
+
+
+classificador_padrao = ClassificadorDecisoes()
@@ -0,0 +1,30 @@
+"""
+Leitura de configuração por variáveis de ambiente, com o .env carregado sob demanda.
+
+Nenhum módulo deve chamar load_dotenv() no import: use obter_config() no momento em que
+o valor é necessário.
+"""
+import os
+import threading
+
+_ambiente_carregado = False
+_lock = threading.Lock()
+
+
+def carregar_ambiente():
+    """
+    Carrega o arquivo .env (uma única vez por processo).
+    """
+    global _ambiente_carregado
+    if _ambiente_carregado:
+        return
+    with _lock:
+        if not _ambiente_carregado:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _ambiente_carregado = True
+
+
+def obter_config(nome: str, padrao: str = None) -> str:
+    carregar_ambiente()
+    return os.getenv(nome, padrao)
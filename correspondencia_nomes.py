@@ -0,0 +1,245 @@
+"""
+Correspondência aproximada entre o nome pesquisado e os nomes das partes de um processo.
+
+O teste antigo de É Réu era uma substring em maiúsculas (nome pesquisado contido no nome da
+parte): perdia variações de acento, abreviações ("JOSE A. SILVA") e nomes do meio omitidos
+("JOSE SILVA" para "JOSÉ ANTÔNIO DA SILVA"). Aqui os nomes viram tokens normalizados
+(minúsculas, sem acentos, sem pontuação e sem partículas como "da"/"dos") e a similaridade
+(0 a 1) compara token a token:
+- o primeiro nome precisa ser igual ou uma inicial (MARIA não corresponde a MARIO);
+- o último nome precisa ser igual, uma inicial ou, em nomes com TAMANHO_MIN_ERRO letras ou
+  mais, ter um erro de digitação (uma letra trocada, a mais, a menos ou duas invertidas).
+  Um nome que é prefixo do outro não é erro de digitação (SILVA não corresponde a SILVANO);
+- os demais tokens da parte são alinhados, em ordem, aos do nome pesquisado;
+- o nome da parte que começa pelo nome pesquisado (a regra antiga) vale 1;
+- sufixos (JUNIOR, FILHO, NETO...): se o nome pesquisado tem um, a parte precisa ter o mesmo.
+  Um sufixo só no nome da parte ("JOSE SANTOS JUNIOR" para "JOSE SANTOS") pode ser a mesma
+  pessoa, como na regra antiga, e só reduz a similaridade (PESO_SUFIXO_PARTE).
+
+IndiceNomes procura o primeiro nome pesquisado (ou a inicial dele), sem acento e sem caixa,
+no texto bruto dos nomes distintos das partes e só normaliza e pontua as partes encontradas;
+tokens_nome guarda os nomes já normalizados (as mesmas partes se repetem entre processos).
+O limiar padrão vem de NOME_LIMIAR_SIMILARIDADE (0.85).
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from configuracao import obter_config
+
+PARTICULAS = frozenset(["da", "de", "do", "das", "dos", "e", "d"])
+SUFIXOS = {"junior": "junior", "jr": "junior", "filho": "filho", "neto": "neto", "sobrinho": "sobrinho"}
+LIMIAR_TOKEN = 0.75
+PESO_INICIAL = 0.9
+PESO_ERRO = 0.85
+PESO_SUFIXO_PARTE = 0.9
+TAMANHO_MIN_ERRO = 6
+_PADRAO_TOKEN = re.compile(r"[a-z0-9]+")
+_IGNORADOS = PARTICULAS | frozenset(SUFIXOS)
+
+
+def normalizar_nome(texto: str) -> str:
+    """
+    Minúsculas, sem acentos (decomposição NFKD) e só com caracteres ASCII.
+    """
+    if texto.isascii():
+        return texto.lower()
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def limiar_padrao() -> float:
+    return float(obter_config("NOME_LIMIAR_SIMILARIDADE", "0.85"))
+
+
+_SEM_SUFIXO = frozenset()
+
+
+def _separar(tokens: list) -> tuple:
+    if _IGNORADOS.isdisjoint(tokens):
+        return tuple(tokens), _SEM_SUFIXO
+    return (
+        tuple(t for t in tokens if t not in _IGNORADOS),
+        frozenset(SUFIXOS[t] for t in tokens if t in SUFIXOS),
+    )
+
+
+@lru_cache(maxsize=65536)
+def tokens_nome(nome) -> tuple:
+    """
+    (tokens, sufixos) do nome normalizado, sem partículas.
+    """
+    if not isinstance(nome, str):
+        return (), _SEM_SUFIXO
+    return _separar(_PADRAO_TOKEN.findall(normalizar_nome(nome)))
+
+
+def _uma_edicao(a: str, b: str) -> bool:
+    # Distância de edição 1: uma letra trocada, a mais ou a menos, ou duas vizinhas invertidas
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return False
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return a[i + 1:] == b[i:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:]
+
+
+@lru_cache(maxsize=65536)
+def similaridade_tokens(a: str, b: str, erro: bool = True) -> float:
+    """
+    1 para tokens iguais, PESO_INICIAL para a inicial do outro e, com erro=True, PESO_ERRO para
+    um erro de digitação em tokens longos que não são prefixo um do outro; senão 0.
+    """
+    if a == b:
+        return 1.0
+    if len(a) == 1 or len(b) == 1:
+        # Abreviação: a inicial vale quase como o nome inteiro
+        return PESO_INICIAL if a[0] == b[0] else 0.0
+    if not erro or min(len(a), len(b)) < TAMANHO_MIN_ERRO or a.startswith(b) or b.startswith(a):
+        return 0.0
+    return PESO_ERRO if _uma_edicao(a, b) else 0.0
+
+
+def similaridade(alvo: tuple, parte: tuple) -> float:
+    """
+    Similaridade entre dois nomes já em tokens_nome.
+    """
+    (tokens_alvo, sufixos_alvo), (tokens_parte, sufixos_parte) = alvo, parte
+    if not tokens_alvo or not tokens_parte or not sufixos_alvo <= sufixos_parte:
+        return 0.0
+    if tokens_parte[:len(tokens_alvo)] == tokens_alvo:
+        pontuacao = 1.0
+    else:
+        primeiro = similaridade_tokens(tokens_parte[0], tokens_alvo[0], erro=False)
+        ultimo = similaridade_tokens(tokens_parte[-1], tokens_alvo[-1])
+        if primeiro < LIMIAR_TOKEN or ultimo < LIMIAR_TOKEN or len(tokens_parte) == 1 or len(tokens_alvo) == 1:
+            return 0.0
+        # Nomes do meio da parte alinhados em ordem aos do nome pesquisado (podem faltar, não sobrar)
+        pontos = [primeiro]
+        casados = 2
+        posicao = 1
+        for token in tokens_parte[1:-1]:
+            melhor, onde = 0.0, None
+            for j in range(posicao, len(tokens_alvo) - 1):
+                valor = similaridade_tokens(token, tokens_alvo[j])
+                if valor > melhor:
+                    melhor, onde = valor, j
+            if onde is not None and melhor >= LIMIAR_TOKEN:
+                pontos.append(melhor)
+                casados += 1
+                posicao = onde + 1
+            else:
+                pontos.append(0.0)
+        pontos.append(ultimo)
+        pontuacao = 0.7 * sum(pontos) / len(pontos) + 0.3 * casados / len(tokens_alvo)
+    if sufixos_alvo != sufixos_parte:
+        pontuacao *= PESO_SUFIXO_PARTE
+    return pontuacao
+
+
+def similaridade_nomes(nome_alvo: str, nome_parte: str) -> float:
+    return similaridade(tokens_nome(nome_alvo), tokens_nome(nome_parte))
+
+
+def _variantes_letras() -> dict:
+    # Letra ASCII minúscula -> caracteres latinos que normalizar_nome transforma nela (e -> eEÉé...)
+    variantes = {}
+    for codigo in range(0x30, 0x1f00):
+        caractere = chr(codigo)
+        base = normalizar_nome(caractere)
+        if len(base) == 1 and base.isalnum():
+            variantes[base] = variantes.get(base, "") + caractere
+    return variantes
+
+
+_VARIANTES = _variantes_letras()
+
+
+def _padrao_sem_acento(token: str) -> str:
+    # Regex que reconhece o token normalizado no texto original (com acentos, em qualquer caixa)
+    return "".join(
+        "[" + re.escape(_VARIANTES.get(ch, ch)) + "][\u0300-\u036f]*" for ch in token
+    )
+
+
+@lru_cache(maxsize=4096)
+def _padrao_primeiro_nome(primeiro: str):
+    # Linha do texto de IndiceNomes que começa pelo primeiro nome ou pela inicial dele. O padrão
+    # começa pelo literal "\n" (busca rápida) e ignora a pontuação antes do nome
+    return re.compile(
+        "\n((?:[^\\w\n]|_)*" + _padrao_sem_acento(primeiro[0])
+        + "(?:" + _padrao_sem_acento(primeiro[1:]) + ")?(?![^\\W_])[^\n]*)"
+    )
+
+
+class IndiceNomes:
+    """
+    Índice sobre os nomes das partes (ex.: todas as partes dos processos de um réu).
+
+        indice = IndiceNomes(nomes_das_partes)
+        pontuacoes = indice.similaridades("JOSÉ ANTÔNIO DA SILVA")  # alinhadas com nomes_das_partes
+
+    Os nomes distintos são juntados em um único texto, sem normalizar. Cada nome pesquisado vira
+    um regex sem acento e sem caixa para o primeiro nome (ou a inicial dele) no começo de um nome
+    desse texto; só os nomes encontrados (o primeiro nome precisa corresponder) são
+    normalizados, separados em tokens e pontuados.
+    """
+    def __init__(self, nomes):
+        self._lista = list(nomes)
+        # Nomes distintos, um por linha; _originais só existe para os nomes que não são texto ou
+        # têm quebra de linha (a linha deles não é o próprio nome)
+        nomes_distintos = list(dict.fromkeys(self._lista))
+        self._originais = {}
+        try:
+            texto = "\n".join(nomes_distintos)
+        except TypeError:
+            texto = None
+        if texto is None or texto.count("\n") != len(nomes_distintos) - 1:
+            linhas = []
+            for nome in nomes_distintos:
+                linha = nome.replace("\n", " ") if isinstance(nome, str) else ""
+                if linha != nome:
+                    self._originais.setdefault(linha, []).append(nome)
+                linhas.append(linha)
+            for linha in self._originais.keys() & set(nomes_distintos):
+                self._originais[linha].append(linha)
+            texto = "\n".join(linhas)
+        self._texto = "\n" + texto
+        self._por_primeiro = {}  # primeiro nome -> linhas que começam por ele ou pela inicial
+
+    def candidatos(self, alvo: tuple) -> set:
+        """
+        Nomes (linhas do texto) que começam pelo primeiro nome do alvo ou pela inicial dele (os
+        demais não podem corresponder).
+        """
+        tokens_alvo = alvo[0]
+        if not tokens_alvo:
+            return set()
+        primeiro = tokens_alvo[0]
+        if primeiro not in self._por_primeiro:
+            self._por_primeiro[primeiro] = set(_padrao_primeiro_nome(primeiro).findall(self._texto))
+        return self._por_primeiro[primeiro]
+
+    def similaridades(self, nome_alvo: str) -> list:
+        """
+        Similaridade de cada nome da lista original com nome_alvo (0 para os não candidatos).
+        """
+        alvo = tokens_nome(nome_alvo)
+        por_nome = {}
+        for linha in self.candidatos(alvo):
+            valor = similaridade(alvo, tokens_nome(linha))
+            if valor:
+                for nome in self._originais.get(linha, (linha,)):
+                    por_nome[nome] = valor
+        if not por_nome:
+            return [0.0] * len(self._lista)
+        return [por_nome.get(nome, 0.0) for nome in self._lista]
+
+    def correspondencias(self, nome_alvo: str, limiar: float = None) -> list:
+        limiar = limiar_padrao() if limiar is None else limiar
+        return [valor >= limiar for valor in self.similaridades(nome_alvo)]
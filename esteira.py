@@ -0,0 +1,207 @@
+"""
+Esteira de processamento em etapas (produtor/consumidor) com filas limitadas.
+
+Cada etapa tem seu próprio número de workers e uma fila de entrada com capacidade fixa:
+quando uma etapa fica para trás, a fila dela enche e as anteriores bloqueiam (backpressure),
+então cada dependência externa trabalha saturada sem que a memória cresça sem limite.
+
+A função de cada etapa recebe (item, emitir) e chama emitir(saida) zero ou mais vezes para
+passar itens à etapa seguinte (ou à saída, na última etapa). Assim uma etapa pode desdobrar
+um item em vários (ex.: uma tarefa por decisão) e outra reagrupá-los. Uma etapa com
+tamanho_lote > 1 recebe uma lista de até tamanho_lote itens (os que chegarem em até
+espera_lote segundos) e pode rejeitar itens individualmente com esteira.falhar(item, erro).
+
+    esteira = Esteira([
+        ("fetch", buscar, 4),
+        ("parse", interpretar, 1),
+    ])
+    for resultado in esteira.executar(itens):
+        ...
+
+parar() encerra de forma graciosa: nenhum item novo entra e os que estão em andamento
+terminam todas as etapas antes de executar() retornar.
+"""
+import queue
+import threading
+import time
+
+_FIM = object()
+
+
+class _Abortada(Exception):
+    pass
+
+
+class Etapa:
+    def __init__(self, nome: str, func, workers: int = 1, capacidade: int = None, tamanho_lote: int = 1, espera_lote: float = 0.05):
+        self.nome = nome
+        self.func = func
+        self.workers = max(1, workers)
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.espera_lote = espera_lote
+        self.fila = queue.Queue(maxsize=capacidade or 2 * self.workers * self.tamanho_lote)
+        self.ativos = self.workers
+
+
+class Esteira:
+    def __init__(self, etapas: list, ao_falhar=None, estatisticas=None, capacidade_saida: int = None):
+        """
+        etapas: lista de Etapa ou de tuplas com os argumentos de Etapa (nome, func, workers, ...).
+        ao_falhar(item, erro): converte um item que falhou em um resultado de saída (ou None
+        para descartá-lo); por padrão, {"item": item, "erro": str(erro)}.
+        estatisticas: objeto com registrar(etapa, duracao, sucesso), ex.: lote.EstatisticasLote.
+        """
+        self.etapas = [e if isinstance(e, Etapa) else Etapa(*e) for e in etapas]
+        self.ao_falhar = ao_falhar or (lambda item, erro: {"item": item, "erro": str(erro)})
+        self.estatisticas = estatisticas
+        self.saida = queue.Queue(maxsize=capacidade_saida or 2 * self.etapas[-1].workers)
+        self._lock = threading.Lock()
+        self._parada = threading.Event()
+        self._abortada = threading.Event()
+
+    def parar(self):
+        """
+        Para de aceitar itens novos; os itens em andamento seguem até a saída.
+        """
+        self._parada.set()
+
+    @property
+    def parando(self) -> bool:
+        return self._parada.is_set()
+
+    def ocupacao(self) -> dict:
+        """
+        Itens aguardando em cada fila (indica qual etapa é o gargalo).
+        """
+        return {**{e.nome: e.fila.qsize() for e in self.etapas}, "saida": self.saida.qsize()}
+
+    def _colocar(self, fila: queue.Queue, item):
+        # put bloqueante (backpressure), mas que desiste se a esteira for abortada (mesmo com
+        # espaço na fila: nada mais segue depois que o consumidor saiu)
+        while True:
+            if self._abortada.is_set():
+                raise _Abortada()
+            try:
+                fila.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _retirar(self, fila: queue.Queue):
+        while True:
+            try:
+                return fila.get(timeout=0.1)
+            except queue.Empty:
+                if self._abortada.is_set():
+                    raise _Abortada()
+
+    def _retirar_lote(self, etapa: Etapa) -> tuple:
+        # Bloqueia pelo primeiro item e junta os que chegarem até espera_lote depois dele
+        primeiro = self._retirar(etapa.fila)
+        if primeiro is _FIM:
+            return [], True
+        itens = [primeiro]
+        prazo = time.monotonic() + etapa.espera_lote
+        while len(itens) < etapa.tamanho_lote:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = etapa.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if item is _FIM:
+                return itens, True
+            itens.append(item)
+        return itens, False
+
+    def falhar(self, item, erro: BaseException):
+        """
+        Envia à saída o resultado de falha de um item (ver ao_falhar).
+        """
+        falha = self.ao_falhar(item, erro)
+        if falha is not None:
+            self._colocar(self.saida, falha)
+
+    def _alimentar(self, itens):
+        primeira = self.etapas[0]
+        try:
+            for item in itens:
+                if self._parada.is_set():
+                    break
+                self._colocar(primeira.fila, item)
+            for _ in range(primeira.workers):
+                self._colocar(primeira.fila, _FIM)
+        except _Abortada:
+            pass
+
+    def _trabalhar(self, indice: int):
+        etapa = self.etapas[indice]
+        destino = self.etapas[indice + 1].fila if indice + 1 < len(self.etapas) else self.saida
+
+        def emitir(saida):
+            self._colocar(destino, saida)
+
+        try:
+            fim = False
+            while not fim:
+                if etapa.tamanho_lote > 1:
+                    itens, fim = self._retirar_lote(etapa)
+                    if not itens:
+                        break
+                    argumento = itens
+                else:
+                    item = self._retirar(etapa.fila)
+                    if item is _FIM:
+                        break
+                    itens, argumento = [item], item
+                inicio = time.perf_counter()
+                try:
+                    etapa.func(argumento, emitir)
+                except _Abortada:
+                    raise
+                except Exception as e:
+                    self._registrar(etapa.nome, inicio, sucesso=False)
+                    for item in itens:
+                        self.falhar(item, e)
+                else:
+                    self._registrar(etapa.nome, inicio, sucesso=True)
+            # O último worker a sair repassa o fim à etapa seguinte: tudo o que ela
+            # vai receber já está na fila antes dos marcadores de fim
+            with self._lock:
+                etapa.ativos -= 1
+                ultimo = etapa.ativos == 0
+            if ultimo:
+                seguintes = self.etapas[indice + 1].workers if indice + 1 < len(self.etapas) else 1
+                for _ in range(seguintes):
+                    self._colocar(destino, _FIM)
+        except _Abortada:
+            pass
+
+    def _registrar(self, nome: str, inicio: float, sucesso: bool):
+        if self.estatisticas is not None:
+            self.estatisticas.registrar(nome, time.perf_counter() - inicio, sucesso=sucesso)
+
+    def executar(self, itens):
+        """
+        Processa itens por todas as etapas, gerando os resultados da última etapa (e as falhas)
+        na ordem em que ficam prontos. Pode ser chamado uma única vez por esteira.
+        """
+        threads = [threading.Thread(target=self._alimentar, args=(itens,), daemon=True, name="esteira-entrada")]
+        for indice, etapa in enumerate(self.etapas):
+            for n in range(etapa.workers):
+                threads.append(threading.Thread(target=self._trabalhar, args=(indice,), daemon=True, name=f"esteira-{etapa.nome}-{n}"))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                resultado = self.saida.get()
+                if resultado is _FIM:
+                    break
+                yield resultado
+        finally:
+            # Consumidor abandonou a iteração (ou erro): descarta o que estiver em andamento
+            self._parada.set()
+            self._abortada.set()
+            for thread in threads:
+                thread.join(timeout=1)
@@ -0,0 +1,91 @@
+"""
+Índice dos processos compartilhados entre os CPFs de um lote.
+
+Corréus e parentes costumam aparecer no mesmo processo (CaseNumber), e cada processo traz
+várias decisões: sem o índice, cada CPF do lote resume de novo todas as decisões de um
+processo compartilhado. Com ele, cada decisão (Número, DecisionDate, DecisionContent) é
+resumida uma única vez no lote e o resumo é reaproveitado para todas as partes; só o que é
+da pessoa (É Réu, correspondência com BasicData.Name, sanções) continua sendo calculado por
+CPF, no parse. Por isso o texto enviado ao agente de resumo não leva o bloco de sanções do
+CPF (app.montar_textos_decisao com kyc=None): elas chegam ao parecer pelos dados principais.
+
+O primeiro CPF a pedir uma decisão é o dono do resumo; os demais recebem o mesmo Future.
+Se o resumo falhar, a decisão sai do índice e o próximo CPF que a pedir tenta de novo.
+"""
+import threading
+from concurrent.futures import Future
+
+
+def chave_decisao(decisao: dict):
+    # Decisões de processos sem número não são compartilhadas
+    if not decisao.get("Número"):
+        return None
+    return decisao["Número"], decisao.get("DecisionDate") or "", decisao.get("DecisionContent") or ""
+
+
+class IndiceProcessos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resumos = {}            # chave da decisão -> Future do resumo
+        self._cpfs_por_processo = {}  # Número -> CPFs do lote que o citam
+        self.decisoes = 0
+        self.reaproveitadas = 0
+
+    def reservar(self, cpf: str, decisao: dict) -> tuple:
+        """
+        Retorna (futuro, dono): dono indica que este CPF deve resumir a decisão e publicar o
+        resultado com concluir(); caso contrário, o resumo virá no futuro de outro CPF.
+        """
+        chave = chave_decisao(decisao)
+        with self._lock:
+            self.decisoes += 1
+            if chave is None:
+                return Future(), True
+            self._cpfs_por_processo.setdefault(chave[0], set()).add(cpf)
+            futuro = self._resumos.get(chave)
+            if futuro is not None:
+                self.reaproveitadas += 1
+                return futuro, False
+            futuro = self._resumos[chave] = Future()
+            return futuro, True
+
+    def concluir(self, decisao: dict, futuro: Future, resumo=None, erro: BaseException = None):
+        """
+        Publica o resumo (ou a falha) de uma decisão reservada como dono.
+        """
+        if erro is not None:
+            chave = chave_decisao(decisao)
+            with self._lock:
+                if self._resumos.get(chave) is futuro:
+                    del self._resumos[chave]
+            futuro.set_exception(erro)
+        else:
+            futuro.set_result(resumo)
+
+    def resumir(self, cpf: str, decisoes: list, resumir_decisoes) -> list:
+        """
+        Resumos das decisões de um CPF na ordem recebida. resumir_decisoes(lista) resume as
+        decisões de que este CPF é dono (ex.: agente_resumo.run_many); as demais aguardam o
+        resumo feito por outro CPF, sem bloquear o dono (ele resume antes de aguardar).
+        """
+        reservas = [self.reservar(cpf, decisao) for decisao in decisoes]
+        proprias = [i for i, (_, dono) in enumerate(reservas) if dono]
+        if proprias:
+            try:
+                resumos = resumir_decisoes([decisoes[i] for i in proprias])
+            except BaseException as e:
+                for i in proprias:
+                    self.concluir(decisoes[i], reservas[i][0], erro=e)
+                raise
+            for i, resumo in zip(proprias, resumos):
+                self.concluir(decisoes[i], reservas[i][0], resumo)
+        return [futuro.result() for futuro, _ in reservas]
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            return {
+                "processos": len(self._cpfs_por_processo),
+                "processos_compartilhados": sum(len(cpfs) > 1 for cpfs in self._cpfs_por_processo.values()),
+                "decisoes": self.decisoes,
+                "decisoes_reaproveitadas": self.reaproveitadas,
+            }
@@ -0,0 +1,135 @@
+"""
+Ingestão enxuta das respostas da BigDataCorp.
+
+A pipeline só usa uma fração de cada resposta (veja parser_bdc.tabelas_bdc): em réus com
+centenas de processos, o dict completo de response.json() ocupa muitos MB por requisição.
+ESQUEMA descreve os campos usados; ler_resposta percorre o corpo da resposta em streaming
+(ijson, dependência opcional) montando só esses campos, processo a processo, e descarta o
+resto à medida que lê. Sem ijson, o JSON é carregado inteiro e reduzido logo em seguida
+(compactar), o que não diminui o pico, mas libera a resposta completa antes do parse.
+
+O resultado tem o mesmo formato da resposta original, só que sem os campos não usados.
+Ative no cliente com BDC_INGESTAO_STREAMING=1.
+"""
+import json
+
+# Campos mantidos: True mantém o valor inteiro, um dict filtra as chaves de um objeto,
+# uma lista [esquema] aplica o esquema a cada item de um array e "*" vale para as demais chaves
+PARTE = {"Name": True, "Type": True, "PartyDetails": {"SpecificType": True}}
+DECISAO = {"DecisionContent": True, "DecisionDate": True}
+PROCESSO = {
+    **dict.fromkeys([
+        "CaseNumber", "Number", "CourtType", "Type", "MainSubject", "InferredCNJSubjectName",
+        "InferredCNJProcedureTypeName", "OtherSubjects", "FilingDate", "CourtName", "JudgingBody",
+        "CourtLevel", "CourtDistrict", "State", "Judge", "Status", "CloseDate", "LastMovementDate",
+        "Decision", "Description", "Summary", "Details", "Content",
+    ], True),
+    "Parties": [PARTE],
+    "Decisions": [DECISAO],
+}
+ESQUEMA = {
+    "*": True,
+    "Result": [{
+        "BasicData": dict.fromkeys(["TaxIdNumber", "Name", "Age", "TaxIdStatus", "TaxIdOrigin"], True),
+        "KycData": dict.fromkeys(["IsCurrentlySanctioned", "IsCurrentlyPEP", "LastSanctionDate", "SanctionsHistory"], True),
+        "Processes": {"TotalLawsuits": True, "Lawsuits": [PROCESSO]},
+    }],
+}
+
+
+def ijson_disponivel() -> bool:
+    try:
+        import ijson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _subesquema(esquema, chave: str):
+    if esquema is True:
+        return True
+    if isinstance(esquema, list):
+        esquema = esquema[0]
+    return esquema.get(chave, esquema.get("*"))
+
+
+def compactar(valor, esquema=ESQUEMA):
+    """
+    Cópia de valor só com os campos do esquema.
+    """
+    if esquema is True:
+        return valor
+    if isinstance(valor, list):
+        item = esquema[0] if isinstance(esquema, list) else esquema
+        return [compactar(v, item) for v in valor]
+    if isinstance(valor, dict):
+        compacto = {}
+        for chave, v in valor.items():
+            sub = _subesquema(esquema, chave)
+            if sub is not None:
+                compacto[chave] = compactar(v, sub)
+        return compacto
+    return valor
+
+
+def _pular(eventos, evento: str):
+    if evento not in ("start_map", "start_array"):
+        return
+    profundidade = 1
+    for evento, _ in eventos:
+        if evento in ("start_map", "start_array"):
+            profundidade += 1
+        elif evento in ("end_map", "end_array"):
+            profundidade -= 1
+            if profundidade == 0:
+                return
+
+
+def _montar(eventos, esquema, evento: str, valor):
+    # Monta o valor que começa em (evento, valor), consumindo os eventos até o seu fim
+    if evento == "start_map":
+        objeto = {}
+        for evento, chave in eventos:
+            if evento == "end_map":
+                return objeto
+            evento, valor = next(eventos)
+            sub = _subesquema(esquema, chave)
+            if sub is None:
+                _pular(eventos, evento)
+            else:
+                objeto[chave] = _montar(eventos, sub, evento, valor)
+    elif evento == "start_array":
+        lista = []
+        item = esquema[0] if isinstance(esquema, list) else esquema
+        for evento, valor in eventos:
+            if evento == "end_array":
+                return lista
+            lista.append(_montar(eventos, item, evento, valor))
+    return valor
+
+
+def ler_resposta(arquivo, esquema=ESQUEMA) -> dict:
+    """
+    Lê o JSON de um objeto com read() (ex.: response.raw) mantendo só os campos do esquema.
+    """
+    try:
+        import ijson
+    except ImportError:
+        return compactar(json.load(arquivo), esquema)
+    eventos = iter(ijson.basic_parse(arquivo, use_float=True))
+    evento, valor = next(eventos)
+    return _montar(eventos, esquema, evento, valor)
+
+
+class LeitorContado:
+    """
+    Envolve um arquivo contando os bytes lidos (para a telemetria do payload).
+    """
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.bytes = 0
+
+    def read(self, tamanho: int = -1) -> bytes:
+        dados = self.arquivo.read(tamanho)
+        self.bytes += len(dados)
+        return dados
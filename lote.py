@@ -0,0 +1,358 @@
+"""
+Triagem em lote de CPFs sobre a pipeline de análise de risco.
+
+Dois modos:
+- analisar_lote: cada CPF passa por duas etapas com limites de concorrência independentes,
+  a consulta à BigDataCorp (I/O) e a análise com LLM (resumos + parecer);
+- analisar_lote_esteira: esteira em cinco etapas (fetch, parse, extrair_decisoes, resumo,
+  risco) ligadas por filas limitadas (veja esteira.py), com os resumos despachados por
+  decisão e parada graciosa.
+Nos dois modos, um IndiceProcessos (veja indice_processos.py) faz os CPFs do lote que citam o
+mesmo processo compartilharem os resumos das decisões dele.
+Para retomar um lote interrompido, cpfs_concluidos lê os CPFs já concluídos de uma saída anterior.
+Os resultados são emitidos à medida que cada CPF termina. As respostas da BigDataCorp não são
+gravadas no cache em memória (cada CPF do lote é consultado uma vez).
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+
+from app import (
+    sanitizar_cpf, buscar_dados_bdc, buscar_dados_bdc_lote, analisar_dados_bdc, interpretar_dados_bdc, decisoes_para_resumo,
+    montar_textos_decisao, agente_resumo, rotear_parecer, emitir_parecer, registrar_triagem,
+)
+from esteira import Esteira, Etapa
+from indice_processos import IndiceProcessos
+from retriagem import RepositorioSnapshots, analisar_incremental
+from telemetria import span, iniciar_span, ativar
+
+
+class EstatisticasLote:
+    """
+    Acumula contagem, tempo e vazão por etapa de uma triagem em lote.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+
+    def registrar(self, etapa: str, duracao: float, sucesso: bool = True):
+        with self._lock:
+            dados = self.etapas.setdefault(etapa, {"itens": 0, "erros": 0, "tempo_total": 0.0})
+            dados["itens"] += 1
+            dados["tempo_total"] += duracao
+            if not sucesso:
+                dados["erros"] += 1
+
+    def relatorio(self) -> dict:
+        """
+        Retorna, por etapa, itens processados, erros, latência média e vazão (itens/s no tempo de parede).
+        """
+        decorrido = time.perf_counter() - self.inicio
+        with self._lock:
+            rel = {}
+            for etapa, dados in self.etapas.items():
+                rel[etapa] = {
+                    "itens": dados["itens"],
+                    "erros": dados["erros"],
+                    "latencia_media_s": dados["tempo_total"] / dados["itens"] if dados["itens"] else 0.0,
+                    "vazao_por_s": dados["itens"] / decorrido if decorrido > 0 else 0.0,
+                }
+            return {"tempo_decorrido_s": decorrido, "etapas": rel}
+
+    def formatar(self) -> str:
+        rel = self.relatorio()
+        linhas = [f"Tempo total: {rel['tempo_decorrido_s']:.2f}s"]
+        for etapa, dados in rel["etapas"].items():
+            linhas.append(
+                f"- {etapa}: {dados['itens']} itens ({dados['erros']} erros), "
+                f"latência média {dados['latencia_media_s']:.2f}s, vazão {dados['vazao_por_s']:.2f}/s"
+            )
+        return '\n'.join(linhas)
+
+
+def ler_cpfs(origem):
+    """
+    Lê CPFs de um caminho de arquivo (um por linha, '#' para comentários) ou de um iterável,
+    sanitizando e descartando linhas vazias e repetidas.
+    """
+    if isinstance(origem, str):
+        with open(origem, encoding="utf-8") as f:
+            linhas = [linha.split('#', 1)[0] for linha in f]
+    else:
+        linhas = origem
+    vistos = set()
+    for linha in linhas:
+        cpf = sanitizar_cpf(str(linha))
+        if cpf and cpf not in vistos:
+            vistos.add(cpf)
+            yield cpf
+
+
+def _executar_etapa(semaforo, estatisticas, etapa, func, *args):
+    with semaforo:
+        inicio = time.perf_counter()
+        try:
+            resultado = func(*args)
+        except Exception:
+            estatisticas.registrar(etapa, time.perf_counter() - inicio, sucesso=False)
+            raise
+        estatisticas.registrar(etapa, time.perf_counter() - inicio)
+        return resultado
+
+
+def analisar_lote(cpfs, max_bdc: int = 4, max_llm: int = 8, estatisticas: EstatisticasLote = None,
+                  repositorio: RepositorioSnapshots = None, indice: IndiceProcessos = None):
+    """
+    Executa a pipeline para vários CPFs com pool de workers limitado, emitindo um dicionário
+    por CPF assim que ele termina (a ordem de saída não é a de entrada).
+
+    max_bdc e max_llm limitam quantos CPFs estão simultaneamente na etapa de consulta à
+    BigDataCorp e na etapa de LLM, respectivamente. Com um repositorio de snapshots, a etapa
+    de LLM é incremental (veja retriagem.py) e cada resultado traz a chave "retriagem". Com um
+    indice de processos, cada decisão de processo compartilhado entre CPFs é resumida uma vez.
+    """
+    if estatisticas is None:
+        estatisticas = EstatisticasLote()
+    sem_bdc = threading.BoundedSemaphore(max_bdc)
+    sem_llm = threading.BoundedSemaphore(max_llm)
+    max_workers = max_bdc + max_llm
+    max_pendentes = max_workers * 2
+
+    def processar(cpf):
+        inicio = time.perf_counter()
+        with span("pipeline", documento=cpf, modo="lote"):
+            bdc_data = _executar_etapa(sem_bdc, estatisticas, "bigdatacorp", partial(buscar_dados_bdc, gravar_cache=False), cpf)
+            if repositorio is None:
+                dados_principais, resumos, parecer = _executar_etapa(sem_llm, estatisticas, "llm", analisar_dados_bdc, bdc_data, indice)
+                info = None
+            else:
+                dados_principais, resumos, parecer, info = _executar_etapa(
+                    sem_llm, estatisticas, "llm", analisar_incremental, cpf, bdc_data, repositorio
+                )
+        resultado = {
+            "CPF": cpf,
+            "dados_principais": dados_principais,
+            "resumos": resumos,
+            "parecer": parecer,
+            "duracao_s": time.perf_counter() - inicio,
+        }
+        if info is not None:
+            resultado["retriagem"] = info
+        return resultado
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lote")
+    pendentes = {}
+    iterador = iter(ler_cpfs(cpfs))
+    try:
+        esgotado = False
+        while True:
+            # Mantém uma janela limitada de CPFs em voo para não carregar o lote inteiro em memória
+            while not esgotado and len(pendentes) < max_pendentes:
+                try:
+                    cpf = next(iterador)
+                except StopIteration:
+                    esgotado = True
+                    break
+                pendentes[executor.submit(processar, cpf)] = cpf
+            if not pendentes:
+                break
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                cpf = pendentes.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    estatisticas.registrar("cpf", 0.0, sucesso=False)
+                    resultado = {"CPF": cpf, "erro": str(e)}
+                else:
+                    estatisticas.registrar("cpf", resultado["duracao_s"])
+                yield resultado
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def criar_esteira_lote(max_bdc: int = 4, max_llm: int = 8, max_risco: int = 2, estatisticas: EstatisticasLote = None,
+                       tamanho_lote_bdc: int = 1, indice: IndiceProcessos = None) -> Esteira:
+    """
+    Monta a esteira de triagem. Cada item é uma tarefa (dict) de um CPF; a etapa
+    extrair_decisoes desdobra a tarefa em um item por decisão e a etapa resumo a
+    reagrupa quando o último resumo do CPF termina.
+
+    max_bdc, max_llm e max_risco são os workers da consulta à BigDataCorp, dos resumos
+    e dos pareceres; parse e extração rodam em um worker cada (CPU). Com tamanho_lote_bdc > 1,
+    cada worker de fetch consulta até esse número de CPFs em uma única requisição. Com um
+    indice de processos, só o primeiro CPF a citar uma decisão a envia à etapa resumo; os
+    demais recebem o resumo quando ele termina.
+    """
+    lock = threading.Lock()
+    prontas = []
+
+    def completar(tarefa, indice_decisao, resultado, erro=None):
+        # Guarda um resumo; a tarefa vai para o parecer quando o último resumo dela chegar
+        with lock:
+            if erro is not None:
+                # A falha é do CPF inteiro, mas só é repassada quando os demais resumos dele terminarem
+                tarefa.setdefault("erro", f"Falha no resumo da decisão {indice_decisao}: {erro}")
+            tarefa["resumos"][indice_decisao] = {"Processo": tarefa["processos"][indice_decisao], "Resumo": resultado}
+            tarefa["pendentes"] -= 1
+            if tarefa["pendentes"] == 0:
+                prontas.append(tarefa)
+
+    def despachar_prontas(emitir):
+        while True:
+            with lock:
+                if not prontas:
+                    return
+                tarefa = prontas.pop()
+            emitir(tarefa)
+
+    def fetch(tarefa, emitir):
+        with ativar(tarefa["span"]):
+            tarefa["bdc_data"] = buscar_dados_bdc(tarefa["CPF"], gravar_cache=False)
+        emitir(tarefa)
+
+    def fetch_lote(tarefas, emitir):
+        resultados = buscar_dados_bdc_lote([t["CPF"] for t in tarefas], tamanho_lote=tamanho_lote_bdc, gravar_cache=False)
+        for tarefa in tarefas:
+            valor = resultados[tarefa["CPF"]]
+            if isinstance(valor, Exception):
+                esteira.falhar(tarefa, valor)
+            else:
+                tarefa["bdc_data"] = valor
+                emitir(tarefa)
+
+    def parse(tarefa, emitir):
+        with ativar(tarefa["span"]):
+            tarefa["tabelas"], tarefa["dados_principais"], tarefa["kyc"] = interpretar_dados_bdc(tarefa.pop("bdc_data"))
+        emitir(tarefa)
+
+    def extrair(tarefa, emitir):
+        tabelas = tarefa.pop("tabelas")
+        decisoes = []
+        if tabelas is not None:
+            try:
+                with ativar(tarefa["span"]):
+                    decisoes = decisoes_para_resumo(tabelas)
+            except Exception as e:
+                tarefa["dados_principais"], tarefa["kyc"] = {"erro": f"Não foi possível extrair dados principais: {e}"}, {}
+        with ativar(tarefa["span"]):
+            tarefa["avaliacao"] = rotear_parecer(tarefa["dados_principais"], decisoes, tarefa["kyc"])
+        tarefa["decisoes"] = decisoes
+        tarefa["processos"] = [d["Número"] for d in decisoes]
+        tarefa["resumos"] = [None] * len(decisoes)
+        tarefa["pendentes"] = len(decisoes)
+        if not decisoes:
+            emitir(tarefa)
+            return
+        if indice is None:
+            for indice_decisao, texto in enumerate(montar_textos_decisao(decisoes, tarefa["kyc"])):
+                emitir((tarefa, indice_decisao, texto, None))
+            return
+        # Resumos compartilhados no lote: sem o bloco de sanções do CPF (veja indice_processos.py)
+        for indice_decisao, (decisao, texto) in enumerate(zip(decisoes, montar_textos_decisao(decisoes, None))):
+            futuro, dono = indice.reservar(tarefa["CPF"], decisao)
+            if dono:
+                emitir((tarefa, indice_decisao, texto, futuro))
+            else:
+                # Roda na thread que concluir o resumo (ou aqui, se ele já terminou)
+                futuro.add_done_callback(lambda f, i=indice_decisao: completar(tarefa, i, None if f.exception() else f.result(), f.exception()))
+        despachar_prontas(emitir)
+
+    def resumo(item, emitir):
+        if isinstance(item, dict):
+            # CPF sem decisões: segue direto para o parecer
+            emitir(item)
+            return
+        tarefa, indice_decisao, texto, futuro = item
+        resultado, erro = None, None
+        try:
+            with ativar(tarefa["span"]):
+                resultado = agente_resumo.run(decisao=texto)
+        except Exception as e:
+            erro = e
+        if futuro is not None:
+            # Entrega o resumo também aos outros CPFs do processo (callbacks de completar)
+            indice.concluir(tarefa["decisoes"][indice_decisao], futuro, resultado, erro)
+        completar(tarefa, indice_decisao, resultado, erro)
+        despachar_prontas(emitir)
+
+    def risco(tarefa, emitir):
+        if "erro" in tarefa:
+            raise RuntimeError(tarefa["erro"])
+        with ativar(tarefa["span"]):
+            parecer = emitir_parecer(tarefa["dados_principais"], tarefa["resumos"], tarefa["avaliacao"])
+            registrar_triagem(tarefa["dados_principais"], tarefa["decisoes"], tarefa["kyc"], tarefa["resumos"], parecer, tarefa["avaliacao"])
+        tarefa["span"].finalizar()
+        emitir({
+            "CPF": tarefa["CPF"],
+            "dados_principais": tarefa["dados_principais"],
+            "resumos": tarefa["resumos"],
+            "parecer": parecer,
+            "duracao_s": time.perf_counter() - tarefa["inicio"],
+        })
+
+    def ao_falhar(item, erro):
+        tarefa = item[0] if isinstance(item, tuple) else item
+        tarefa["span"].finalizar(erro=erro)
+        return {"CPF": tarefa["CPF"], "erro": str(erro)}
+
+    if tamanho_lote_bdc > 1:
+        etapa_fetch = Etapa("fetch", fetch_lote, max_bdc, tamanho_lote=tamanho_lote_bdc, espera_lote=0.2)
+    else:
+        etapa_fetch = Etapa("fetch", fetch, max_bdc)
+    esteira = Esteira(
+        [
+            etapa_fetch,
+            ("parse", parse, 1),
+            ("extrair_decisoes", extrair, 1),
+            # Fila dos resumos maior: cada CPF entra nela desdobrado em várias decisões
+            ("resumo", resumo, max_llm, 4 * max_llm),
+            ("risco", risco, max_risco),
+        ],
+        ao_falhar=ao_falhar,
+        estatisticas=estatisticas,
+    )
+    return esteira
+
+
+def analisar_lote_esteira(cpfs, max_bdc: int = 4, max_llm: int = 8, max_risco: int = 2,
+                          estatisticas: EstatisticasLote = None, esteira: Esteira = None, indice: IndiceProcessos = None):
+    """
+    Como analisar_lote, mas sobre a esteira de criar_esteira_lote. Passe uma esteira própria
+    para poder chamar esteira.parar(); para retomar um lote, filtre cpfs com cpfs_concluidos.
+    """
+    if estatisticas is None:
+        estatisticas = EstatisticasLote()
+    if esteira is None:
+        esteira = criar_esteira_lote(max_bdc, max_llm, max_risco, estatisticas, indice=indice)
+
+    def tarefas():
+        for cpf in ler_cpfs(cpfs):
+            yield {"CPF": cpf, "inicio": time.perf_counter(), "span": iniciar_span("pipeline", documento=cpf, modo="esteira")}
+
+    for resultado in esteira.executar(tarefas()):
+        estatisticas.registrar("cpf", resultado.get("duracao_s", 0.0), sucesso="erro" not in resultado)
+        yield resultado
+
+
+def cpfs_concluidos(caminho: str) -> set:
+    """
+    CPFs com resultado sem erro em um arquivo JSON-lines de saída do lote (para retomada).
+    """
+    concluidos = set()
+    if not os.path.exists(caminho):
+        return concluidos
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                resultado = json.loads(linha)
+            except ValueError:
+                # Última linha truncada por uma interrupção
+                continue
+            if "erro" not in resultado and resultado.get("CPF"):
+                concluidos.add(resultado["CPF"])
+    return concluidos
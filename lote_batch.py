@@ -0,0 +1,230 @@
+"""
+Modo Batch da OpenAI para a retriagem noturna em lote.
+
+Sem necessidade de latência interativa, os resumos e pareceres de um lote inteiro de CPFs
+vão para a Batch API (preço menor e limites de taxa próprios) em vez de uma chamada por
+decisão:
+1. consulta à BigDataCorp em lote (app.buscar_dados_bdc_lote), extração das decisões e
+   pré-triagem de cada CPF;
+2. 1ª rodada: um arquivo JSONL com todos os prompts de resumo do lote (sem repetir textos
+   iguais nem os que já estão no cache_resumos) é enviado, acompanhado até concluir e
+   distribuído de volta aos resumos de cada CPF;
+3. 2ª rodada: o mesmo para os pareceres dos CPFs que a pré-triagem manda ao LLM.
+Com um IndiceProcessos, os textos de resumo não levam as sanções do CPF, então as decisões
+de processos compartilhados entre CPFs do lote viram uma única requisição.
+
+Os arquivos de entrada ficam em OPENAI_BATCH_DIRETORIO; OPENAI_BATCH_INTERVALO_S é o
+intervalo entre consultas ao estado dos batches e OPENAI_BATCH_MAX_REQUISICOES o máximo de
+requisições por arquivo (o limite da API é 50.000).
+
+    python app.py --lote cpfs.txt --saida resultados.jsonl --batch-openai
+"""
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from app import (
+    CONTEXTO_RESUMO, PARAMETROS_RESUMO, PARAMETROS_RISCO, buscar_dados_bdc_lote, cache_resumos, decisoes_para_resumo,
+    emitir_parecer, interpretar_dados_bdc, montar_mensagens_resumo, montar_mensagens_risco, montar_textos_decisao,
+    obter_cliente_openai, registrar_triagem, resumir_decisao, rotear_parecer,
+)
+from configuracao import obter_config
+from indice_processos import IndiceProcessos
+from lote import EstatisticasLote, ler_cpfs
+from pre_triagem import ROTA_LLM
+from telemetria import registrar_uso_llm, span
+
+ENDPOINT = "/v1/chat/completions"
+ESTADOS_FINAIS = ("completed", "failed", "expired", "cancelled")
+
+
+def _gravar_entrada(nome: str, linhas) -> str:
+    diretorio = obter_config("OPENAI_BATCH_DIRETORIO", os.path.join(".cache", "openai_batch"))
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f"{nome}-{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}.jsonl")
+    with open(caminho, "w", encoding="utf-8") as f:
+        for linha in linhas:
+            f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+    return caminho
+
+
+def _interpretar_saida(linha: dict):
+    # Linha do arquivo de saída (ou de erros) de um batch: texto da conclusão ou a exceção
+    resposta = linha.get("response") or {}
+    corpo = resposta.get("body") or {}
+    if linha.get("error") or resposta.get("status_code") != 200:
+        erro = linha.get("error") or corpo.get("error") or {}
+        return RuntimeError(f"Falha na requisição do batch: {erro.get('message') or erro}")
+    if corpo.get("usage"):
+        registrar_uso_llm(SimpleNamespace(**corpo["usage"]), corpo.get("model"))
+    return corpo["choices"][0]["message"]["content"]
+
+
+def executar_batch(nome: str, requisicoes: dict) -> dict:
+    """
+    Envia {custom_id: (mensagens, parametros)} à Batch API e bloqueia até todos os batches
+    terminarem. Retorna {custom_id: texto}, com a exceção no lugar do texto para as
+    requisições que falharam ou ficaram sem resposta (batch expirado ou cancelado).
+    """
+    cliente = obter_cliente_openai()
+    max_requisicoes = int(obter_config("OPENAI_BATCH_MAX_REQUISICOES", "50000"))
+    intervalo = float(obter_config("OPENAI_BATCH_INTERVALO_S", "30"))
+    ids = list(requisicoes)
+    resultados = {}
+    with span(f"batch.{nome}", requisicoes=len(ids)) as s:
+        batches = {}
+        for inicio in range(0, len(ids), max_requisicoes):
+            parte = ids[inicio:inicio + max_requisicoes]
+            caminho = _gravar_entrada(nome, (
+                {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": {**requisicoes[custom_id][1], "messages": requisicoes[custom_id][0]}}
+                for custom_id in parte
+            ))
+            with open(caminho, "rb") as f:
+                arquivo = cliente.files.create(file=f, purpose="batch")
+            batch = cliente.batches.create(input_file_id=arquivo.id, endpoint=ENDPOINT, completion_window="24h", metadata={"etapa": nome})
+            batches[batch.id] = parte
+        s.definir(batches=len(batches))
+
+        pendentes = set(batches)
+        while pendentes:
+            for id_batch in sorted(pendentes):
+                batch = cliente.batches.retrieve(id_batch)
+                if batch.status not in ESTADOS_FINAIS:
+                    continue
+                pendentes.discard(id_batch)
+                for id_arquivo in (batch.output_file_id, batch.error_file_id):
+                    if id_arquivo:
+                        for linha in cliente.files.content(id_arquivo).text.splitlines():
+                            if linha.strip():
+                                saida = json.loads(linha)
+                                resultados[saida["custom_id"]] = _interpretar_saida(saida)
+                for custom_id in batches[id_batch]:
+                    resultados.setdefault(custom_id, RuntimeError(f"Sem resposta no batch {id_batch} (status {batch.status})"))
+            if pendentes:
+                time.sleep(intervalo)
+        s.definir(falhas=sum(isinstance(v, Exception) for v in resultados.values()))
+    return resultados
+
+
+def _preparar(cpf: str, bdc_data, indice: IndiceProcessos = None) -> dict:
+    if isinstance(bdc_data, Exception):
+        return {"CPF": cpf, "erro": str(bdc_data)}
+    tabelas, dados_principais, kyc = interpretar_dados_bdc(bdc_data)
+    decisoes = []
+    if tabelas is not None:
+        try:
+            decisoes = decisoes_para_resumo(tabelas)
+        except Exception as e:
+            dados_principais, kyc = {"erro": f"Não foi possível extrair dados principais: {e}"}, {}
+    reservas = [indice.reservar(cpf, d) for d in decisoes] if indice is not None else []
+    return {
+        "CPF": cpf,
+        "dados_principais": dados_principais,
+        "avaliacao": rotear_parecer(dados_principais, decisoes, kyc),
+        "decisoes": decisoes,
+        "kyc": kyc,
+        "processos": [d["Número"] for d in decisoes],
+        # Com o índice, sem as sanções do CPF: decisões de processos compartilhados viram o mesmo texto
+        "textos": montar_textos_decisao(decisoes, None if indice is not None else kyc) if decisoes else [],
+        "reservas": reservas,
+    }
+
+
+def _chave_resumo(texto: str) -> str:
+    # A mesma chave de app.resumir_decisao (cache_llm.memoizar)
+    return cache_resumos.chave(resumir_decisao.__qualname__, CONTEXTO_RESUMO, {"decisao": texto})
+
+
+def _resumir(tarefas: list) -> dict:
+    # {texto da decisão: resumo ou exceção}, reaproveitando e alimentando o cache_resumos
+    usar_cache = not obter_config("CACHE_LLM_DESATIVADO")
+    resumos = {}
+    pendentes = {}
+    for texto in dict.fromkeys(t for tarefa in tarefas for t in tarefa.get("textos", [])):
+        valor = cache_resumos.obter(_chave_resumo(texto)) if usar_cache else None
+        if valor is None:
+            pendentes[f"resumo-{len(pendentes)}"] = texto
+        else:
+            resumos[texto] = valor
+    if pendentes:
+        respostas = executar_batch("resumos", {
+            custom_id: (montar_mensagens_resumo(texto), PARAMETROS_RESUMO) for custom_id, texto in pendentes.items()
+        })
+        for custom_id, texto in pendentes.items():
+            resumos[texto] = respostas[custom_id]
+            if usar_cache and isinstance(respostas[custom_id], str):
+                cache_resumos.gravar(_chave_resumo(texto), respostas[custom_id])
+    return resumos
+
+
+def analisar_lote_batch(cpfs, estatisticas: EstatisticasLote = None, tamanho_lote_bdc: int = None, forcar_atualizacao: bool = False,
+                        indice: IndiceProcessos = None):
+    """
+    Triagem de um lote inteiro com os resumos e pareceres pela Batch API. Gera os resultados
+    no formato de lote.analisar_lote, na ordem dos CPFs, quando a 2ª rodada termina. Com um
+    indice de processos, cada decisão de processo compartilhado vira uma única requisição.
+    """
+    estatisticas = estatisticas or EstatisticasLote()
+    cpfs = list(ler_cpfs(cpfs))
+    inicio = time.perf_counter()
+    with span("lote_batch", cpfs=len(cpfs)):
+        etapa = time.perf_counter()
+        dados_bdc = buscar_dados_bdc_lote(
+            cpfs, forcar_atualizacao=forcar_atualizacao, tamanho_lote=tamanho_lote_bdc, gravar_cache=False
+        )
+        tarefas = [_preparar(cpf, dados_bdc.get(cpf), indice) for cpf in cpfs]
+        estatisticas.registrar("bigdatacorp_e_extracao", time.perf_counter() - etapa)
+
+        etapa = time.perf_counter()
+        resumos = _resumir([t for t in tarefas if "erro" not in t])
+        estatisticas.registrar("resumos_batch", time.perf_counter() - etapa)
+
+        para_llm = {}
+        for posicao, tarefa in enumerate(tarefas):
+            if "erro" in tarefa:
+                continue
+            valores = [resumos[texto] for texto in tarefa.pop("textos")]
+            for (futuro, dono), decisao, valor in zip(tarefa.pop("reservas"), tarefa["decisoes"], valores):
+                if dono and isinstance(valor, Exception):
+                    indice.concluir(decisao, futuro, erro=valor)
+                elif dono:
+                    indice.concluir(decisao, futuro, valor)
+            falha = next((v for v in valores if isinstance(v, Exception)), None)
+            if falha is not None:
+                tarefa["erro"] = f"Falha no resumo de decisão: {falha}"
+                continue
+            tarefa["resumos"] = [{"Processo": p, "Resumo": r} for p, r in zip(tarefa.pop("processos"), valores)]
+            if tarefa["avaliacao"]["rota"] == ROTA_LLM:
+                para_llm[f"parecer-{posicao}"] = tarefa
+            else:
+                tarefa["parecer"] = emitir_parecer(tarefa["dados_principais"], tarefa["resumos"], tarefa["avaliacao"])
+
+        etapa = time.perf_counter()
+        if para_llm:
+            respostas = executar_batch("pareceres", {
+                custom_id: (montar_mensagens_risco(t["dados_principais"], t["resumos"]), PARAMETROS_RISCO)
+                for custom_id, t in para_llm.items()
+            })
+            for custom_id, tarefa in para_llm.items():
+                if isinstance(respostas[custom_id], Exception):
+                    tarefa["erro"] = f"Falha no parecer: {respostas[custom_id]}"
+                else:
+                    tarefa["parecer"] = respostas[custom_id]
+        estatisticas.registrar("pareceres_batch", time.perf_counter() - etapa)
+
+    duracao = time.perf_counter() - inicio
+    for tarefa in tarefas:
+        if "erro" in tarefa:
+            estatisticas.registrar("cpf", 0.0, sucesso=False)
+            yield {"CPF": tarefa["CPF"], "erro": tarefa["erro"]}
+            continue
+        estatisticas.registrar("cpf", duracao)
+        registrar_triagem(tarefa["dados_principais"], tarefa["decisoes"], tarefa["kyc"], tarefa["resumos"], tarefa["parecer"], tarefa["avaliacao"])
+        yield {
+            "CPF": tarefa["CPF"],
+            "dados_principais": tarefa["dados_principais"],
+            "resumos": tarefa["resumos"],
+            "parecer": tarefa["parecer"],
+            "duracao_s": duracao,
+        }
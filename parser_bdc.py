@@ -0,0 +1,237 @@
+"""
+Conversão da resposta da BigDataCorp em tabelas pandas normalizadas, em uma única passada.
+
+Cada entrada de Result vira linhas em quatro tabelas ligadas por (CPF, IdProcesso):
+- processos: um registro por processo, com Homologação e É Réu calculados vetorialmente;
+- partes: um registro por parte de cada processo;
+- decisoes: um registro por decisão não vazia, com TipoDecisao;
+- sancoes: um registro por item de KycData.SanctionsHistory.
+
+As funções detalhes_processos, decisoes_criminais e sancoes_detalhadas reconstroem, a partir
+das tabelas, as mesmas estruturas que a pipeline enviava aos agentes.
+"""
+import numpy as np
+import pandas as pd
+
+from classificador import ClassificadorDecisoes, classificador_padrao
+from correspondencia_nomes import IndiceNomes, limiar_padrao
+
+PAPEIS_REU = ("DEFENDANT", "RÉU")
+
+COLUNAS_PROCESSO = {
+    "Número": None,
+    "Tipo": "Type",
+    "Assunto Principal": "MainSubject",
+    "Assunto CNJ": "InferredCNJSubjectName",
+    "Tipo Procedimento CNJ": "InferredCNJProcedureTypeName",
+    "Outros Assuntos": "OtherSubjects",
+    "Data": "FilingDate",
+    "Órgão": "CourtName",
+    "Órgão Julgador": "JudgingBody",
+    "Nível da Corte": "CourtLevel",
+    "Comarca": "CourtDistrict",
+    "Estado": "State",
+    "Juiz": "Judge",
+    "Situação": "Status",
+    "Data de Encerramento": "CloseDate",
+    "Última Movimentação": "LastMovementDate",
+}
+
+COLUNAS_SANCAO = {
+    "Fonte": "Source",
+    "Tipo": "Type",
+    "Tipo Padronizado": "StandardizedSanctionType",
+    "Data de Início": "StartDate",
+    "Data de Fim": "EndDate",
+}
+
+DETALHES_SANCAO = {
+    "Status": "Status",
+    "Órgão": "Agency",
+    "Número do Processo": "ProcessNumber",
+    "Número do Mandado": "ArrestWarrantNumber",
+    "Descrição": "Decision",
+    "Regime": "PrisonRegime",
+    "Tempo de Pena": "PenaltyTime",
+    "Recaptura": "Recapture",
+    "Data de Nascimento": "BirthDate",
+    "Nome na Lista": "NameInSanctionList",
+}
+
+
+def _texto(valor) -> str:
+    return valor if isinstance(valor, str) else ""
+
+
+def tabelas_bdc(bdc_data: dict) -> dict:
+    """
+    Percorre uma única vez todos os itens de bdc_data["Result"] e retorna
+    {"pessoas", "processos", "partes", "decisoes", "sancoes"} como DataFrames.
+    """
+    pessoas, processos, partes, decisoes, sancoes = [], [], [], [], []
+    for pessoa in bdc_data.get("Result") or []:
+        basic = pessoa.get("BasicData") or {}
+        kyc = pessoa.get("KycData") or {}
+        dados_processos = pessoa.get("Processes") or {}
+        cpf = basic.get("TaxIdNumber")
+        pessoas.append({
+            "CPF": cpf,
+            "Nome": basic.get("Name"),
+            "Idade": basic.get("Age"),
+            "Situação Cadastral": basic.get("TaxIdStatus"),
+            "Órgão de Origem": basic.get("TaxIdOrigin"),
+            "Processos": dados_processos.get("TotalLawsuits"),
+            "Sanções": kyc.get("IsCurrentlySanctioned"),
+            "PEP": kyc.get("IsCurrentlyPEP"),
+            "Última Sanção": kyc.get("LastSanctionDate"),
+        })
+        for id_processo, proc in enumerate(dados_processos.get("Lawsuits") or []):
+            numero = proc.get("CaseNumber") or proc.get("Number")
+            linha = {"CPF": cpf, "IdProcesso": id_processo, "CourtType": proc.get("CourtType")}
+            for coluna, campo in COLUNAS_PROCESSO.items():
+                linha[coluna] = numero if campo is None else proc.get(campo)
+            linha["Decisão"] = proc.get("Decision", "")
+            linha["Descrição"] = proc.get("Description") or proc.get("Summary") or proc.get("Details") or ""
+            linha["Conteúdo"] = proc.get("Content", "")
+            processos.append(linha)
+            for ordem, parte in enumerate(proc.get("Parties") or []):
+                partes.append({
+                    "CPF": cpf,
+                    "IdProcesso": id_processo,
+                    "Ordem": ordem,
+                    "Nome": parte.get("Name"),
+                    "Papel": parte.get("Type"),
+                    "Especificação": (parte.get("PartyDetails") or {}).get("SpecificType"),
+                })
+            for item in proc.get("Decisions") or []:
+                decisoes.append({
+                    "CPF": cpf,
+                    "IdProcesso": id_processo,
+                    "DecisionContent": item.get("DecisionContent"),
+                    "DecisionDate": item.get("DecisionDate"),
+                })
+        for sancao in kyc.get("SanctionsHistory") or []:
+            detalhes = sancao.get("Details") or {}
+            linha = {"CPF": cpf}
+            for coluna, campo in COLUNAS_SANCAO.items():
+                linha[coluna] = sancao.get(campo)
+            for coluna, campo in DETALHES_SANCAO.items():
+                linha[coluna] = detalhes.get(campo)
+            linha["Outros Detalhes"] = detalhes
+            sancoes.append(linha)
+
+    tabelas = {
+        "pessoas": pd.DataFrame(pessoas, columns=["CPF", "Nome", "Idade", "Situação Cadastral", "Órgão de Origem", "Processos", "Sanções", "PEP", "Última Sanção"], dtype=object),
+        "processos": pd.DataFrame(processos, columns=["CPF", "IdProcesso", "CourtType", *COLUNAS_PROCESSO, "Decisão", "Descrição", "Conteúdo"], dtype=object),
+        "partes": pd.DataFrame(partes, columns=["CPF", "IdProcesso", "Ordem", "Nome", "Papel", "Especificação"], dtype=object),
+        "decisoes": pd.DataFrame(decisoes, columns=["CPF", "IdProcesso", "DecisionContent", "DecisionDate"], dtype=object),
+        "sancoes": pd.DataFrame(sancoes, columns=["CPF", *COLUNAS_SANCAO, *DETALHES_SANCAO, "Outros Detalhes"], dtype=object),
+    }
+    _enriquecer(tabelas)
+    return tabelas
+
+
+def _enriquecer(tabelas: dict):
+    """
+    Calcula de forma vetorizada as colunas derivadas: homologação, polo réu das partes,
+    correspondência com o nome pesquisado, É Réu por processo e tipo de decisão.
+    """
+    processos, partes, decisoes, pessoas = tabelas["processos"], tabelas["partes"], tabelas["decisoes"], tabelas["pessoas"]
+
+    textos = [processos[c].map(_texto).str.lower() for c in ("Conteúdo", "Decisão", "Descrição")]
+    homologacao = np.zeros(len(processos), dtype=bool)
+    for serie in textos:
+        homologacao |= serie.str.contains("homologada", regex=False).to_numpy(dtype=bool)
+    processos["Homologação"] = homologacao
+
+    nomes = partes["Nome"].map(_texto)
+    papeis = partes["Papel"].map(_texto)
+    especificacoes = partes["Especificação"].map(_texto)
+    partes["Polo Réu"] = (papeis.str.upper().isin(PAPEIS_REU) | (especificacoes.str.upper() == "RÉU")).to_numpy(dtype=bool)
+    partes["Resumo"] = (nomes + " (" + papeis + np.where(especificacoes != "", " - " + especificacoes, "") + ")").to_numpy(dtype=object)
+
+    # Correspondência aproximada com o nome pesquisado (veja correspondencia_nomes.py): um
+    # índice sobre os nomes das partes de cada pessoa, com o nome dela normalizado uma vez
+    alvos = dict(zip(pessoas["CPF"], pessoas["Nome"].map(_texto)))
+    similaridade = np.zeros(len(partes))
+    for cpf, posicoes in partes.groupby("CPF", sort=False, dropna=False).indices.items():
+        if alvos.get(cpf):
+            similaridade[posicoes] = IndiceNomes(nomes.iloc[posicoes]).similaridades(alvos[cpf])
+    partes["Similaridade Nome"] = similaridade
+    partes["Corresponde"] = similaridade >= limiar_padrao()
+    reus = partes.loc[partes["Polo Réu"] & partes["Corresponde"], ["CPF", "IdProcesso"]].drop_duplicates()
+    chaves_reu = set(zip(reus["CPF"], reus["IdProcesso"]))
+    processos["É Réu"] = np.fromiter(
+        ((cpf, id_processo) in chaves_reu for cpf, id_processo in zip(processos["CPF"], processos["IdProcesso"])),
+        dtype=bool,
+        count=len(processos),
+    )
+
+    conteudos = decisoes["DecisionContent"].map(_texto).str.strip()
+    decisoes["DecisionContent"] = conteudos
+    tabelas["decisoes"] = decisoes = decisoes[conteudos != ""].reset_index(drop=True)
+    decisoes["TipoDecisao"] = classificar_tipos_decisao(decisoes["DecisionContent"])
+
+
+def classificar_tipos_decisao(textos: pd.Series, classificador: ClassificadorDecisoes = classificador_padrao) -> pd.Series:
+    """
+    Tipo principal de cada decisão (mesma regra de app.classificar_tipo_decisao), com uma
+    passada do regex pré-compilado por texto.
+    """
+    return pd.Series([classificador.tipo_principal(t) for t in textos], index=textos.index, dtype=object)
+
+
+def _filtrar_cpf(tabela: pd.DataFrame, cpf) -> pd.DataFrame:
+    if cpf is None:
+        return tabela
+    return tabela[tabela["CPF"] == cpf]
+
+
+def detalhes_processos(tabelas: dict, cpf=None) -> list:
+    """
+    Lista de processos criminais no formato de "Processos Criminais Detalhes".
+    """
+    processos = _filtrar_cpf(tabelas["processos"], cpf)
+    processos = processos[processos["CourtType"] == "CRIMINAL"]
+    partes = _filtrar_cpf(tabelas["partes"], cpf)
+    resumo_partes = partes.groupby(["CPF", "IdProcesso"], sort=False, dropna=False)["Resumo"].agg(list).to_dict()
+    detalhes = []
+    for linha in processos.to_dict("records"):
+        detalhes.append({
+            "Número": linha["Número"],
+            "É Réu": "Sim" if linha["É Réu"] else "Não",
+            **{coluna: linha[coluna] for coluna in COLUNAS_PROCESSO if coluna != "Número"},
+            "Partes": resumo_partes.get((linha["CPF"], linha["IdProcesso"]), []),
+            "Decisão": linha["Decisão"],
+            "Descrição": linha["Descrição"],
+            "Conteúdo": linha["Conteúdo"],
+            "Homologação": "Sim" if linha["Homologação"] else "Não",
+        })
+    return detalhes
+
+
+def decisoes_criminais(tabelas: dict, cpf=None) -> list:
+    """
+    Decisões de processos criminais no formato de app.extrair_decisoes: sem duplicatas
+    (conteúdo, data) e ordenadas da mais recente para a mais antiga.
+    """
+    processos = _filtrar_cpf(tabelas["processos"], cpf)
+    processos = processos.loc[processos["CourtType"] == "CRIMINAL", ["CPF", "IdProcesso", "Número", "Órgão", "Comarca", "Juiz"]]
+    decisoes = _filtrar_cpf(tabelas["decisoes"], cpf).merge(processos, on=["CPF", "IdProcesso"], how="inner", sort=False)
+    decisoes = decisoes.drop_duplicates(subset=["DecisionContent", "DecisionDate"], keep="first")
+    chave_data = decisoes["DecisionDate"].map(lambda d: d or "")
+    decisoes = decisoes.iloc[np.argsort(-_ranking(chave_data), kind="stable")]
+    colunas = ["DecisionContent", "DecisionDate", "TipoDecisao", "Número", "Órgão", "Comarca", "Juiz"]
+    return decisoes[colunas].to_dict("records")
+
+
+def _ranking(serie: pd.Series) -> np.ndarray:
+    # Posição de cada valor na ordenação crescente; negada, dá ordem decrescente estável
+    valores = sorted(set(serie))
+    posicoes = {valor: i for i, valor in enumerate(valores)}
+    return np.fromiter((posicoes[v] for v in serie), dtype=np.int64, count=len(serie))
+
+
+def sancoes_detalhadas(tabelas: dict, cpf=None) -> list:
+    sancoes = _filtrar_cpf(tabelas["sancoes"], cpf).drop(columns=["CPF"])
+    return sancoes.to_dict("records")
@@ -0,0 +1,170 @@
+"""
+Pré-triagem determinística antes do agente de risco.
+
+Regras simples sobre os dados cadastrais e de compliance, as decisões de extrair_decisoes
+(contagem por TipoDecisao) e o histórico de sanções resolvem os casos óbvios com um parecer
+padronizado; só os perfis ambíguos seguem para o LLM:
+- baixo: nenhum processo, nenhuma decisão, nenhuma sanção (atual ou histórica) e não é PEP;
+- alto: sanção com mandado/status ativo, ou sancionado atualmente com condenação, ou
+  LIMIAR_CONDENACOES_ALTO condenações ou mais;
+- llm: todo o resto (inclusive PEP e respostas que não puderam ser interpretadas).
+
+O status de uma sanção é comparado por palavras inteiras: um status inativo (INATIVO,
+DESATIVADO, REVOGADO, "não vigente"...) nunca conta como ativo. Só contam como condenação as
+decisões condenatórias criminais (com pena) de processos em que a pessoa é ré; as demais,
+como a condenação só nas custas, ficam para o LLM.
+
+Desative com PRE_TRIAGEM_DESATIVADA=1. relatorio() mostra as rotas, a taxa de pareceres
+sem LLM e a economia estimada a partir da telemetria das chamadas ao agente de risco.
+"""
+import re
+import threading
+from collections import Counter
+
+from classificador import normalizar
+from configuracao import obter_config
+
+ROTA_BAIXO = "baixo"
+ROTA_ALTO = "alto"
+ROTA_LLM = "llm"
+
+LIMIAR_CONDENACOES_ALTO = 3
+# Palavras ou expressões inteiras (minúsculas, sem acento, plural opcional) do Status de uma
+# sanção que indicam que ela segue ativa
+STATUS_SANCAO_ATIVA = ("ativo", "ativa", "vigente", "pendente", "em aberto", "foragido", "foragida")
+# Inícios de palavra que indicam uma sanção encerrada; verificados antes dos ativos
+STATUS_SANCAO_INATIVA = ("inativ", "desativ", "revogad", "cancelad", "extint", "encerrad", "baixad", "arquivad", "cumprid", "expirad")
+
+_PADRAO_ATIVA = re.compile(r"\b(?:%s)s?\b" % "|".join(t.replace(" ", r"\s+") for t in STATUS_SANCAO_ATIVA))
+_PADRAO_INATIVA = re.compile(
+    r"\b(?:%s)|\b(?:nao|sem)\s+(?:esta\s+|mais\s+)?(?:%s)s?\b"
+    % ("|".join(STATUS_SANCAO_INATIVA), "|".join(t.replace(" ", r"\s+") for t in STATUS_SANCAO_ATIVA))
+)
+# Condenação com pena (não só nas custas ou honorários)
+_PADRAO_PENA = re.compile(r"\b(?:penas?|reclusao|detencao|privativa|restritivas?|regime)\b")
+
+PARECER_MODELO = """Parecer automático (pré-triagem por regras, sem análise do modelo de linguagem)
+
+Cliente: {nome} (CPF {cpf})
+Classificação de risco: {risco}
+
+Fundamentação:
+{motivos}
+
+{conclusao}
+"""
+
+CONCLUSOES = {
+    ROTA_BAIXO: "Não há registros desabonadores nas fontes consultadas; recomenda-se manter o cliente na base, com o monitoramento periódico padrão.",
+    ROTA_ALTO: "Os registros acima bastam para classificar o cliente como de alto risco; recomenda-se não manter o relacionamento sem análise de compliance.",
+}
+
+
+def sancao_ativa(status) -> bool:
+    """
+    True se o Status de uma sanção indica que ela segue ativa (palavras inteiras, sem acento);
+    um status inativo ou negado ("INATIVO", "NÃO VIGENTE") tem precedência.
+    """
+    status = normalizar(str(status or ""))
+    if _PADRAO_INATIVA.search(status):
+        return False
+    return bool(_PADRAO_ATIVA.search(status))
+
+
+def _sancao_ativa(sancao: dict) -> bool:
+    return sancao_ativa((sancao.get("Details") or {}).get("Status"))
+
+
+def condenacao_criminal(decisao: dict, processos_reu: set) -> bool:
+    """
+    Decisão condenatória com pena em um processo em que a pessoa é ré.
+    """
+    if decisao.get("TipoDecisao") != "Condenação" or decisao.get("Número") not in processos_reu:
+        return False
+    return bool(_PADRAO_PENA.search(normalizar(decisao.get("DecisionContent") or "")))
+
+
+def avaliar(dados_principais: dict, decisoes: list, kyc: dict) -> dict:
+    """
+    Retorna {"rota", "motivos", "contagens"}; rota é ROTA_BAIXO, ROTA_ALTO ou ROTA_LLM.
+    """
+    kyc = kyc or {}
+    contagens = dict(Counter(d.get("TipoDecisao") for d in decisoes))
+    if obter_config("PRE_TRIAGEM_DESATIVADA"):
+        return {"rota": ROTA_LLM, "motivos": ["pré-triagem desativada"], "contagens": contagens}
+    if "erro" in dados_principais:
+        return {"rota": ROTA_LLM, "motivos": ["dados não interpretados"], "contagens": contagens}
+
+    detalhes = dados_principais.get("Processos Criminais Detalhes")
+    criminais = len(detalhes) if isinstance(detalhes, list) else 0
+    total_processos = dados_principais.get("Processos") or 0
+    sancionado = bool(dados_principais.get("Sanções"))
+    pep = bool(dados_principais.get("PEP"))
+    historico = kyc.get("SanctionsHistory") or []
+    ativas = [s for s in historico if _sancao_ativa(s)]
+    processos_reu = {p.get("Número") for p in (detalhes if isinstance(detalhes, list) else []) if p.get("É Réu") == "Sim"}
+    condenacoes = sum(condenacao_criminal(d, processos_reu) for d in decisoes)
+
+    motivos = []
+    if ativas:
+        motivos.append(f"{len(ativas)} sanção(ões) com status ativo (ex.: {(ativas[0].get('Details') or {}).get('Status')}, fonte {ativas[0].get('Source')})")
+    if sancionado and condenacoes:
+        motivos.append(f"sancionado atualmente e com {condenacoes} condenação(ões) criminal(is) como réu")
+    if condenacoes >= LIMIAR_CONDENACOES_ALTO:
+        motivos.append(f"{condenacoes} condenações criminais como réu (limite {LIMIAR_CONDENACOES_ALTO})")
+    if motivos:
+        return {"rota": ROTA_ALTO, "motivos": motivos, "contagens": contagens}
+
+    if not total_processos and not criminais and not decisoes and not sancionado and not historico and not pep:
+        return {
+            "rota": ROTA_BAIXO,
+            "motivos": ["nenhum processo encontrado", "nenhuma decisão judicial", "nenhuma sanção atual ou histórica", "não é pessoa politicamente exposta"],
+            "contagens": contagens,
+        }
+    return {"rota": ROTA_LLM, "motivos": ["perfil intermediário"], "contagens": contagens}
+
+
+def parecer_padronizado(dados_principais: dict, avaliacao: dict) -> str:
+    return PARECER_MODELO.format(
+        nome=dados_principais.get("Nome"),
+        cpf=dados_principais.get("CPF"),
+        risco="BAIXO" if avaliacao["rota"] == ROTA_BAIXO else "ALTO",
+        motivos="\n".join(f"- {m}" for m in avaliacao["motivos"]),
+        conclusao=CONCLUSOES[avaliacao["rota"]],
+    )
+
+
+class EstatisticasRoteamento:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rotas = Counter()
+
+    def registrar(self, rota: str):
+        with self._lock:
+            self.rotas[rota] += 1
+
+    def relatorio(self) -> dict:
+        """
+        Rotas, taxa de pareceres sem LLM e economia estimada: pareceres evitados vezes a
+        latência e os tokens médios observados em agente.analisar_risco (telemetria).
+        """
+        import telemetria
+
+        with self._lock:
+            rotas = dict(self.rotas)
+        total = sum(rotas.values())
+        evitados = total - rotas.get(ROTA_LLM, 0)
+        risco = telemetria.resumo()["etapas"].get("agente.analisar_risco", {})
+        chamadas = risco.get("contagem", 0)
+        media_tokens = (risco.get("tokens_prompt", 0) + risco.get("tokens_resposta", 0)) / chamadas if chamadas else 0.0
+        return {
+            "rotas": rotas,
+            "total": total,
+            "sem_llm": evitados,
+            "taxa_sem_llm": evitados / total if total else 0.0,
+            "tempo_economizado_estimado_s": evitados * risco.get("tempo_medio_s", 0.0),
+            "tokens_economizados_estimados": int(evitados * media_tokens),
+        }
+
+
+estatisticas_roteamento = EstatisticasRoteamento()
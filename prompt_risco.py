@@ -0,0 +1,298 @@
+"""
+Montagem do payload do parecer de risco dentro de um orçamento de tokens.
+
+O prompt de analisar_risco serializava todos os dados do CPF (inclusive os textos integrais
+de cada processo) junto com os resumos das decisões. Aqui, se o payload não cabe no orçamento,
+ele é reduzido em etapas, das informações menos para as mais prioritárias:
+
+1. remove Decisão/Conteúdo de processos que já têm resumo (o resumo cobre o mesmo texto);
+2. substitui textos repetidos ou quase idênticos entre processos por uma referência;
+3. remove Conteúdo, depois Decisão, de todos os processos;
+4. trunca Descrição e listas de Partes;
+5. trunca o texto de Sanções Detalhadas;
+6. reduz os processos aos campos de identificação;
+7. descarta os resumos mais antigos (a lista vem ordenada do mais recente ao mais antigo).
+
+Dados cadastrais e flags de compliance nunca são removidos. Um payload que já cabe no
+orçamento é enviado sem alterações.
+
+Os textos quase idênticos são encontrados com IndiceTextos: cada texto é normalizado uma única
+vez e só é comparado com os candidatos que compartilham suas palavras mais raras, não com
+todos os textos anteriores.
+"""
+import copy
+import json
+import re
+import unicodedata
+from collections import Counter
+from heapq import nsmallest
+
+LIMITE_DESCRICAO = 600
+LIMITE_PARTES = 6
+CAMPOS_IDENTIFICACAO_PROCESSO = ("Número", "É Réu", "Tipo", "Assunto Principal", "Assunto CNJ", "Data", "Situação", "Homologação")
+
+_PADRAO_ACENTOS = re.compile(r"[\u0300-\u036f]")
+_PADRAO_SEPARADORES = re.compile(r"[^0-9A-Za-z]+")
+
+_codificador = None
+
+
+def contar_tokens(texto: str) -> int:
+    """
+    Conta tokens com tiktoken (se instalado); sem ele, usa a aproximação de ~4 caracteres por token.
+    """
+    global _codificador
+    if _codificador is None:
+        try:
+            import tiktoken
+            _codificador = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _codificador = False
+    if _codificador:
+        return len(_codificador.encode(texto, disallowed_special=()))
+    return (len(texto) + 3) // 4
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Maiúsculas, sem acentos, sem pontuação e com espaços colapsados (para comparar textos).
+    """
+    texto = texto or ""
+    if not texto.isascii():
+        texto = _PADRAO_ACENTOS.sub("", unicodedata.normalize("NFKD", texto))
+    return _PADRAO_SEPARADORES.sub(" ", texto.upper()).strip()
+
+
+LIMIAR_QUASE_IGUAIS = 0.85
+MIN_PALAVRAS_QUASE_IGUAIS = 8
+
+
+def _palavras_quase_iguais(pa: set, pb: set, limiar: float, min_palavras: int) -> bool:
+    if min(len(pa), len(pb)) < min_palavras:
+        return False
+    return len(pa & pb) / min(len(pa), len(pb)) >= limiar
+
+
+def textos_quase_iguais(a: str, b: str, limiar: float = LIMIAR_QUASE_IGUAIS, min_palavras: int = MIN_PALAVRAS_QUASE_IGUAIS) -> bool:
+    """
+    True se os textos são iguais após normalização ou, para textos longos, se a maior parte
+    das palavras do menor está no maior (ex.: versão truncada com "..." e versão integral).
+    """
+    na, nb = normalizar_texto(a), normalizar_texto(b)
+    if na == nb:
+        return True
+    return _palavras_quase_iguais(set(na.split()), set(nb.split()), limiar, min_palavras)
+
+
+class IndiceTextos:
+    """
+    Textos já vistos, para achar o primeiro quase idêntico (textos_quase_iguais) a um novo:
+
+        indice = IndiceTextos()
+        if indice.procurar(texto) is None:
+            indice.adicionar(texto, valor)
+
+    Iguais após normalização são achados por hash. Para os demais, os candidatos saem de dois
+    índices de palavras: os textos que contêm as palavras mais raras do novo texto (novo texto
+    contido em um anterior) e os textos cujas palavras mais raras, no momento em que foram
+    adicionados, estão no novo (anterior contido no novo). Só os candidatos que compartilham
+    metade dessas palavras são comparados por inteiro.
+    """
+    TAMANHO_ASSINATURA = 8
+
+    def __init__(self, limiar: float = LIMIAR_QUASE_IGUAIS, min_palavras: int = MIN_PALAVRAS_QUASE_IGUAIS):
+        self.limiar = limiar
+        self.min_palavras = min_palavras
+        self._exatos = {}          # texto normalizado -> valor
+        self._entradas = []        # (palavras, valor)
+        self._por_palavra = {}     # palavra -> entradas que a contêm
+        self._por_assinatura = {}  # palavra -> entradas que a têm entre as mais raras
+        self._normalizados = {}    # texto -> (normalizado, palavras), calculado uma vez
+        self._ultima_assinatura = (None, None)
+
+    def _normalizar(self, texto: str) -> tuple:
+        if texto not in self._normalizados:
+            normalizado = normalizar_texto(texto)
+            self._normalizados[texto] = normalizado, frozenset(normalizado.split())
+        return self._normalizados[texto]
+
+    def _assinatura(self, palavras) -> list:
+        # A última assinatura é reaproveitada por adicionar() logo depois de procurar()
+        if self._ultima_assinatura[0] is not palavras:
+            por_palavra = self._por_palavra
+            frequencias = [(len(por_palavra[p]) if p in por_palavra else 0, p) for p in palavras]
+            self._ultima_assinatura = palavras, [p for _, p in nsmallest(self.TAMANHO_ASSINATURA, frequencias)]
+        return self._ultima_assinatura[1]
+
+    def procurar(self, texto: str):
+        """
+        Valor do primeiro texto adicionado quase idêntico a texto, ou None.
+        """
+        normalizado, palavras = self._normalizar(texto)
+        if normalizado in self._exatos:
+            return self._exatos[normalizado]
+        if len(palavras) < self.min_palavras:
+            return None
+        assinatura = self._assinatura(palavras)
+        contidos = Counter(i for p in assinatura for i in self._por_palavra.get(p, ()))
+        continentes = Counter(i for p in palavras for i in self._por_assinatura.get(p, ()))
+        metade = (len(assinatura) + 1) // 2
+        candidatos = {i for i, n in contidos.items() if n >= metade}
+        candidatos.update(i for i, n in continentes.items() if n >= metade)
+        for i in sorted(candidatos):
+            anteriores, valor = self._entradas[i]
+            if _palavras_quase_iguais(anteriores, palavras, self.limiar, self.min_palavras):
+                return valor
+        return None
+
+    def adicionar(self, texto: str, valor):
+        normalizado, palavras = self._normalizar(texto)
+        self._exatos.setdefault(normalizado, valor)
+        if len(palavras) < self.min_palavras:
+            return
+        i = len(self._entradas)
+        self._entradas.append((palavras, valor))
+        for p in self._assinatura(palavras):
+            self._por_assinatura.setdefault(p, []).append(i)
+        self._ultima_assinatura = (None, None)
+        for p in palavras:
+            self._por_palavra.setdefault(p, []).append(i)
+
+
+def deduplicar_decisoes(decisoes: list) -> list:
+    """
+    Junta as decisões quase idênticas de um mesmo processo (ex.: versão truncada com "..." e
+    versão integral da mesma sentença), mantendo o texto mais completo na posição da primeira
+    ocorrência: cada decisão distinta é resumida uma vez e o parecer recebe um resumo por
+    decisão distinta. Decisões sem número de processo não são juntadas.
+    """
+    resultado = []
+    por_processo = {}  # Número -> IndiceTextos com a posição de cada decisão em resultado
+    for decisao in decisoes:
+        numero = decisao.get("Número")
+        conteudo = decisao.get("DecisionContent") or ""
+        if not numero:
+            resultado.append(decisao)
+            continue
+        indice = por_processo.setdefault(numero, IndiceTextos())
+        posicao = indice.procurar(conteudo)
+        if posicao is None:
+            indice.adicionar(conteudo, len(resultado))
+            resultado.append(decisao)
+            continue
+        if len(conteudo.rstrip(". ")) > len((resultado[posicao].get("DecisionContent") or "").rstrip(". ")):
+            resultado[posicao] = decisao
+            indice.adicionar(conteudo, posicao)
+    return resultado
+
+
+def _truncar(texto, limite: int):
+    if isinstance(texto, str) and len(texto) > limite:
+        return texto[:limite].rstrip() + f"... [truncado, {len(texto) - limite} caracteres omitidos]"
+    return texto
+
+
+def _processos(dados: dict) -> list:
+    processos = dados.get("Processos Criminais Detalhes")
+    return processos if isinstance(processos, list) else []
+
+
+def _remover_textos_resumidos(dados: dict, resumos: list):
+    resumidos = {r.get("Processo") for r in resumos}
+    for proc in _processos(dados):
+        if proc.get("Número") in resumidos:
+            proc.pop("Decisão", None)
+            proc.pop("Conteúdo", None)
+
+
+def _referenciar_textos_repetidos(dados: dict):
+    vistos = IndiceTextos()
+    for proc in _processos(dados):
+        for campo in ("Decisão", "Descrição", "Conteúdo"):
+            texto = proc.get(campo)
+            if not isinstance(texto, str) or not texto.strip():
+                continue
+            original = vistos.procurar(texto)
+            if original is None:
+                vistos.adicionar(texto, (proc.get("Número"), campo))
+            else:
+                numero, campo_original = original
+                proc[campo] = f"[mesmo texto de {campo_original} do processo {numero}]"
+
+
+def _remover_campo(campo: str):
+    def etapa(dados, resumos):
+        for proc in _processos(dados):
+            proc.pop(campo, None)
+    return etapa
+
+
+def _truncar_descricoes_e_partes(dados, resumos):
+    for proc in _processos(dados):
+        if "Descrição" in proc:
+            proc["Descrição"] = _truncar(proc["Descrição"], LIMITE_DESCRICAO)
+        partes = proc.get("Partes")
+        if isinstance(partes, list) and len(partes) > LIMITE_PARTES:
+            proc["Partes"] = partes[:LIMITE_PARTES] + [f"... (+{len(partes) - LIMITE_PARTES} partes)"]
+
+
+def _reduzir_processos_a_identificacao(dados, resumos):
+    processos = _processos(dados)
+    for i, proc in enumerate(processos):
+        processos[i] = {campo: proc.get(campo) for campo in CAMPOS_IDENTIFICACAO_PROCESSO if campo in proc}
+
+
+def tokens_payload(dados: dict, resumos: list) -> int:
+    return contar_tokens(json.dumps(dados, ensure_ascii=False, indent=2)) + contar_tokens(json.dumps(resumos, ensure_ascii=False, indent=2))
+
+
+def ajustar_payload_risco(dados: dict, resumos: list, orcamento_tokens: int, tokens_fixos: int = 0):
+    """
+    Retorna (dados, resumos, relatorio) reduzidos para caber em orcamento_tokens, contando
+    tokens_fixos do restante do prompt. Os objetos de entrada não são alterados (um payload
+    que já cabe é devolvido como veio). relatorio traz tokens antes/depois e as etapas aplicadas.
+    """
+    total = tokens_payload(dados, resumos) + tokens_fixos
+    relatorio = {"tokens_original": total, "etapas": []}
+    if total <= orcamento_tokens:
+        relatorio["tokens_final"] = total
+        relatorio["dentro_do_orcamento"] = True
+        return dados, resumos, relatorio
+    dados = copy.deepcopy(dados)
+    resumos = copy.deepcopy(resumos)
+
+    # Etapas sem perda de informação: as primeiras aplicadas
+    _remover_textos_resumidos(dados, resumos)
+    _referenciar_textos_repetidos(dados)
+    relatorio["etapas"].append("deduplicacao")
+
+    etapas = [
+        ("remover_conteudo", _remover_campo("Conteúdo")),
+        ("remover_decisao", _remover_campo("Decisão")),
+        ("truncar_descricoes_e_partes", _truncar_descricoes_e_partes),
+        ("truncar_sancoes", None),
+        ("reduzir_processos", _reduzir_processos_a_identificacao),
+        ("descartar_resumos_antigos", None),
+    ]
+    total = tokens_payload(dados, resumos) + tokens_fixos
+    for nome, etapa in etapas:
+        if total <= orcamento_tokens:
+            break
+        if nome == "truncar_sancoes":
+            sancoes = dados.get("Sanções Detalhadas")
+            if isinstance(sancoes, str):
+                excesso = total - orcamento_tokens
+                limite = max(200, len(sancoes) - excesso * 4)
+                dados["Sanções Detalhadas"] = _truncar(sancoes, limite)
+        elif nome == "descartar_resumos_antigos":
+            custos = [contar_tokens(json.dumps(r, ensure_ascii=False, indent=2)) for r in resumos]
+            while resumos and total > orcamento_tokens:
+                resumos.pop()
+                total -= custos.pop()
+        else:
+            etapa(dados, resumos)
+        total = tokens_payload(dados, resumos) + tokens_fixos
+        relatorio["etapas"].append(nome)
+    relatorio["tokens_final"] = total
+    relatorio["dentro_do_orcamento"] = total <= orcamento_tokens
+    return dados, resumos, relatorio
@@ -0,0 +1,383 @@
+"""
+Renderização HTML dos pareceres, com modelos montados uma única vez no import.
+
+- html_parecer: o relatório de um CPF (o parecer.html de app.py), com o CSS embutido ou
+  apontando para um arquivo de CSS externo;
+- html_sancoes / html_cartao_sancao: blocos de sanções do relatório e cartões do Streamlit;
+- realcar_palavras_chave: destaque de termos penais com a expressão regular já compilada;
+- gravar_relatorios: modo em lote, um arquivo por CPF (ou um relatório combinado) que
+  compartilham um único parecer.css.
+
+    python relatorio.py resultados.jsonl --diretorio relatorios [--combinado]
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+CSS_PARECER = """\
+    body {
+        font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+        background: linear-gradient(120deg, #f0f4f8 0%, #e9eefa 100%);
+        color: #23272f;
+        margin: 0;
+        padding: 0 0 40px 0;
+    }
+    h2 {
+        color: #2d6cdf;
+        margin-top: 32px;
+        margin-bottom: 18px;
+        letter-spacing: 0.5px;
+    }
+    .container {
+        max-width: 900px;
+        margin: 32px auto 0 auto;
+        background: #fff;
+        border-radius: 18px;
+        box-shadow: 0 6px 32px rgba(44, 62, 80, 0.10);
+        padding: 36px 32px 32px 32px;
+    }
+    .sanction-block {
+        background: linear-gradient(100deg, #f7faff 60%, #eaf1fb 100%);
+        border: 1.5px solid #e3e8f0;
+        border-radius: 12px;
+        margin: 28px 0;
+        padding: 22px 28px 18px 28px;
+        box-shadow: 0 2px 12px rgba(44, 62, 80, 0.07);
+        transition: box-shadow 0.2s, border 0.2s;
+        position: relative;
+    }
+    .sanction-block:hover {
+        box-shadow: 0 6px 24px rgba(44, 62, 80, 0.13);
+        border: 1.5px solid #b3cdf6;
+    }
+    .sanction-title {
+        font-size: 1.18em;
+        font-weight: 600;
+        color: #2563eb;
+        margin-bottom: 14px;
+        letter-spacing: 0.2px;
+    }
+    .no-sanction {
+        color: #888;
+        font-style: italic;
+        margin: 18px 0;
+    }
+    pre {
+        background: #f3f6fa;
+        border-radius: 6px;
+        padding: 10px 12px;
+        font-size: 1em;
+        margin: 0;
+        color: #2d3748;
+        font-family: 'Fira Mono', 'Consolas', 'Menlo', monospace;
+        white-space: pre-wrap;
+    }
+    .sanction-block div {
+        margin-bottom: 7px;
+        line-height: 1.6;
+    }
+    @media (max-width: 700px) {
+        .container {
+            padding: 12px 4vw 18px 4vw;
+        }
+        .sanction-block {
+            padding: 14px 6vw 12px 6vw;
+        }
+    }
+"""
+
+# Estilo dos cartões de sanção do app Streamlit
+CSS_CARTOES = """\
+    .sanction-card {
+        background: #fff;
+        border-radius: 18px;
+        box-shadow: 0 4px 24px rgba(44, 62, 80, 0.13);
+        margin: 32px 0 32px 0;
+        padding: 30px 32px 24px 32px;
+        position: relative;
+        transition: box-shadow 0.2s, border 0.2s;
+        border: 1.5px solid #e3e8f0;
+        max-width: 700px;
+        display: flex;
+        flex-direction: column;
+        gap: 10px;
+    }
+    .sanction-card:hover {
+        box-shadow: 0 8px 32px rgba(44, 62, 80, 0.18);
+        border: 1.5px solid #b3cdf6;
+    }
+    .sanction-title-modern {
+        font-size: 1.35em;
+        font-weight: 700;
+        color: #2563eb;
+        margin-bottom: 10px;
+        display: flex;
+        align-items: center;
+        gap: 10px;
+    }
+    .sanction-badge {
+        display: inline-block;
+        padding: 4px 14px;
+        border-radius: 16px;
+        font-size: 0.95em;
+        font-weight: 600;
+        color: #fff;
+        background: #f59e42;
+        margin-left: 10px;
+    }
+    .sanction-badge.pendente { background: #f59e42; }
+    .sanction-badge.cumprido { background: #22c55e; }
+    .sanction-badge.outro { background: #64748b; }
+    .sanction-field {
+        margin-bottom: 0px;
+        font-size: 1.08em;
+        display: flex;
+        gap: 8px;
+    }
+    .sanction-label {
+        font-weight: 600;
+        color: #374151;
+        min-width: 170px;
+        display: inline-block;
+    }
+    .sanction-icon {
+        font-size: 1.5em;
+        margin-right: 6px;
+    }
+    .sanction-desc {
+        background: #f3f6fa;
+        border-radius: 8px;
+        padding: 12px 14px;
+        font-size: 1em;
+        color: #2d3748;
+        font-family: 'Fira Mono', 'Consolas', 'Menlo', monospace;
+        white-space: pre-wrap;
+        margin-top: 8px;
+    }
+    .sanction-separator {
+        border-top: 2px dashed #e3e8f0;
+        margin: 36px 0 0 0;
+    }
+    @media (max-width: 700px) {
+        .sanction-card { padding: 14px 4vw 12px 4vw; }
+        .sanction-label { min-width: 110px; }
+    }
+"""
+
+PADRAO_DESTAQUE = re.compile(r'(condena[çc][aã]o|pena[s]?|pris[aã]o)', re.IGNORECASE)
+# \1 é a referência ao termo encontrado (o antigo app_streamlit usava \\1 numa string raw e
+# exibia um "\1" literal no lugar do termo)
+DESTAQUE = r"<span style='color:#e53935;font-weight:bold;'>\1</span>"
+
+SEM_SANCOES = "Nenhuma sanção detalhada encontrada"
+
+# (marcador no modelo, campo da sanção em dados_principais['Sanções Detalhadas'])
+CAMPOS_SANCAO = (
+    ("fonte", "Fonte"),
+    ("tipo", "Tipo"),
+    ("tipo_padronizado", "Tipo Padronizado"),
+    ("status", "Status"),
+    ("orgao", "Órgão"),
+    ("inicio", "Data de Início"),
+    ("fim", "Data de Fim"),
+    ("processo", "Número do Processo"),
+    ("mandado", "Número do Mandado"),
+    ("regime", "Regime"),
+    ("pena", "Tempo de Pena"),
+    ("recaptura", "Recaptura"),
+    ("nome_lista", "Nome na Lista"),
+    ("nascimento", "Data de Nascimento"),
+    ("descricao", "Descrição"),
+)
+# Campos exibidos com realce de palavras-chave nos cartões do Streamlit
+CAMPOS_REALCADOS = ("fonte", "tipo", "tipo_padronizado", "orgao", "regime", "pena", "recaptura", "nome_lista", "descricao")
+CAMPOS_DATA = ("inicio", "fim", "nascimento")
+
+MODELO_SANCAO = """
+        <div class='sanction-block'>
+            <div class='sanction-title'>Sanção #{idx}</div>
+            <div><b>Fonte:</b> {fonte}</div>
+            <div><b>Tipo:</b> {tipo} ({tipo_padronizado})</div>
+            <div><b>Status:</b> {status}</div>
+            <div><b>Órgão:</b> {orgao}</div>
+            <div><b>Data de Início:</b> {inicio}</div>
+            <div><b>Data de Fim:</b> {fim}</div>
+            <div><b>Número do Processo:</b> {processo}</div>
+            <div><b>Número do Mandado:</b> {mandado}</div>
+            <div><b>Regime:</b> {regime}</div>
+            <div><b>Tempo de Pena:</b> {pena}</div>
+            <div><b>Recaptura:</b> {recaptura}</div>
+            <div><b>Nome na Lista:</b> {nome_lista}</div>
+            <div><b>Data de Nascimento:</b> {nascimento}</div>
+            <div><b>Descrição da Decisão:</b> <pre style='white-space:pre-wrap'>{descricao}</pre></div>
+        </div>
+        """
+
+MODELO_CARTAO = """
+            <div class='sanction-card'>
+                <div class='sanction-title-modern'>⚖️ Sanção #{idx}
+                    <span class='sanction-badge {classe}'>{selo}</span>
+                </div>
+                <div class='sanction-field'><span class='sanction-label'>Fonte:</span> {fonte}</div>
+                <div class='sanction-field'><span class='sanction-label'>Tipo:</span> {tipo} ({tipo_padronizado})</div>
+                <div class='sanction-field'><span class='sanction-label'>Órgão:</span> {orgao}</div>
+                <div class='sanction-field'><span class='sanction-label'>Data de Início:</span> {inicio}</div>
+                <div class='sanction-field'><span class='sanction-label'>Data de Fim:</span> {fim}</div>
+                <div class='sanction-field'><span class='sanction-label'>Número do Processo:</span> {processo}</div>
+                <div class='sanction-field'><span class='sanction-label'>Número do Mandado:</span> {mandado}</div>
+                <div class='sanction-field'><span class='sanction-label'>Regime:</span> {regime}</div>
+                <div class='sanction-field'><span class='sanction-label'>Tempo de Pena:</span> {pena}</div>
+                <div class='sanction-field'><span class='sanction-label'>Recaptura:</span> {recaptura}</div>
+                <div class='sanction-field'><span class='sanction-label'>Nome na Lista:</span> {nome_lista}</div>
+                <div class='sanction-field'><span class='sanction-label'>Data de Nascimento:</span> {nascimento}</div>
+                <div class='sanction-field'><span class='sanction-label'>Descrição da Decisão:</span></div>
+                <div class='sanction-desc'>{descricao}</div>
+            </div>
+            <div class='sanction-separator'></div>
+            """
+
+ABERTURA = "\n<html>\n<head>\n<meta charset='utf-8'>\n<title>{titulo}</title>\n"
+ESTILO_EMBUTIDO = "<style>\n" + CSS_PARECER + "</style>\n"
+ESTILO_EXTERNO = "<link rel='stylesheet' href='{css}'>\n"
+MODELO_CORPO = """</head>
+<body>
+<div class='container'>
+<h2>Parecer final de risco (por agente)</h2>
+<pre style='font-family:inherit'>{parecer}</pre>
+<h2>Sanções Detalhadas</h2>
+{sancoes_html}
+</div>
+</body>
+</html>
+"""
+MODELO_SECAO = """<div class='container'>
+<h2>{titulo}</h2>
+<pre style='font-family:inherit'>{parecer}</pre>
+<h2>Sanções Detalhadas</h2>
+{sancoes_html}
+</div>
+"""
+
+
+def realcar_palavras_chave(texto) -> str:
+    if not texto:
+        return ''
+    return PADRAO_DESTAQUE.sub(DESTAQUE, texto)
+
+
+def formatar_data(data) -> str:
+    if not data or not isinstance(data, str):
+        return ''
+    try:
+        if 'T' in data:
+            dt = datetime.fromisoformat(data.replace('Z', '+00:00'))
+        else:
+            dt = datetime.strptime(data, '%Y/%m/%d')
+        return dt.strftime('%d/%m/%Y')
+    except Exception:
+        return data
+
+
+def _campos(sancao: dict) -> dict:
+    return {chave: sancao.get(campo, '') for chave, campo in CAMPOS_SANCAO}
+
+
+def html_sancoes(sancoes) -> str:
+    """
+    Blocos de sanções do relatório (ou o aviso de que não há sanções).
+    """
+    if not sancoes or sancoes == SEM_SANCOES:
+        return f"<div class='no-sanction'>{SEM_SANCOES}.</div>"
+    return '\n'.join(MODELO_SANCAO.format(idx=idx, **_campos(s)) for idx, s in enumerate(sancoes, 1))
+
+
+def html_cartao_sancao(idx: int, sancao: dict) -> str:
+    """
+    Cartão de uma sanção no app Streamlit (estilo em CSS_CARTOES).
+    """
+    campos = _campos(sancao)
+    for chave in CAMPOS_REALCADOS:
+        campos[chave] = realcar_palavras_chave(campos[chave])
+    for chave in CAMPOS_DATA:
+        campos[chave] = formatar_data(campos[chave])
+    status = (sancao.get('Status', '') or '').strip().lower()
+    classe = 'outro'
+    if 'pendente' in status:
+        classe = 'pendente'
+    elif 'cumprido' in status or 'preso' in status:
+        classe = 'cumprido'
+    return MODELO_CARTAO.format(idx=idx, classe=classe, selo=status.capitalize() if status else 'Outro', **campos)
+
+
+def _html_sancoes_cpf(dados_principais: dict) -> str:
+    sancoes = dados_principais.get('Sanções Detalhadas')
+    if isinstance(sancoes, str):
+        return f"<div class='no-sanction'>{sancoes}</div>"
+    return html_sancoes([s for s in (sancoes or []) if isinstance(s, dict)])
+
+
+def html_parecer(dados_principais: dict, parecer: str, css: str = None) -> str:
+    """
+    Relatório HTML de um CPF. Com css (caminho ou URL), o estilo vem de um arquivo externo
+    (veja gravar_css) em vez de embutido.
+    """
+    estilo = ESTILO_EXTERNO.format(css=css) if css else ESTILO_EMBUTIDO
+    corpo = MODELO_CORPO.format(parecer=parecer, sancoes_html=_html_sancoes_cpf(dados_principais))
+    return ABERTURA.format(titulo="Parecer de Risco") + estilo + corpo
+
+
+def gravar_css(caminho: str):
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(CSS_PARECER)
+
+
+def gravar_relatorios(resultados, diretorio: str, combinado: bool = False, nome_css: str = "parecer.css") -> int:
+    """
+    Grava os relatórios de vários CPFs (resultados no formato de lote.analisar_lote) em
+    diretorio: <CPF>.html para cada um ou, com combinado, um único relatorio.html com uma
+    seção por CPF. Todos usam o mesmo nome_css. Resultados com erro são ignorados; retorna
+    quantos CPFs foram gravados.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    gravar_css(os.path.join(diretorio, nome_css))
+    gravados = 0
+    if combinado:
+        with open(os.path.join(diretorio, "relatorio.html"), "w", encoding="utf-8") as f:
+            f.write(ABERTURA.format(titulo="Pareceres de Risco") + ESTILO_EXTERNO.format(css=nome_css) + "</head>\n<body>\n")
+            for resultado in resultados:
+                if "erro" in resultado:
+                    continue
+                dados_principais = resultado["dados_principais"]
+                f.write(MODELO_SECAO.format(
+                    titulo=f"{dados_principais.get('Nome', '')} (CPF {resultado['CPF']})",
+                    parecer=resultado["parecer"],
+                    sancoes_html=_html_sancoes_cpf(dados_principais),
+                ))
+                gravados += 1
+            f.write("</body>\n</html>\n")
+        return gravados
+    for resultado in resultados:
+        if "erro" in resultado:
+            continue
+        with open(os.path.join(diretorio, f"{resultado['CPF']}.html"), "w", encoding="utf-8") as f:
+            f.write(html_parecer(resultado["dados_principais"], resultado["parecer"], css=nome_css))
+        gravados += 1
+    return gravados
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Gera os relatórios HTML de um lote (JSON-lines de app.py --lote).")
+    parser.add_argument("resultados", help="Arquivo JSON-lines com os resultados do lote ('-' para stdin)")
+    parser.add_argument("--diretorio", default="relatorios", help="Diretório de saída")
+    parser.add_argument("--combinado", action="store_true", help="Um único relatorio.html com todos os CPFs")
+    args = parser.parse_args()
+
+    entrada = sys.stdin if args.resultados == "-" else open(args.resultados, encoding="utf-8")
+    with entrada:
+        resultados = (json.loads(linha) for linha in entrada if linha.strip())
+        total = gravar_relatorios(resultados, args.diretorio, combinado=args.combinado)
+    print(f"{total} relatórios gravados em {args.diretorio}", file=sys.stderr)
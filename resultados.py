@@ -0,0 +1,374 @@
+"""
+Repositório colunar dos resultados das triagens, para análises da carteira sem refazer
+consultas à BigDataCorp nem chamadas ao LLM.
+
+Cada triagem concluída (app.registrar_triagem, ativo quando RESULTADOS_DIRETORIO está
+definido) vira linhas normalizadas em quatro tabelas Parquet, particionadas pela data da
+triagem (<diretorio>/<tabela>/data_triagem=AAAA-MM-DD/<arquivo>.parquet):
+- triagens: uma linha por triagem, com rota da pré-triagem, nível de risco e parecer;
+- processos: processos criminais;
+- decisoes: decisões com TipoDecisao, data e resumo;
+- sancoes: histórico de sanções, com a coluna ativa (status em aberto).
+As linhas ficam em memória e são gravadas a cada RESULTADOS_TAMANHO_BUFFER triagens (padrão
+200), em descarregar() e na saída do processo. Com RESULTADOS_BIGQUERY_DATASET, cada arquivo
+gravado também é carregado (load job) na tabela de mesmo nome do dataset.
+
+Consultas:
+    repo = RepositorioResultados("resultados")
+    repo.clientes(tipo_decisao="Condenação", decisao_desde="2023-01-01", sancao_ativa=True)
+"""
+import atexit
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from classificador import normalizar
+from configuracao import obter_config
+from pre_triagem import ROTA_LLM, sancao_ativa
+
+logger = logging.getLogger(__name__)
+
+TABELAS = ("triagens", "processos", "decisoes", "sancoes")
+
+# (coluna, tipo) de cada tabela; "data" vira timestamp, "texto" string
+COLUNAS = {
+    "triagens": [
+        ("id_triagem", "texto"), ("cpf", "texto"), ("nome", "texto"), ("instante", "data"), ("rota", "texto"),
+        ("nivel_risco", "texto"), ("total_processos", "inteiro"), ("sancionado", "booleano"), ("pep", "booleano"),
+        ("decisoes", "inteiro"), ("parecer", "texto"),
+    ],
+    "processos": [
+        ("id_triagem", "texto"), ("cpf", "texto"), ("numero", "texto"), ("e_reu", "booleano"), ("tipo", "texto"),
+        ("assunto_principal", "texto"), ("assunto_cnj", "texto"), ("orgao", "texto"), ("comarca", "texto"),
+        ("estado", "texto"), ("situacao", "texto"), ("data_distribuicao", "data"), ("data_encerramento", "data"),
+        ("homologacao", "booleano"),
+    ],
+    "decisoes": [
+        ("id_triagem", "texto"), ("cpf", "texto"), ("numero_processo", "texto"), ("data_decisao", "data"),
+        ("tipo_decisao", "texto"), ("conteudo", "texto"), ("resumo", "texto"),
+    ],
+    "sancoes": [
+        ("id_triagem", "texto"), ("cpf", "texto"), ("fonte", "texto"), ("tipo", "texto"), ("tipo_padronizado", "texto"),
+        ("status", "texto"), ("ativa", "booleano"), ("data_inicio", "data"), ("data_fim", "data"), ("orgao", "texto"),
+        ("numero_processo", "texto"), ("numero_mandado", "texto"),
+    ],
+}
+
+# Campos de "Processos Criminais Detalhes" (app.montar_dados_principais)
+CAMPOS_PROCESSO = {
+    "numero": "Número", "tipo": "Tipo", "assunto_principal": "Assunto Principal", "assunto_cnj": "Assunto CNJ",
+    "orgao": "Órgão", "comarca": "Comarca", "estado": "Estado", "situacao": "Situação",
+    "data_distribuicao": "Data", "data_encerramento": "Data de Encerramento",
+}
+
+NIVEIS_RISCO = {"baixo": "baixo", "medio": "médio", "moderado": "médio", "alto": "alto", "elevado": "alto"}
+PADRAO_NIVEL = re.compile(
+    r"\b(?:risco\W{0,6}(?:e\s+|de\s+|classificado\s+como\s+)?\W{0,3}(baixo|medio|moderado|alto|elevado)\b"
+    r"|(baixo|medio|moderado|alto|elevado)\s+risco\b)"
+)
+
+
+def nivel_risco(parecer: str, avaliacao: dict = None) -> str:
+    """
+    Nível de risco do parecer: o da pré-triagem, ou a última menção a risco baixo/médio/alto
+    no texto do LLM (None se não houver).
+    """
+    if avaliacao and avaliacao.get("rota") != ROTA_LLM:
+        return avaliacao["rota"]
+    mencoes = PADRAO_NIVEL.findall(normalizar(parecer or ""))
+    if not mencoes:
+        return None
+    return NIVEIS_RISCO[next(m for m in mencoes[-1] if m)]
+
+
+def _texto(valor):
+    if valor is None or valor != valor:
+        return None
+    return valor if isinstance(valor, str) else str(valor)
+
+
+def linhas_triagem(dados_principais: dict, decisoes: list, kyc: dict, resumos: list, parecer: str,
+                   avaliacao: dict = None, instante: float = None) -> dict:
+    """
+    {tabela: [linhas]} de uma triagem, a partir do que a pipeline já calculou.
+    """
+    id_triagem = uuid.uuid4().hex
+    cpf = _texto(dados_principais.get("CPF"))
+    base = {"id_triagem": id_triagem, "cpf": cpf}
+    detalhes = dados_principais.get("Processos Criminais Detalhes")
+    processos = [
+        {
+            **base,
+            **{coluna: _texto(p.get(campo)) for coluna, campo in CAMPOS_PROCESSO.items()},
+            "e_reu": p.get("É Réu") == "Sim",
+            "homologacao": p.get("Homologação") == "Sim",
+        }
+        for p in (detalhes if isinstance(detalhes, list) else [])
+    ]
+    resumos = resumos or []
+    linhas_decisoes = [
+        {
+            **base,
+            "numero_processo": _texto(d.get("Número")),
+            "data_decisao": d.get("DecisionDate"),
+            "tipo_decisao": d.get("TipoDecisao"),
+            "conteudo": d.get("DecisionContent"),
+            "resumo": _texto(resumos[i].get("Resumo")) if i < len(resumos) else None,
+        }
+        for i, d in enumerate(decisoes or [])
+    ]
+    sancoes = []
+    for s in (kyc or {}).get("SanctionsHistory") or []:
+        detalhes_sancao = s.get("Details") or {}
+        sancoes.append({
+            **base,
+            "fonte": _texto(s.get("Source")),
+            "tipo": _texto(s.get("Type")),
+            "tipo_padronizado": _texto(s.get("StandardizedSanctionType")),
+            "status": _texto(detalhes_sancao.get("Status")),
+            "ativa": sancao_ativa(detalhes_sancao.get("Status")),
+            "data_inicio": s.get("StartDate"),
+            "data_fim": s.get("EndDate"),
+            "orgao": _texto(detalhes_sancao.get("Agency")),
+            "numero_processo": _texto(detalhes_sancao.get("ProcessNumber")),
+            "numero_mandado": _texto(detalhes_sancao.get("ArrestWarrantNumber")),
+        })
+    triagem = {
+        **base,
+        "nome": _texto(dados_principais.get("Nome")),
+        "instante": datetime.datetime.fromtimestamp(instante or time.time()),
+        "rota": (avaliacao or {}).get("rota"),
+        "nivel_risco": nivel_risco(parecer, avaliacao),
+        "total_processos": int(dados_principais.get("Processos") or 0),
+        "sancionado": bool(dados_principais.get("Sanções")),
+        "pep": bool(dados_principais.get("PEP")),
+        "decisoes": len(linhas_decisoes),
+        "parecer": parecer,
+    }
+    return {"triagens": [triagem], "processos": processos, "decisoes": linhas_decisoes, "sancoes": sancoes}
+
+
+def _esquema(tabela: str):
+    import pyarrow as pa
+
+    tipos = {"texto": pa.string(), "data": pa.timestamp("us"), "inteiro": pa.int64(), "booleano": pa.bool_()}
+    return pa.schema([(coluna, tipos[tipo]) for coluna, tipo in COLUNAS[tabela]])
+
+
+def _quadro(tabela: str, linhas: list):
+    import pandas as pd
+
+    quadro = pd.DataFrame(linhas, columns=[c for c, _ in COLUNAS[tabela]])
+    for coluna, tipo in COLUNAS[tabela]:
+        if tipo == "data":
+            # Datas ilegíveis viram nulas; com fuso ("...Z") são convertidas para UTC sem fuso, como
+            # as demais, que já são tratadas como UTC
+            datas = pd.to_datetime(quadro[coluna], errors="coerce", format="mixed", utc=True)
+            quadro[coluna] = datas.dt.tz_localize(None)
+    return quadro
+
+
+class RepositorioResultados:
+    def __init__(self, diretorio: str = None, tamanho_buffer: int = None, dataset_bigquery: str = None):
+        self.diretorio = diretorio or obter_config("RESULTADOS_DIRETORIO", "resultados")
+        self.tamanho_buffer = tamanho_buffer or int(obter_config("RESULTADOS_TAMANHO_BUFFER", "200"))
+        self.dataset_bigquery = dataset_bigquery if dataset_bigquery is not None else obter_config("RESULTADOS_BIGQUERY_DATASET")
+        self._lock = threading.Lock()
+        self._buffer = {tabela: [] for tabela in TABELAS}
+        self._datas = {}  # id_triagem -> data da triagem (partição) das linhas no buffer
+        self._triagens_no_buffer = 0
+
+    # ---- gravação ----
+    def registrar(self, dados_principais: dict, decisoes: list, kyc: dict, resumos: list, parecer: str,
+                  avaliacao: dict = None, instante: float = None) -> str:
+        """
+        Acrescenta uma triagem ao buffer (gravado a cada tamanho_buffer triagens). Retorna o id_triagem.
+        Uma falha na gravação não chega a quem registra (a triagem em andamento): é registrada
+        no log e as linhas ficam no buffer para a próxima tentativa.
+        """
+        linhas = linhas_triagem(dados_principais, decisoes, kyc, resumos, parecer, avaliacao, instante)
+        triagem = linhas["triagens"][0]
+        with self._lock:
+            for tabela, novas in linhas.items():
+                self._buffer[tabela].extend(novas)
+            self._datas[triagem["id_triagem"]] = triagem["instante"].date().isoformat()
+            self._triagens_no_buffer += 1
+            cheio = self._triagens_no_buffer >= self.tamanho_buffer
+        if cheio:
+            try:
+                self.descarregar()
+            except Exception:
+                logger.exception("Falha ao gravar o repositório de resultados; as triagens ficam no buffer")
+        return triagem["id_triagem"]
+
+    def descarregar(self) -> list:
+        """
+        Grava o buffer em Parquet (um arquivo por tabela e data) e retorna os caminhos gravados.
+        Se a gravação de algum arquivo falhar, as linhas dele voltam ao buffer e a exceção é relançada.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with self._lock:
+            buffer, self._buffer = self._buffer, {tabela: [] for tabela in TABELAS}
+            datas, self._datas = self._datas, {}
+            self._triagens_no_buffer = 0
+        if not any(buffer.values()):
+            return []
+        gravados = []
+        pendentes = {tabela: [] for tabela in TABELAS}
+        falha = None
+        for tabela in TABELAS:
+            por_data = {}
+            for linha in buffer[tabela]:
+                por_data.setdefault(datas[linha["id_triagem"]], []).append(linha)
+            for data, linhas in por_data.items():
+                diretorio = os.path.join(self.diretorio, tabela, f"data_triagem={data}")
+                caminho = os.path.join(diretorio, f"{time.strftime('%H%M%S')}-{uuid.uuid4().hex[:12]}.parquet")
+                try:
+                    os.makedirs(diretorio, exist_ok=True)
+                    pq.write_table(pa.Table.from_pandas(_quadro(tabela, linhas), schema=_esquema(tabela), preserve_index=False), caminho)
+                except Exception as e:
+                    # Arquivo incompleto é descartado; as linhas voltam ao buffer
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                    pendentes[tabela].extend(linhas)
+                    falha = falha or e
+                    continue
+                gravados.append((tabela, data, caminho))
+        if falha is not None:
+            with self._lock:
+                for tabela, linhas in pendentes.items():
+                    self._buffer[tabela][:0] = linhas
+                    self._datas.update((linha["id_triagem"], datas[linha["id_triagem"]]) for linha in linhas)
+                self._triagens_no_buffer += len(pendentes["triagens"])
+        if self.dataset_bigquery and gravados:
+            self.carregar_bigquery(gravados)
+        if falha is not None:
+            raise falha
+        return [caminho for _, _, caminho in gravados]
+
+    def carregar_bigquery(self, gravados: list):
+        """
+        Carrega arquivos gravados [(tabela, data, caminho)] nas tabelas de mesmo nome do dataset
+        RESULTADOS_BIGQUERY_DATASET ("projeto.dataset" ou "dataset"), particionadas por instante.
+        """
+        from google.cloud import bigquery
+        from app import obter_cliente_bigquery
+
+        cliente = obter_cliente_bigquery()
+        for tabela, _, caminho in gravados:
+            configuracao = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            )
+            if tabela == "triagens":
+                configuracao.time_partitioning = bigquery.TimePartitioning(field="instante")
+            with open(caminho, "rb") as f:
+                cliente.load_table_from_file(f, f"{self.dataset_bigquery}.{tabela}", job_config=configuracao).result()
+
+    # ---- consultas ----
+    def carregar(self, tabela: str, desde: str = None, ate: str = None, filtro=None):
+        """
+        DataFrame de uma tabela, lendo só as partições de data_triagem entre desde e ate
+        (AAAA-MM-DD, inclusive). filtro é uma expressão opcional de pyarrow.dataset.
+        """
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        caminho = os.path.join(self.diretorio, tabela)
+        if not os.path.isdir(caminho):
+            return _quadro(tabela, []).assign(data_triagem=pd.Series(dtype=object))
+        particionamento = ds.partitioning(pa.schema([("data_triagem", pa.string())]), flavor="hive")
+        conjunto = ds.dataset(caminho, format="parquet", partitioning=particionamento, schema=_esquema(tabela).append(pa.field("data_triagem", pa.string())))
+        condicao = filtro
+        for limite, operador in ((desde, "__ge__"), (ate, "__le__")):
+            if limite:
+                parte = getattr(ds.field("data_triagem"), operador)(limite)
+                condicao = parte if condicao is None else condicao & parte
+        return conjunto.to_table(filter=condicao).to_pandas()
+
+    def ultimas_triagens(self, desde: str = None, ate: str = None):
+        """
+        A triagem mais recente de cada CPF (no período).
+        """
+        triagens = self.carregar("triagens", desde, ate)
+        return triagens.sort_values("instante").drop_duplicates("cpf", keep="last").reset_index(drop=True)
+
+    def clientes(self, tipo_decisao: str = None, decisao_desde: str = None, sancao_ativa: bool = None,
+                 nivel_risco: str = None, desde: str = None, ate: str = None):
+        """
+        Clientes (última triagem de cada CPF) que atendem a todos os critérios informados:
+        decisão do tipo tipo_decisao (ex.: "Condenação") a partir de decisao_desde, sanção
+        ativa (ou nenhuma, com False) e nível de risco.
+        """
+        import pandas as pd
+
+        triagens = self.ultimas_triagens(desde, ate)
+        ids = set(triagens["id_triagem"])
+        if tipo_decisao or decisao_desde:
+            decisoes = self.carregar("decisoes", desde, ate)
+            decisoes = decisoes[decisoes["id_triagem"].isin(ids)]
+            if tipo_decisao:
+                decisoes = decisoes[decisoes["tipo_decisao"] == tipo_decisao]
+            if decisao_desde:
+                decisoes = decisoes[decisoes["data_decisao"] >= pd.Timestamp(decisao_desde)]
+            ids &= set(decisoes["id_triagem"])
+        if sancao_ativa is not None:
+            sancoes = self.carregar("sancoes", desde, ate)
+            com_ativa = set(sancoes.loc[sancoes["ativa"] & sancoes["id_triagem"].isin(ids), "id_triagem"])
+            ids = ids & com_ativa if sancao_ativa else ids - com_ativa
+        if nivel_risco:
+            ids &= set(triagens.loc[triagens["nivel_risco"] == nivel_risco, "id_triagem"])
+        return triagens[triagens["id_triagem"].isin(ids)].reset_index(drop=True)
+
+    def distribuicao_risco(self, desde: str = None, ate: str = None) -> dict:
+        """
+        Quantidade de clientes por nível de risco (última triagem de cada CPF).
+        """
+        return self.ultimas_triagens(desde, ate)["nivel_risco"].fillna("indefinido").value_counts().to_dict()
+
+
+_repositorio = None
+_repositorio_lock = threading.Lock()
+
+
+def repositorio_padrao() -> RepositorioResultados:
+    """
+    Repositório compartilhado pelo processo (RESULTADOS_DIRETORIO), descarregado na saída.
+    """
+    global _repositorio
+    if _repositorio is None:
+        with _repositorio_lock:
+            if _repositorio is None:
+                _repositorio = RepositorioResultados()
+                atexit.register(_repositorio.descarregar)
+    return _repositorio
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Consulta ao repositório de resultados das triagens (sem BigDataCorp nem LLM).")
+    parser.add_argument("--diretorio", default=obter_config("RESULTADOS_DIRETORIO", "resultados"))
+    parser.add_argument("--desde", help="Primeira data de triagem (AAAA-MM-DD)")
+    parser.add_argument("--ate", help="Última data de triagem (AAAA-MM-DD)")
+    parser.add_argument("--tipo-decisao", help='Ex.: "Condenação"')
+    parser.add_argument("--decisao-desde", help="Decisões a partir desta data (AAAA-MM-DD)")
+    parser.add_argument("--sancao-ativa", action="store_true", help="Só clientes com sanção ativa")
+    parser.add_argument("--nivel-risco", choices=["baixo", "médio", "alto"])
+    args = parser.parse_args()
+
+    repo = RepositorioResultados(args.diretorio, dataset_bigquery="")
+    clientes = repo.clientes(
+        tipo_decisao=args.tipo_decisao, decisao_desde=args.decisao_desde, sancao_ativa=True if args.sancao_ativa else None,
+        nivel_risco=args.nivel_risco, desde=args.desde, ate=args.ate,
+    )
+    clientes[["cpf", "nome", "instante", "rota", "nivel_risco", "total_processos", "sancionado", "pep"]].to_csv(sys.stdout, index=False)
+    print(f"\n{len(clientes)} clientes; risco na carteira: {repo.distribuicao_risco(args.desde, args.ate)}", file=sys.stderr)
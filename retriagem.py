@@ -0,0 +1,225 @@
+"""
+Retriagem incremental: reanalisa com LLM apenas o que mudou desde a última análise de um CPF.
+
+Para cada CPF guardamos (SQLite) um snapshot só com os campos materiais do resultado
+interpretado — processos, decisões criminais com DecisionDate, sanções com StartDate/EndDate
+e os indicadores TotalLawsuits, LastSanctionDate, sanção vigente e PEP — junto do hash do
+snapshot, dos resumos por decisão e do último parecer.
+
+Na retriagem:
+- hash igual: nenhuma chamada de LLM; o parecer anterior é reaproveitado;
+- hash diferente: só as decisões novas são resumidas e o parecer é refeito.
+diferencas() descreve o que mudou (processos, decisões e sanções novos, alterados ou removidos).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app import interpretar_dados_bdc, decisoes_para_resumo, montar_textos_decisao, agente_resumo, rotear_parecer, emitir_parecer, registrar_triagem
+from configuracao import obter_config
+from pre_triagem import avaliar
+from telemetria import span
+
+# Campos de processo que, se mudarem, exigem novo parecer (ex.: Última Movimentação não entra)
+CAMPOS_PROCESSO = ["Tipo", "Assunto Principal", "Assunto CNJ", "Órgão", "Situação", "Data de Encerramento", "É Réu", "Homologação"]
+CAMPOS_SANCAO = ["Status", "Data de Fim", "Regime", "Tempo de Pena"]
+CAMPOS_PESSOA = {"Processos": "TotalLawsuits", "Última Sanção": "LastSanctionDate", "Sanções": "IsCurrentlySanctioned", "PEP": "IsCurrentlyPEP"}
+
+
+def _hash(*partes) -> str:
+    bruto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _valor(v):
+    # Tipos do numpy/pandas viram tipos nativos, para o hash não depender da representação
+    if hasattr(v, "item"):
+        v = v.item()
+    if v != v:  # NaN
+        return None
+    return v
+
+
+def chave_decisao(decisao: dict) -> str:
+    return _hash(decisao.get("Número"), decisao.get("DecisionDate"), decisao.get("DecisionContent"))[:16]
+
+
+def montar_snapshot(tabelas: dict, decisoes: list) -> dict:
+    """
+    Snapshot com os campos materiais de um CPF, a partir das tabelas de parser_bdc e das
+    decisões de app.decisoes_para_resumo.
+    """
+    pessoa = tabelas["pessoas"].to_dict("records")[0]
+    processos = {}
+    for linha in tabelas["processos"].to_dict("records"):
+        numero = linha["Número"] or f"#{linha['IdProcesso']}"
+        processos[numero] = {campo: _valor(linha[campo]) for campo in CAMPOS_PROCESSO}
+    sancoes = {}
+    for linha in tabelas["sancoes"].to_dict("records"):
+        identificacao = [_valor(linha[c]) for c in ("Fonte", "Tipo", "Tipo Padronizado", "Data de Início", "Número do Processo")]
+        sancoes[_hash(*identificacao)[:16]] = {
+            "Fonte": identificacao[0],
+            "Data de Início": identificacao[3],
+            **{campo: _valor(linha[campo]) for campo in CAMPOS_SANCAO},
+        }
+    return {
+        "pessoa": {campo: _valor(pessoa[coluna]) for coluna, campo in CAMPOS_PESSOA.items()},
+        "processos": processos,
+        "decisoes": {
+            chave_decisao(d): {"Processo": d["Número"], "DecisionDate": d.get("DecisionDate"), "TipoDecisao": d["TipoDecisao"]}
+            for d in decisoes
+        },
+        "sancoes": sancoes,
+    }
+
+
+def hash_snapshot(snapshot: dict) -> str:
+    return _hash(snapshot)
+
+
+def _comparar(antes: dict, depois: dict) -> dict:
+    return {
+        "novos": sorted(k for k in depois if k not in antes),
+        "alterados": sorted(k for k in depois if k in antes and antes[k] != depois[k]),
+        "removidos": sorted(k for k in antes if k not in depois),
+    }
+
+
+def diferencas(anterior: dict, atual: dict) -> dict:
+    """
+    O que mudou entre dois snapshots. "material" indica se o parecer precisa ser refeito.
+    """
+    pessoa = {
+        campo: {"antes": anterior["pessoa"].get(campo), "depois": valor}
+        for campo, valor in atual["pessoa"].items()
+        if anterior["pessoa"].get(campo) != valor
+    }
+    mudancas = {
+        "pessoa": pessoa,
+        "processos": _comparar(anterior["processos"], atual["processos"]),
+        "decisoes": _comparar(anterior["decisoes"], atual["decisoes"]),
+        "sancoes": _comparar(anterior["sancoes"], atual["sancoes"]),
+    }
+    mudancas["material"] = bool(pessoa) or any(
+        any(mudancas[grupo].values()) for grupo in ("processos", "decisoes", "sancoes")
+    )
+    return mudancas
+
+
+class RepositorioSnapshots:
+    """
+    Último snapshot e resultado analisado por CPF, em SQLite (SNAPSHOTS_CAMINHO).
+    """
+    def __init__(self, caminho: str = None):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.caminho is None:
+                self.caminho = obter_config("SNAPSHOTS_CAMINHO", os.path.join(".cache", "themis_snapshots.sqlite3"))
+            diretorio = os.path.dirname(self.caminho)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    cpf TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    resultado TEXT NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def obter(self, cpf: str) -> dict:
+        """
+        {"hash", "snapshot", "resultado", "atualizado_em"} do CPF, ou None.
+        """
+        with self._lock:
+            linha = self._conexao().execute(
+                "SELECT hash, snapshot, resultado, atualizado_em FROM snapshots WHERE cpf = ?", (cpf,)
+            ).fetchone()
+        if linha is None:
+            return None
+        return {"hash": linha[0], "snapshot": json.loads(linha[1]), "resultado": json.loads(linha[2]), "atualizado_em": linha[3]}
+
+    def gravar(self, cpf: str, hash_: str, snapshot: dict, resultado: dict):
+        with self._lock:
+            self._conexao().execute(
+                "INSERT OR REPLACE INTO snapshots (cpf, hash, snapshot, resultado, atualizado_em) VALUES (?, ?, ?, ?, ?)",
+                (
+                    cpf,
+                    hash_,
+                    json.dumps(snapshot, ensure_ascii=False, default=str),
+                    json.dumps(resultado, ensure_ascii=False, default=str),
+                    time.time(),
+                ),
+            )
+
+    def remover(self, cpf: str) -> bool:
+        with self._lock:
+            return self._conexao().execute("DELETE FROM snapshots WHERE cpf = ?", (cpf,)).rowcount > 0
+
+    def quantidade(self) -> int:
+        with self._lock:
+            return self._conexao().execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+
+def analisar_incremental(cpf: str, bdc_data: dict, repositorio: RepositorioSnapshots):
+    """
+    Como app.analisar_dados_bdc, mas aproveitando a última análise do CPF. Retorna
+    (dados_principais, resumos, parecer, info), com info = {"status": "novo" | "inalterado" |
+    "atualizado", "mudancas", "resumos_novos"}.
+    """
+    tabelas, dados_principais, kyc = interpretar_dados_bdc(bdc_data)
+    if tabelas is None:
+        # Resposta ilegível: segue o fluxo completo sem tocar no snapshot salvo
+        parecer = emitir_parecer(dados_principais, [], rotear_parecer(dados_principais, [], kyc))
+        return dados_principais, [], parecer, {"status": "erro", "mudancas": None, "resumos_novos": 0}
+    decisoes = decisoes_para_resumo(tabelas)
+    with span("snapshot") as s:
+        snapshot = montar_snapshot(tabelas, decisoes)
+        hash_atual = hash_snapshot(snapshot)
+        anterior = repositorio.obter(cpf)
+        s.definir(inalterado=anterior is not None and anterior["hash"] == hash_atual)
+    if anterior is not None and anterior["hash"] == hash_atual:
+        resultado = anterior["resultado"]
+        # A triagem conta no repositório de resultados mesmo sem mudanças. Snapshots gravados
+        # antes de a avaliação ser guardada a recalculam (só regras, sem LLM nem estatística de rota)
+        avaliacao = resultado.get("avaliacao") or avaliar(dados_principais, decisoes, kyc)
+        registrar_triagem(dados_principais, decisoes, kyc, resultado["resumos"], resultado["parecer"], avaliacao)
+        return dados_principais, resultado["resumos"], resultado["parecer"], {"status": "inalterado", "mudancas": None, "resumos_novos": 0}
+
+    mudancas = diferencas(anterior["snapshot"], snapshot) if anterior is not None else None
+    resumos_anteriores = anterior["resultado"].get("resumos_por_decisao", {}) if anterior is not None else {}
+    chaves = [chave_decisao(d) for d in decisoes]
+    pendentes = [i for i, chave in enumerate(chaves) if chave not in resumos_anteriores]
+    resumos_por_decisao = {chave: resumos_anteriores[chave] for chave in chaves if chave in resumos_anteriores}
+    if pendentes:
+        textos = montar_textos_decisao([decisoes[i] for i in pendentes], kyc)
+        novos = agente_resumo.run_many(
+            [{"decisao": texto} for texto in textos],
+            max_concurrency=int(obter_config('MAX_RESUMOS_PARALELOS', '8')),
+        )
+        for i, resumo in zip(pendentes, novos):
+            resumos_por_decisao[chaves[i]] = resumo
+    resumos = [{"Processo": d["Número"], "Resumo": resumos_por_decisao[chave]} for d, chave in zip(decisoes, chaves)]
+    avaliacao = rotear_parecer(dados_principais, decisoes, kyc)
+    parecer = emitir_parecer(dados_principais, resumos, avaliacao)
+    registrar_triagem(dados_principais, decisoes, kyc, resumos, parecer, avaliacao)
+    repositorio.gravar(cpf, hash_atual, snapshot, {
+        "resumos": resumos,
+        "resumos_por_decisao": resumos_por_decisao,
+        "parecer": parecer,
+        "avaliacao": avaliacao,
+    })
+    info = {"status": "atualizado" if anterior is not None else "novo", "mudancas": mudancas, "resumos_novos": len(pendentes)}
+    return dados_principais, resumos, parecer, info
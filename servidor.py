@@ -0,0 +1,276 @@
+"""
+Modo servidor: API HTTP de triagem de longa duração.
+
+Um único processo mantém aquecidos os clientes da OpenAI e da BigDataCorp, o cache da
+BigDataCorp e o loop dos agentes, e atende a várias sessões (ex.: o app Streamlit):
+
+- POST /analises {"cpf", "forcar_atualizacao"?, "assincrono"?}: inicia a análise. Sem
+  "assincrono", aguarda e responde 200 com {"dados_principais", "resumos", "parecer"} (202 com
+  o trabalho se passar de SERVIDOR_ESPERA_MAXIMA_S); com "assincrono", responde 202 com o
+  trabalho para acompanhamento;
+- GET /analises/<id>?desde=N&espera=S: estado do trabalho e os eventos de
+  app.pipeline_analise_cpf_stream a partir do N-ésimo, aguardando até S segundos por eventos
+  novos (long polling);
+- GET /saude e GET /metrics (telemetria no formato do Prometheus).
+
+Pedidos simultâneos para o mesmo CPF são agrupados em uma única execução da pipeline; um
+pedido com forcar_atualizacao só reaproveita uma execução que também foi forçada. Trabalhos
+concluídos ficam disponíveis por SERVIDOR_RETENCAO_S segundos; no máximo
+SERVIDOR_MAX_ANALISES pipelines rodam ao mesmo tempo.
+
+    python servidor.py --porta 8000
+"""
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app import (
+    obter_cache_bdc,
+    obter_cliente_bdc,
+    obter_cliente_openai,
+    obter_cliente_openai_async,
+    pipeline_analise_cpf_stream,
+    sanitizar_cpf,
+)
+from agents import loop_compartilhado
+from configuracao import obter_config
+import telemetria
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+class Trabalho:
+    """
+    Uma execução da pipeline para um CPF, compartilhada por todos os pedidos agrupados nela.
+    """
+    def __init__(self, cpf: str, forcar_atualizacao: bool = False):
+        self.id = uuid.uuid4().hex
+        self.cpf = cpf
+        self.forcar_atualizacao = forcar_atualizacao
+        self.status = PENDENTE
+        self.eventos = []
+        self.resultado = None
+        self.erro = None
+        self.pedidos = 1
+        self.criado_em = time.time()
+        self.concluido_em = None
+        self._condicao = threading.Condition()
+
+    @property
+    def terminado(self) -> bool:
+        return self.status in (CONCLUIDO, ERRO)
+
+    def executar(self):
+        with self._condicao:
+            self.status = EXECUTANDO
+        try:
+            for tipo, conteudo in pipeline_analise_cpf_stream(self.cpf, forcar_atualizacao=self.forcar_atualizacao):
+                if tipo == "concluido":
+                    dados_principais, resumos, parecer = conteudo
+                    self.resultado = {"dados_principais": dados_principais, "resumos": resumos, "parecer": parecer}
+                with self._condicao:
+                    self.eventos.append((tipo, conteudo))
+                    self._condicao.notify_all()
+            status, erro = CONCLUIDO, None
+        except Exception as e:
+            status, erro = ERRO, str(e)
+        with self._condicao:
+            self.status, self.erro = status, erro
+            self.concluido_em = time.time()
+            self._condicao.notify_all()
+
+    def aguardar(self, desde: int = 0, espera: float = None) -> bool:
+        """
+        Bloqueia até haver mais de `desde` eventos ou o trabalho terminar (no máximo `espera`
+        segundos). Retorna se há algo novo.
+        """
+        with self._condicao:
+            return self._condicao.wait_for(lambda: len(self.eventos) > desde or self.terminado, timeout=espera)
+
+    def aguardar_fim(self, espera: float = None) -> bool:
+        with self._condicao:
+            return self._condicao.wait_for(lambda: self.terminado, timeout=espera)
+
+    def como_dict(self, desde: int = 0) -> dict:
+        with self._condicao:
+            eventos = self.eventos[desde:]
+            return {
+                "id": self.id,
+                "cpf": self.cpf,
+                "status": self.status,
+                "pedidos": self.pedidos,
+                "eventos": eventos,
+                "proximo": desde + len(eventos),
+                "resultado": self.resultado if self.status == CONCLUIDO else None,
+                "erro": self.erro,
+            }
+
+
+class ServicoTriagem:
+    def __init__(self, max_analises: int = None, retencao: float = None):
+        self.max_analises = max_analises or int(obter_config("SERVIDOR_MAX_ANALISES", "8"))
+        self.retencao = retencao if retencao is not None else float(obter_config("SERVIDOR_RETENCAO_S", "600"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_analises, thread_name_prefix="servidor-analise")
+        self._lock = threading.Lock()
+        self._trabalhos = {}      # id -> Trabalho
+        self._em_andamento = {}   # cpf -> Trabalho ainda não terminado
+        self.agrupados = 0
+
+    def aquecer(self):
+        """
+        Cria os clientes, o cache e o loop dos agentes antes do primeiro pedido.
+        """
+        with telemetria.span("servidor.aquecer"):
+            obter_cliente_openai()
+            obter_cliente_openai_async()
+            obter_cliente_bdc()
+            obter_cache_bdc()
+            loop_compartilhado()
+
+    def solicitar(self, cpf: str, forcar_atualizacao: bool = False) -> Trabalho:
+        """
+        Trabalho da análise do CPF (já sanitizado): o que estiver em andamento para ele, ou um novo.
+        """
+        with self._lock:
+            self._limpar()
+            trabalho = self._em_andamento.get(cpf)
+            if trabalho is not None and not trabalho.terminado and (trabalho.forcar_atualizacao or not forcar_atualizacao):
+                trabalho.pedidos += 1
+                self.agrupados += 1
+                return trabalho
+            trabalho = Trabalho(cpf, forcar_atualizacao)
+            self._trabalhos[trabalho.id] = trabalho
+            self._em_andamento[cpf] = trabalho
+        self._executor.submit(self._executar, trabalho)
+        return trabalho
+
+    def _executar(self, trabalho: Trabalho):
+        trabalho.executar()
+        with self._lock:
+            if self._em_andamento.get(trabalho.cpf) is trabalho:
+                del self._em_andamento[trabalho.cpf]
+
+    def obter(self, id_trabalho: str) -> Trabalho:
+        with self._lock:
+            return self._trabalhos.get(id_trabalho)
+
+    def _limpar(self):
+        limite = time.time() - self.retencao
+        for id_trabalho in [i for i, t in self._trabalhos.items() if t.concluido_em is not None and t.concluido_em < limite]:
+            del self._trabalhos[id_trabalho]
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                "trabalhos": len(self._trabalhos),
+                "em_andamento": len(self._em_andamento),
+                "pedidos_agrupados": self.agrupados,
+                "max_analises": self.max_analises,
+            }
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def criar_servidor(servico: ServicoTriagem, porta: int = 8000, endereco: str = "127.0.0.1") -> ThreadingHTTPServer:
+    espera_maxima = float(obter_config("SERVIDOR_ESPERA_MAXIMA_S", "300"))
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, corpo: dict):
+            dados = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            partes = url.path.strip("/").split("/")
+            if url.path == "/saude":
+                self._json(200, {"status": "ok", **servico.estado()})
+            elif url.path == "/metrics":
+                corpo = telemetria.metricas_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+            elif len(partes) == 2 and partes[0] == "analises":
+                trabalho = servico.obter(partes[1])
+                if trabalho is None:
+                    self._json(404, {"erro": "trabalho não encontrado"})
+                    return
+                parametros = parse_qs(url.query)
+                try:
+                    desde = int(parametros.get("desde", ["0"])[0])
+                    espera = min(float(parametros.get("espera", ["0"])[0]), espera_maxima)
+                except ValueError:
+                    self._json(400, {"erro": "desde e espera devem ser numéricos"})
+                    return
+                if espera > 0:
+                    trabalho.aguardar(desde, espera)
+                self._json(200, trabalho.como_dict(desde))
+            else:
+                self._json(404, {"erro": "rota não encontrada"})
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/analises":
+                self._json(404, {"erro": "rota não encontrada"})
+                return
+            try:
+                pedido = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            except ValueError:
+                self._json(400, {"erro": "corpo JSON inválido"})
+                return
+            cpf = sanitizar_cpf(str(pedido.get("cpf") or ""))
+            if len(cpf) != 11:
+                self._json(400, {"erro": "CPF inválido"})
+                return
+            trabalho = servico.solicitar(cpf, forcar_atualizacao=bool(pedido.get("forcar_atualizacao")))
+            if pedido.get("assincrono"):
+                self._json(202, trabalho.como_dict())
+                return
+            trabalho.aguardar_fim(espera_maxima)
+            if trabalho.status == CONCLUIDO:
+                self._json(200, trabalho.resultado)
+            elif trabalho.status == ERRO:
+                self._json(502, {"erro": trabalho.erro, "id": trabalho.id})
+            else:
+                self._json(202, trabalho.como_dict())
+
+    servidor = ThreadingHTTPServer((endereco, porta), Handler)
+    servidor.daemon_threads = True
+    return servidor
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Servidor HTTP da análise de risco jurídico.")
+    parser.add_argument("--porta", type=int, default=int(obter_config("SERVIDOR_PORTA", "8000")))
+    parser.add_argument("--endereco", default=obter_config("SERVIDOR_ENDERECO", "127.0.0.1"))
+    args = parser.parse_args()
+
+    servico = ServicoTriagem()
+    servico.aquecer()
+    servidor = criar_servidor(servico, args.porta, args.endereco)
+    print(f"Servidor de triagem em http://{args.endereco}:{args.porta}", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.encerrar()
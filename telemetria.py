@@ -0,0 +1,284 @@
+"""
+Instrumentação da pipeline: spans com tempo, bytes de payload e tokens de LLM.
+
+Cada etapa é envolvida por um span:
+
+    with span("fetch", documento=cpf) as s:
+        ...
+        s.definir(bytes=len(corpo))
+
+Os spans aninhados formam um trace (trace_id, span_id, parent_id) propagado por contextvars;
+para continuar o trace em outra thread, submeta a função com contextvars.copy_context().run.
+
+Exportação (configurada pelo ambiente no primeiro span concluído):
+- TELEMETRIA_JSONL: arquivo onde cada span concluído vira uma linha JSON;
+- TELEMETRIA_PROMETHEUS_PORTA: porta de um endpoint /metrics no formato texto do Prometheus
+  (endereço em TELEMETRIA_PROMETHEUS_ENDERECO, padrão 0.0.0.0).
+As métricas agregadas também ficam disponíveis em metricas_prometheus().
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+from configuracao import obter_config
+
+LIMITES_DURACAO = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_span_atual = contextvars.ContextVar("themis_span_atual", default=None)
+
+
+class Span:
+    def __init__(self, nome: str, pai: "Span" = None, **atributos):
+        self.nome = nome
+        self.trace_id = pai.trace_id if pai else os.urandom(8).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = pai.span_id if pai else None
+        self.atributos = atributos
+        self.erro = None
+        self.inicio = time.time()
+        self._inicio_perf = time.perf_counter()
+        self.duracao = None
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+    def finalizar(self, erro: BaseException = None):
+        if self.duracao is not None:
+            return
+        self.duracao = time.perf_counter() - self._inicio_perf
+        if erro is not None:
+            self.erro = f"{type(erro).__name__}: {erro}"
+        _registrar(self)
+
+    def como_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "nome": self.nome,
+            "inicio": self.inicio,
+            "duracao_s": self.duracao,
+            "status": "erro" if self.erro else "ok",
+            "erro": self.erro,
+            "atributos": self.atributos,
+        }
+
+
+def iniciar_span(nome: str, **atributos) -> Span:
+    """
+    Cria um span filho do span atual sem torná-lo o span atual; finalize com span.finalizar().
+    Útil em geradores, onde o contexto não deve atravessar os yields.
+    """
+    return Span(nome, _span_atual.get(), **atributos)
+
+
+@contextlib.contextmanager
+def span(nome: str, **atributos):
+    """
+    Mede o bloco como um span filho do span atual; exceções marcam o span com erro e são relançadas.
+    """
+    s = iniciar_span(nome, **atributos)
+    token = _span_atual.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.finalizar(erro=e)
+        raise
+    finally:
+        try:
+            _span_atual.reset(token)
+        except ValueError:
+            # Gerador com um span aberto encerrado em outro contexto (ex.: coletado pelo GC)
+            pass
+        s.finalizar()
+
+
+@contextlib.contextmanager
+def ativar(s: Span):
+    """
+    Torna s o span atual durante o bloco (ex.: para continuar em outra thread o trace de um item).
+    """
+    token = _span_atual.set(s)
+    try:
+        yield s
+    finally:
+        _span_atual.reset(token)
+
+
+def span_atual() -> Span:
+    return _span_atual.get()
+
+
+def definir(**atributos):
+    """
+    Acrescenta atributos ao span atual (sem efeito fora de um span).
+    """
+    s = _span_atual.get()
+    if s is not None:
+        s.definir(**atributos)
+
+
+def registrar_uso_llm(uso, modelo: str, alvo: Span = None):
+    """
+    Registra os tokens de prompt/resposta de response.usage no span (padrão: o atual).
+    """
+    if uso is None:
+        return
+    tokens_prompt = getattr(uso, "prompt_tokens", None) or 0
+    tokens_resposta = getattr(uso, "completion_tokens", None) or 0
+    alvo = alvo or _span_atual.get()
+    if alvo is not None:
+        alvo.definir(
+            modelo=modelo,
+            tokens_prompt=alvo.atributos.get("tokens_prompt", 0) + tokens_prompt,
+            tokens_resposta=alvo.atributos.get("tokens_resposta", 0) + tokens_resposta,
+        )
+    with _lock:
+        _tokens[(modelo, "prompt")] = _tokens.get((modelo, "prompt"), 0) + tokens_prompt
+        _tokens[(modelo, "completion")] = _tokens.get((modelo, "completion"), 0) + tokens_resposta
+
+
+# ---- agregação e exportação ----
+_lock = threading.Lock()
+_duracoes = {}   # nome -> {"buckets": [...], "soma": float, "contagem": int, "erros": int}
+_bytes = {}      # nome -> bytes somados
+_tokens = {}     # (modelo, tipo) -> tokens somados
+_tokens_span = {}  # nome -> [tokens de prompt, tokens de resposta]
+_arquivo_jsonl = None
+_configurado = False
+_servidor_prometheus = None
+
+
+def _configurar():
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+    caminho = obter_config("TELEMETRIA_JSONL")
+    if caminho:
+        exportar_jsonl(caminho)
+    porta = obter_config("TELEMETRIA_PROMETHEUS_PORTA")
+    if porta:
+        iniciar_servidor_prometheus(int(porta), obter_config("TELEMETRIA_PROMETHEUS_ENDERECO", "0.0.0.0"))
+
+
+def _registrar(s: Span):
+    with _lock:
+        _configurar()
+        dados = _duracoes.get(s.nome)
+        if dados is None:
+            dados = _duracoes[s.nome] = {"buckets": [0] * len(LIMITES_DURACAO), "soma": 0.0, "contagem": 0, "erros": 0}
+        for i, limite in enumerate(LIMITES_DURACAO):
+            if s.duracao <= limite:
+                dados["buckets"][i] += 1
+        dados["soma"] += s.duracao
+        dados["contagem"] += 1
+        if s.erro:
+            dados["erros"] += 1
+        if s.atributos.get("bytes"):
+            _bytes[s.nome] = _bytes.get(s.nome, 0) + s.atributos["bytes"]
+        if "tokens_prompt" in s.atributos:
+            tokens = _tokens_span.setdefault(s.nome, [0, 0])
+            tokens[0] += s.atributos["tokens_prompt"]
+            tokens[1] += s.atributos.get("tokens_resposta", 0)
+        if _arquivo_jsonl is not None:
+            _arquivo_jsonl.write(json.dumps(s.como_dict(), ensure_ascii=False, default=str) + "\n")
+            _arquivo_jsonl.flush()
+
+
+def exportar_jsonl(caminho: str):
+    """
+    Passa a gravar cada span concluído como uma linha JSON em caminho (modo append).
+    """
+    global _arquivo_jsonl
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    _arquivo_jsonl = open(caminho, "a", encoding="utf-8")
+
+
+def _rotulo(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metricas_prometheus() -> str:
+    """
+    Métricas agregadas no formato de exposição em texto do Prometheus.
+    """
+    linhas = [
+        "# HELP themis_span_duracao_segundos Duração das etapas da pipeline.",
+        "# TYPE themis_span_duracao_segundos histogram",
+    ]
+    with _lock:
+        for nome, dados in sorted(_duracoes.items()):
+            rotulo = _rotulo(nome)
+            for limite, quantidade in zip(LIMITES_DURACAO, dados["buckets"]):
+                linhas.append(f'themis_span_duracao_segundos_bucket{{span="{rotulo}",le="{limite}"}} {quantidade}')
+            linhas.append(f'themis_span_duracao_segundos_bucket{{span="{rotulo}",le="+Inf"}} {dados["contagem"]}')
+            linhas.append(f'themis_span_duracao_segundos_sum{{span="{rotulo}"}} {dados["soma"]}')
+            linhas.append(f'themis_span_duracao_segundos_count{{span="{rotulo}"}} {dados["contagem"]}')
+        linhas += ["# HELP themis_span_erros_total Etapas encerradas com exceção.", "# TYPE themis_span_erros_total counter"]
+        for nome, dados in sorted(_duracoes.items()):
+            linhas.append(f'themis_span_erros_total{{span="{_rotulo(nome)}"}} {dados["erros"]}')
+        linhas += ["# HELP themis_payload_bytes_total Bytes de payload recebidos por etapa.", "# TYPE themis_payload_bytes_total counter"]
+        for nome, total in sorted(_bytes.items()):
+            linhas.append(f'themis_payload_bytes_total{{span="{_rotulo(nome)}"}} {total}')
+        linhas += ["# HELP themis_llm_tokens_total Tokens consumidos nas chamadas de LLM.", "# TYPE themis_llm_tokens_total counter"]
+        for (modelo, tipo), total in sorted(_tokens.items()):
+            linhas.append(f'themis_llm_tokens_total{{modelo="{_rotulo(modelo)}",tipo="{tipo}"}} {total}')
+    return "\n".join(linhas) + "\n"
+
+
+def iniciar_servidor_prometheus(porta: int, endereco: str = "0.0.0.0"):
+    """
+    Sobe, em uma thread daemon, um servidor HTTP que expõe metricas_prometheus() em /metrics.
+    """
+    global _servidor_prometheus
+    if _servidor_prometheus is not None:
+        return _servidor_prometheus
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = metricas_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    _servidor_prometheus = ThreadingHTTPServer((endereco, porta), Handler)
+    _servidor_prometheus.daemon_threads = True
+    threading.Thread(target=_servidor_prometheus.serve_forever, daemon=True, name="telemetria-prometheus").start()
+    return _servidor_prometheus
+
+
+def resumo() -> dict:
+    """
+    Por etapa: contagem, erros, tempo total e médio; mais bytes e tokens acumulados.
+    """
+    with _lock:
+        return {
+            "etapas": {
+                nome: {
+                    "contagem": dados["contagem"],
+                    "erros": dados["erros"],
+                    "tempo_total_s": dados["soma"],
+                    "tempo_medio_s": dados["soma"] / dados["contagem"] if dados["contagem"] else 0.0,
+                    "bytes": _bytes.get(nome, 0),
+                    "tokens_prompt": _tokens_span.get(nome, [0, 0])[0],
+                    "tokens_resposta": _tokens_span.get(nome, [0, 0])[1],
+                }
+                for nome, dados in _duracoes.items()
+            },
+            "tokens": {f"{modelo}:{tipo}": total for (modelo, tipo), total in _tokens.items()},
+        }
@@ -0,0 +1,59 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture(scope="session")
+def servidor_simulado():
+    """
+    Simuladores da BigDataCorp e da OpenAI (benchmarks/simuladores.py) sem latência, com o
+    app apontado para eles e os caches desativados.
+    """
+    sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+    from simuladores import ServidorSimulado
+    import app
+
+    ambiente = dict(os.environ)
+    with ServidorSimulado(latencia_bdc=0, latencia_bdc_por_processo=0, latencia_llm=0, tokens_por_segundo=1e9,
+                          jitter=0, latencia_batch=0.05) as servidor:
+        servidor.configurar_ambiente()
+        app._openai_client = app._openai_async_client = None
+        app._clientes_bdc.clear()
+        yield servidor
+    os.environ.clear()
+    os.environ.update(ambiente)
+    app._openai_client = app._openai_async_client = None
+    app._clientes_bdc.clear()
+
+
+@pytest.fixture
+def simulador(servidor_simulado, monkeypatch):
+    """
+    servidor_simulado com contadores zerados e 2 processos por CPF; ajustes de atributos feitos
+    com monkeypatch valem só para o teste.
+    """
+    monkeypatch.setattr(servidor_simulado, "contadores", {chave: 0 for chave in servidor_simulado.contadores})
+    monkeypatch.setattr(servidor_simulado, "processos_por_cpf", lambda cpf: 2)
+    return servidor_simulado
+
+
+def threads_da_esteira() -> list:
+    return [t for t in threading.enumerate() if t.name.startswith("esteira-")]
+
+
+@pytest.fixture
+def sem_threads_da_esteira():
+    """
+    Falha se alguma thread de esteira.Esteira continuar viva depois do teste (produtor travado).
+    """
+    yield
+    prazo = time.monotonic() + 5
+    while threads_da_esteira() and time.monotonic() < prazo:
+        time.sleep(0.01)
+    assert not threads_da_esteira()
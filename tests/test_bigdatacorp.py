@@ -0,0 +1,211 @@
+import io
+import json
+
+import pytest
+import requests
+
+from bigdatacorp import ClienteBigDataCorp, DocumentoAusente, LimitadorTaxa, separar_por_documento
+
+URL = "https://bdc.teste/pessoas"
+
+
+def resposta(status: int, corpo=None, cabecalhos: dict = None) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(corpo if corpo is not None else {}).encode("utf-8")
+    r.raw = io.BytesIO(r._content)
+    r.headers.update(cabecalhos or {})
+    r.url = URL
+    return r
+
+
+def item(documento: str, nome: str = "FULANO") -> dict:
+    return {"BasicData": {"TaxIdNumber": documento, "Name": nome}, "Processes": {"Lawsuits": []}}
+
+
+class SessaoFalsa:
+    """
+    Substitui requests.Session: responder(payload) retorna a requests.Response de cada POST.
+    """
+    def __init__(self, responder):
+        self.responder = responder
+        self.payloads = []
+        self.headers = {}
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.payloads.append(json)
+        return self.responder(json)
+
+    def close(self):
+        pass
+
+
+def documentos_da_consulta(payload: dict) -> list:
+    return payload["q"][len("doc{"):-1].split(",")
+
+
+def cliente_com(responder) -> ClienteBigDataCorp:
+    cliente = ClienteBigDataCorp("hash", "id", qps=0, backoff_base=0)
+    cliente.sessao = SessaoFalsa(responder)
+    return cliente
+
+
+def test_separar_por_documento_associa_pelo_tax_id_formatado():
+    resposta_lote = {"QueryId": "q", "Result": [item("222.222.222-22"), item("11111111111")]}
+    separadas = separar_por_documento(resposta_lote, ["11111111111", "22222222222", "33333333333"])
+    assert separadas["11111111111"] == {"QueryId": "q", "Result": [item("11111111111")]}
+    assert separadas["22222222222"]["Result"] == [item("222.222.222-22")]
+    assert isinstance(separadas["33333333333"], DocumentoAusente)
+
+
+def test_consulta_individual_sem_tax_id_fica_com_o_documento_pedido():
+    separadas = separar_por_documento({"Result": [{"BasicData": {}}]}, ["11111111111"])
+    assert separadas == {"11111111111": {"Result": [{"BasicData": {}}]}}
+
+
+def test_consultar_varios_com_resposta_parcial():
+    # O lote volta sem um dos documentos: só ele recebe DocumentoAusente, sem nova consulta
+    cliente = cliente_com(lambda payload: resposta(200, {"Result": [item(d) for d in documentos_da_consulta(payload) if d != "2"]}))
+    resultados = cliente.consultar_varios(["1", "2", "3", "1"], URL, "basic_data", tamanho_lote=2)
+    assert [documentos_da_consulta(p) for p in cliente.sessao.payloads] == [["1", "2"], ["3"]]
+    assert resultados["1"]["Result"] == [item("1")]
+    assert resultados["3"]["Result"] == [item("3")]
+    assert isinstance(resultados["2"], DocumentoAusente)
+
+
+def test_consultar_varios_repete_um_a_um_quando_o_lote_falha():
+    def responder(payload):
+        documentos = documentos_da_consulta(payload)
+        if len(documentos) > 1:
+            return resposta(400, {"Message": "consulta em lote inválida"})
+        if documentos == ["2"]:
+            return resposta(404, {"Message": "não encontrado"})
+        return resposta(200, {"Result": [item(documentos[0])]})
+
+    cliente = cliente_com(responder)
+    resultados = cliente.consultar_varios(["1", "2", "3"], URL, "basic_data")
+    assert [documentos_da_consulta(p) for p in cliente.sessao.payloads] == [["1", "2", "3"], ["1"], ["2"], ["3"]]
+    assert resultados["1"]["Result"] == [item("1")] and resultados["3"]["Result"] == [item("3")]
+    assert isinstance(resultados["2"], requests.HTTPError)
+
+
+def test_consultar_varios_com_um_documento_nao_repete_a_consulta():
+    cliente = cliente_com(lambda payload: resposta(400))
+    resultados = cliente.consultar_varios(["1"], URL, "basic_data")
+    assert len(cliente.sessao.payloads) == 1
+    assert isinstance(resultados["1"], requests.HTTPError)
+
+
+class AdaptadorFalso(requests.adapters.BaseAdapter):
+    """
+    Adaptador de transporte que devolve as respostas (ou levanta as exceções) da lista, em ordem.
+    """
+    def __init__(self, respostas: list):
+        super().__init__()
+        self.respostas = list(respostas)
+        self.enviadas = 0
+
+    def send(self, request, **kwargs):
+        self.enviadas += 1
+        proxima = self.respostas.pop(0)
+        if isinstance(proxima, Exception):
+            raise proxima
+        proxima.request = request
+        return proxima
+
+    def close(self):
+        pass
+
+
+def cliente_com_adaptador(respostas: list, **parametros):
+    esperas = []
+    cliente = ClienteBigDataCorp("hash", "id", qps=0, dormir=esperas.append, **parametros)
+    adaptador = AdaptadorFalso(respostas)
+    cliente.sessao.mount("https://", adaptador)
+    return cliente, adaptador, esperas
+
+
+def test_repete_429_e_5xx_com_backoff_exponencial():
+    cliente, adaptador, esperas = cliente_com_adaptador(
+        [resposta(503), resposta(429), resposta(502), resposta(200, {"Result": [item("1")]})],
+        backoff_base=1, backoff_max=30,
+    )
+    assert cliente.post(URL, {"q": "doc{1}"}) == {"Result": [item("1")]}
+    assert adaptador.enviadas == 4
+    # Espera base * 2^(tentativa-1), com jitter entre 50% e 100%
+    assert [1 / 2 <= esperas[0] <= 1, 1 <= esperas[1] <= 2, 2 <= esperas[2] <= 4] == [True] * 3
+    assert cliente.metricas.resumo()["tentativas_extras"] == 3
+
+
+def test_respeita_retry_after_limitado_por_backoff_max():
+    cliente, _, esperas = cliente_com_adaptador(
+        [resposta(429, cabecalhos={"Retry-After": "7"}), resposta(503, cabecalhos={"Retry-After": "120"}),
+         resposta(200, {"Result": []})],
+        backoff_max=30,
+    )
+    cliente.post(URL, {})
+    assert esperas == [7.0, 30]
+
+
+def test_desiste_quando_as_tentativas_acabam():
+    cliente, adaptador, esperas = cliente_com_adaptador([resposta(503)] * 3, max_tentativas=3)
+    with pytest.raises(requests.HTTPError):
+        cliente.post(URL, {})
+    assert (adaptador.enviadas, len(esperas)) == (3, 2)
+    assert cliente.metricas.resumo()["erros"] == 1
+
+
+def test_repete_falhas_de_rede_e_nao_repete_erros_do_cliente():
+    cliente, adaptador, _ = cliente_com_adaptador([requests.ConnectionError("recusada"), resposta(200, {"Result": []})])
+    assert cliente.post(URL, {}) == {"Result": []}
+    assert adaptador.enviadas == 2
+
+    cliente, adaptador, esperas = cliente_com_adaptador([requests.Timeout("lenta")] * 2, max_tentativas=2)
+    with pytest.raises(requests.Timeout):
+        cliente.post(URL, {})
+
+    cliente, adaptador, esperas = cliente_com_adaptador([resposta(400), resposta(200)])
+    with pytest.raises(requests.HTTPError):
+        cliente.post(URL, {})
+    assert (adaptador.enviadas, esperas) == (1, [])
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 0.0
+        self.esperas = []
+
+    def __call__(self) -> float:
+        return self.agora
+
+    def dormir(self, segundos: float):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+def test_limitador_libera_rajada_e_depois_qps():
+    relogio = RelogioFalso()
+    limitador = LimitadorTaxa(qps=2, capacidade=3, relogio=relogio, dormir=relogio.dormir)
+    instantes = []
+    for _ in range(7):
+        limitador.adquirir()
+        instantes.append(relogio.agora)
+    assert instantes == pytest.approx([0, 0, 0, 0.5, 1.0, 1.5, 2.0])
+
+
+def test_limitador_acumula_tokens_ate_a_capacidade():
+    relogio = RelogioFalso()
+    limitador = LimitadorTaxa(qps=1, relogio=relogio, dormir=relogio.dormir)
+    limitador.adquirir()
+    relogio.agora = 100.0  # ocioso: acumula no máximo capacidade (1) token
+    limitador.adquirir()
+    limitador.adquirir()
+    assert relogio.esperas == pytest.approx([1.0])
+
+
+def test_limitador_sem_qps_nao_espera():
+    relogio = RelogioFalso()
+    limitador = LimitadorTaxa(qps=0, relogio=relogio, dormir=relogio.dormir)
+    for _ in range(100):
+        limitador.adquirir()
+    assert relogio.esperas == []
@@ -0,0 +1,126 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import cache_bdc
+from cache_bdc import CacheBDC, separar_datasets, tamanho_resposta
+
+URL = "https://bdc.teste/pessoas"
+DATASETS = "basic_data,\n   processes.filter(partypolarity = PASSIVE, courttype = CRIMINAL),\n   kyc.filter(a, b)"
+
+
+def esperar(condicao, limite: float = 5):
+    prazo = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < prazo, "condição não atingida"
+        time.sleep(0.005)
+
+
+def buscar_em_paralelo(cache, buscar, threads: int = 8):
+    resultados = [None] * threads
+
+    def chamar(i):
+        try:
+            resultados[i] = cache.obter_ou_buscar("1", "kyc", URL, buscar)
+        except Exception as e:
+            resultados[i] = e
+
+    trabalhadores = [threading.Thread(target=chamar, args=(i,)) for i in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    return trabalhadores, resultados
+
+
+def test_chamadas_simultaneas_fazem_uma_unica_busca():
+    cache = CacheBDC()
+    liberar = threading.Event()
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        liberar.wait(5)
+        return {"Result": [{"id": 1}]}
+
+    trabalhadores, resultados = buscar_em_paralelo(cache, buscar)
+    esperar(lambda: cache.agrupadas == len(trabalhadores) - 1)
+    liberar.set()
+    for t in trabalhadores:
+        t.join()
+    assert len(chamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert cache.estatisticas()["em_andamento"] == 0
+    assert cache.obter_ou_buscar("1", "kyc", URL, lambda: pytest.fail("deveria vir do cache")) is resultados[0]
+
+
+def test_erro_da_primeira_busca_chega_a_todas_as_agrupadas():
+    cache = CacheBDC()
+    liberar = threading.Event()
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        liberar.wait(5)
+        raise ConnectionError("BigDataCorp fora do ar")
+
+    trabalhadores, resultados = buscar_em_paralelo(cache, buscar)
+    esperar(lambda: cache.agrupadas == len(trabalhadores) - 1)
+    liberar.set()
+    for t in trabalhadores:
+        t.join()
+    assert len(chamadas) == 1
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    # Nada fica em andamento nem no cache: a próxima chamada busca de novo
+    assert cache.estatisticas()["em_andamento"] == 0
+    assert cache.obter_ou_buscar("1", "kyc", URL, lambda: {"ok": True}) == {"ok": True}
+
+
+def test_forcar_ignora_a_resposta_fresca():
+    cache = CacheBDC()
+    cache.gravar("1", "kyc", URL, {"v": 1})
+    assert cache.obter_ou_buscar("1", "kyc", URL, lambda: {"v": 2}, forcar=True) == {"v": 2}
+    assert cache.obter("1", "kyc", URL) == {"v": 2}
+
+
+def test_lru_limitado_por_bytes():
+    valor = {"dados": "x" * 100}
+    tamanho = tamanho_resposta(valor)
+    cache = CacheBDC(max_bytes=3 * tamanho)
+    for documento in "abc":
+        cache.gravar(documento, "kyc", URL, valor)
+    assert cache.obter("a", "kyc", URL) == valor  # "a" passa a ser a mais recente
+    cache.gravar("d", "kyc", URL, valor)
+    assert [e["documento"] for e in cache.entradas()] == ["c", "a", "d"]
+    assert cache.bytes == 3 * tamanho
+    # Substituir uma entrada não soma o tamanho duas vezes
+    cache.gravar("a", "kyc", URL, valor)
+    assert cache.bytes == 3 * tamanho
+    # Resposta maior que o cache inteiro não é guardada nem remove as demais
+    cache.gravar("grande", "kyc", URL, {"dados": "x" * 1000})
+    assert [e["documento"] for e in cache.entradas()] == ["c", "d", "a"]
+    assert cache.limpar("c") == 1 and cache.bytes == 2 * tamanho
+
+
+def test_lru_limitado_por_entradas():
+    cache = CacheBDC(max_entradas=2, max_bytes=0)
+    for documento in "abc":
+        cache.gravar(documento, "kyc", URL, {})
+    assert [e["documento"] for e in cache.entradas()] == ["b", "c"]
+
+
+def test_frescor_e_a_menor_idade_maxima_dos_datasets(monkeypatch):
+    assert separar_datasets(DATASETS) == ["basic_data", "processes", "kyc"]
+    cache = CacheBDC(politica={"basic_data": 1000, "processes": 100, "kyc": 10}, max_idade_padrao=5)
+    assert cache.max_idade(DATASETS) == 10
+    assert cache.max_idade("basic_data, processes") == 100
+    assert cache.max_idade("desconhecido") == 5
+
+    agora = [1000.0]
+    monkeypatch.setattr(cache_bdc, "time", SimpleNamespace(time=lambda: agora[0]))
+    cache.gravar("1", DATASETS, URL, {"v": 1})
+    cache.gravar("1", "basic_data, processes", URL, {"v": 2})
+    agora[0] += 50
+    assert cache.obter("1", DATASETS, URL) is None  # o kyc (10 s) venceu
+    assert cache.obter("1", "basic_data,   processes", URL) == {"v": 2}
+    assert cache.expurgar_expirados() == 1
@@ -0,0 +1,28 @@
+import asyncio
+
+from cache_llm import CacheLLM
+
+
+def test_remove_as_menos_usadas_acima_de_max_entradas(tmp_path):
+    cache = CacheLLM(str(tmp_path / "cache.sqlite3"), ttl=0, max_entradas=2)
+    cache.gravar("a", 1)
+    cache.gravar("b", 2)
+    cache.gravar("b", 3)  # substituição não conta como entrada nova
+    assert cache.obter("a") == 1
+    cache.gravar("c", 4)
+    assert (cache.obter("a"), cache.obter("b"), cache.obter("c")) == (1, None, 4)
+    assert cache.estatisticas()["entradas"] == 2
+
+
+def test_memoizar_async(tmp_path):
+    cache = CacheLLM(str(tmp_path / "cache.sqlite3"))
+    chamadas = []
+
+    async def resumir(decisao):
+        chamadas.append(decisao)
+        return decisao.upper()
+
+    resumir_cache = cache.memoizar(resumir, contexto="v1")
+    assert asyncio.run(resumir_cache("abc")) == "ABC"
+    assert asyncio.run(resumir_cache(decisao="abc")) == "ABC"
+    assert chamadas == ["abc"]
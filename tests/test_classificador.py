@@ -0,0 +1,29 @@
+from classificador import REGRAS_PADRAO, ClassificadorDecisoes
+
+
+def test_reconhece_variacoes_sem_acento_e_mantem_a_prioridade():
+    classificador = ClassificadorDecisoes()
+    assert classificador.tipo_principal("DEFIRO A SUSPENSAO CONDICIONAL DO PROCESSO") == "Suspensão Condicional"
+    assert classificador.tipo_principal("Absolvo o réu; homologo a desistência") == "Homologação"
+    assert classificador.tipo_principal("Vistos.") == "Outro"
+
+
+def test_regras_com_lookaround():
+    regras = [("Condenação", [r"conden(?=a)"]), ("Procedência", [r"(?<=julgo )procedente"])]
+    classificador = ClassificadorDecisoes(regras)
+    assert classificador.tipo_principal("CONDENADO") == "Condenação"
+    assert classificador.tipo_principal("CONDENO") == "Outro"
+    resultado = classificador.classificar("Julgo PROCEDENTE e o réu foi condenado")
+    assert resultado["Categorias"] == ["Condenação", "Procedência"]
+    assert [(o["Categoria"], o["Trecho"]) for o in resultado["Ocorrencias"]] == [
+        ("Procedência", "PROCEDENTE"), ("Condenação", "conden"),
+    ]
+
+
+def test_ocorrencias_apontam_para_o_texto_original():
+    regras = REGRAS_PADRAO + [("Extinção da Punibilidade", [r"extint\w* (?:a )?punibilidade"])]
+    texto = "DECLARO EXTINTA A PUNIBILIDADE. Condenação anterior mantida."
+    resultado = ClassificadorDecisoes(regras).classificar(texto)
+    assert resultado["TipoDecisao"] == "Condenação"
+    assert resultado["Categorias"] == ["Condenação", "Extinção da Punibilidade"]
+    assert [texto[o["Inicio"]:o["Fim"]] for o in resultado["Ocorrencias"]] == ["EXTINTA A PUNIBILIDADE", "Conden"]
@@ -0,0 +1,41 @@
+import pytest
+
+from correspondencia_nomes import IndiceNomes, limiar_padrao, similaridade_nomes
+
+
+@pytest.mark.parametrize("alvo, parte", [
+    ("JOSÉ ANTÔNIO DA SILVA", "JOSE ANTONIO DA SILVA"),
+    ("JOSÉ ANTÔNIO DA SILVA", "José Antônio da Silva"),
+    ("JOSÉ ANTÔNIO DA SILVA", "JOSE A. SILVA"),
+    ("JOSÉ ANTÔNIO DA SILVA", "JOSE SILVA"),
+    ("JOSÉ ANTÔNIO DE OLIVEIRA", "JOSE ANTONIO DE OLIVIERA"),
+    ("JOSÉ SANTOS", "JOSE SANTOS JUNIOR"),
+])
+def test_mesma_pessoa(alvo, parte):
+    assert similaridade_nomes(alvo, parte) >= limiar_padrao()
+
+
+@pytest.mark.parametrize("alvo, parte", [
+    ("MARIA SILVA", "MARIO SILVA"),
+    ("PAULO SOUZA", "PAULA SOUZA"),
+    ("LUCAS LIMA", "LUCIA LIMA"),
+    ("JOSE SILVA", "JOSE SILVANO"),
+    ("JOSE SANTOS", "JOSE SANTOSO"),
+    ("JOSE SILVA", "MARIA JOSE SILVA"),
+    ("JOSE SANTOS JUNIOR", "JOSE SANTOS"),
+    ("JOSE SANTOS JUNIOR", "JOSE SANTOS FILHO"),
+])
+def test_outra_pessoa(alvo, parte):
+    assert similaridade_nomes(alvo, parte) == 0
+
+
+def test_sufixo_so_na_parte_reduz_a_similaridade():
+    assert similaridade_nomes("JOSE SANTOS", "JOSE SANTOS JUNIOR") < similaridade_nomes("JOSE SANTOS JUNIOR", "JOSE SANTOS JR")
+
+
+def test_indice_igual_a_comparacao_parte_a_parte():
+    partes = ["Jose Silva", "  J. Silva", "MARIA JOSE SILVA", "JOSE SILVANO", None, "jose\nsilva", "", "JOSÉ",
+              "José da Silva", "JOSEFA SILVA", "jose silva", float("nan"), "jOsÉ SILVA", "Jose Silva"]
+    esperado = [similaridade_nomes("JOSÉ SILVA", parte) if isinstance(parte, str) else 0.0 for parte in partes]
+    assert IndiceNomes(partes).similaridades("JOSÉ SILVA") == esperado
+    assert esperado[:4] == [1.0, pytest.approx(0.965), 0.0, 0.0]
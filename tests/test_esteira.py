@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from esteira import Esteira, Etapa
+
+
+def dobrar(item, emitir):
+    emitir(item * 2)
+
+
+def somar_um(item, emitir):
+    emitir(item + 1)
+
+
+pytestmark = pytest.mark.usefixtures("sem_threads_da_esteira")
+
+
+def test_um_worker_por_etapa_preserva_ordem():
+    esteira = Esteira([("dobrar", dobrar, 1), ("somar", somar_um, 1)])
+    assert list(esteira.executar(range(200))) == [2 * i + 1 for i in range(200)]
+
+
+def test_varios_workers_entregam_todos_os_itens():
+    def desdobrar(item, emitir):
+        for parte in range(3):
+            emitir((item, parte))
+
+    esteira = Esteira([("desdobrar", desdobrar, 3), ("identidade", lambda item, emitir: emitir(item), 4)])
+    assert sorted(esteira.executar(range(100))) == [(i, p) for i in range(100) for p in range(3)]
+
+
+def test_erro_em_uma_etapa_vira_falha_do_item():
+    def falhar_no_tres(item, emitir):
+        if item == 3:
+            raise ValueError("item inválido")
+        emitir(item)
+
+    esteira = Esteira([("validar", falhar_no_tres, 2), ("dobrar", dobrar, 2)])
+    resultados = list(esteira.executar(range(6)))
+    assert {"item": 3, "erro": "item inválido"} in resultados
+    assert sorted(r for r in resultados if not isinstance(r, dict)) == [0, 2, 4, 8, 10]
+
+
+def test_etapa_em_lote_rejeita_itens_com_falhar():
+    lotes = []
+
+    def em_lote(itens, emitir):
+        lotes.append(len(itens))
+        for item in itens:
+            if item % 5 == 0:
+                esteira.falhar(item, ValueError("múltiplo de 5"))
+            else:
+                emitir(item)
+
+    esteira = Esteira([Etapa("lote", em_lote, 2, tamanho_lote=4, espera_lote=0.05), ("dobrar", dobrar, 1)],
+                      ao_falhar=lambda item, erro: ("falha", item))
+    resultados = list(esteira.executar(range(20)))
+    assert sorted(r for r in resultados if isinstance(r, tuple)) == [("falha", i) for i in (0, 5, 10, 15)]
+    assert sorted(r for r in resultados if not isinstance(r, tuple)) == [2 * i for i in range(20) if i % 5]
+    assert max(lotes) <= 4 and sum(lotes) == 20
+
+
+def test_parar_conclui_os_itens_em_andamento():
+    def lento(item, emitir):
+        time.sleep(0.01)
+        emitir(item)
+
+    esteira = Esteira([("lento", lento, 1), ("dobrar", dobrar, 1)])
+    resultados = []
+    for resultado in esteira.executar(range(1000)):
+        resultados.append(resultado)
+        if len(resultados) == 3:
+            esteira.parar()
+    # Os itens já aceitos terminam todas as etapas, em ordem; nenhum item novo entra
+    assert resultados == [2 * i for i in range(len(resultados))]
+    assert len(resultados) < 1000
+
+
+def test_consumidor_que_sai_cedo_nao_trava_os_produtores():
+    esteira = Esteira([("dobrar", dobrar, 2, 1), ("somar", somar_um, 2, 1)], capacidade_saida=1)
+    iterador = esteira.executar(range(10_000))
+    assert next(iterador) in (1, 3)
+    iterador.close()  # o finally de executar aborta a esteira; a fixture confere as threads
@@ -0,0 +1,100 @@
+import hashlib
+import threading
+
+import pytest
+
+from indice_processos import IndiceProcessos
+
+DECISAO = {"Número": "0001", "DecisionDate": "2023-01-01", "DecisionContent": "CONDENO OS RÉUS"}
+
+
+def test_primeiro_cpf_e_dono_e_os_demais_recebem_o_mesmo_resumo():
+    indice = IndiceProcessos()
+    futuro, dono = indice.reservar("1", DECISAO)
+    outro, dono_outro = indice.reservar("2", dict(DECISAO))
+    assert (dono, dono_outro) == (True, False) and outro is futuro
+    indice.concluir(DECISAO, futuro, "resumo")
+    assert outro.result(timeout=1) == "resumo"
+    assert indice.relatorio() == {"processos": 1, "processos_compartilhados": 1, "decisoes": 2, "decisoes_reaproveitadas": 1}
+
+
+def test_falha_no_resumo_libera_a_decisao_para_nova_tentativa():
+    indice = IndiceProcessos()
+    futuro, _ = indice.reservar("1", DECISAO)
+    aguardando, _ = indice.reservar("2", DECISAO)
+    indice.concluir(DECISAO, futuro, erro=RuntimeError("LLM indisponível"))
+    with pytest.raises(RuntimeError):
+        aguardando.result(timeout=1)
+    _, dono = indice.reservar("3", DECISAO)
+    assert dono
+
+
+def test_decisao_sem_numero_nao_e_compartilhada():
+    indice = IndiceProcessos()
+    sem_numero = {**DECISAO, "Número": ""}
+    assert indice.reservar("1", sem_numero)[1] and indice.reservar("2", sem_numero)[1]
+
+
+def test_resumir_em_paralelo_chama_o_llm_uma_vez_por_decisao():
+    indice = IndiceProcessos()
+    decisoes = [{**DECISAO, "DecisionContent": f"DECISÃO {i}"} for i in range(5)]
+    resumidas = []
+    lock = threading.Lock()
+
+    def resumir_decisoes(lista):
+        with lock:
+            resumidas.extend(d["DecisionContent"] for d in lista)
+        return [f"resumo de {d['DecisionContent']}" for d in lista]
+
+    resultados = {}
+    threads = [threading.Thread(target=lambda cpf=cpf: resultados.__setitem__(cpf, indice.resumir(cpf, decisoes, resumir_decisoes)))
+               for cpf in "123"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert sorted(resumidas) == sorted(d["DecisionContent"] for d in decisoes)
+    assert resultados["1"] == resultados["2"] == resultados["3"] == [f"resumo de DECISÃO {i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("modo", ["lote", "esteira", "batch"])
+def test_processo_compartilhado_e_resumido_uma_vez_para_os_dois_cpfs(simulador, monkeypatch, tmp_path, modo):
+    import app
+    import lote
+    import lote_batch
+
+    cpfs = ["30000000001", "30000000002"]
+    monkeypatch.setattr(simulador, "processos_por_cpf", lambda cpf: 0)
+    monkeypatch.setattr(simulador, "grupos_processos", [cpfs])
+    monkeypatch.setattr(simulador, "processos_por_grupo", 3)
+    monkeypatch.setenv("OPENAI_BATCH_DIRETORIO", str(tmp_path))
+    monkeypatch.setenv("OPENAI_BATCH_INTERVALO_S", "0.02")
+    resumidos = []
+    lock = threading.Lock()
+    responder = simulador.resposta_llm
+
+    def resposta_llm(payload):
+        mensagens = payload["messages"]
+        if mensagens[0]["content"] != app.SISTEMA_RESUMO:
+            return responder(payload)
+        texto = mensagens[-1]["content"]
+        with lock:
+            resumidos.append(texto)
+        return "resumo " + hashlib.sha256(texto.encode("utf-8")).hexdigest()[:12], 1, 1
+
+    monkeypatch.setattr(simulador, "resposta_llm", resposta_llm)
+    indice = IndiceProcessos()
+    if modo == "lote":
+        resultados = list(lote.analisar_lote(cpfs, indice=indice))
+    elif modo == "esteira":
+        resultados = list(lote.analisar_lote_esteira(cpfs, max_llm=4, indice=indice))
+    else:
+        resultados = list(lote_batch.analisar_lote_batch(cpfs, indice=indice))
+
+    por_cpf = {r["CPF"]: r for r in resultados}
+    assert not [r for r in resultados if "erro" in r]
+    resumos = por_cpf[cpfs[0]]["resumos"]
+    assert resumos and len(resumidos) == len(set(resumidos)) == len(resumos)
+    assert sorted(resumos, key=str) == sorted(por_cpf[cpfs[1]]["resumos"], key=str)
+    assert indice.relatorio()["processos_compartilhados"] == 3
+    assert indice.relatorio()["decisoes_reaproveitadas"] == len(resumos)
@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+
+from ingestao_bdc import LeitorContado, compactar, ler_resposta
+
+pytest.importorskip("ijson")
+
+
+def test_leitura_em_streaming_igual_a_compactar_a_resposta_inteira(simulador, monkeypatch):
+    monkeypatch.setattr(simulador, "processos_por_cpf", lambda cpf: 6)
+    monkeypatch.setattr(simulador, "movimentacoes_por_processo", 3)
+    corpo = json.dumps(simulador.resposta_bdc({"q": "doc{50000000001,50000000002}"}), ensure_ascii=False).encode("utf-8")
+    leitor = LeitorContado(io.BytesIO(corpo))
+    lido = ler_resposta(leitor)
+    assert lido == compactar(json.loads(corpo))
+    assert leitor.bytes == len(corpo)
+    processos = [p for r in lido["Result"] for p in r["Processes"]["Lawsuits"]]
+    assert len(processos) == 12
+    assert not [p for p in processos if "Updates" in p]
+
+
+def test_campos_fora_do_esquema_sao_pulados_sem_afetar_os_seguintes():
+    resposta = {
+        "Result": [{
+            "Extra": {"Lista": [[1, {"a": []}], {}], "Vazio": {}},
+            "BasicData": {"Name": "FULANO", "MotherName": "CICLANA", "TaxIdNumber": "1"},
+            "Processes": {
+                "Lawsuits": [{
+                    "Updates": [{"Content": "JUNTADA", "Tags": ["x", {"y": [1]}]}],
+                    "Number": "0001",
+                    "Parties": [{"Name": "FULANO", "Doc": "1", "PartyDetails": {"SpecificType": "RÉU", "Outro": [1]}}],
+                    "Decisions": [{"DecisionContent": "CONDENO", "Juiz": {"Nome": "X"}, "DecisionDate": "2021-03-04"}],
+                }],
+                "Outros": [],
+                "TotalLawsuits": 1,
+            },
+        }],
+        "Status": {"pessoas": [{"Code": 0}]},
+    }
+    lido = ler_resposta(io.BytesIO(json.dumps(resposta).encode("utf-8")))
+    assert lido == {
+        "Result": [{
+            "BasicData": {"Name": "FULANO", "TaxIdNumber": "1"},
+            "Processes": {
+                "Lawsuits": [{
+                    "Number": "0001",
+                    "Parties": [{"Name": "FULANO", "PartyDetails": {"SpecificType": "RÉU"}}],
+                    "Decisions": [{"DecisionContent": "CONDENO", "DecisionDate": "2021-03-04"}],
+                }],
+                "TotalLawsuits": 1,
+            },
+        }],
+        "Status": {"pessoas": [{"Code": 0}]},
+    }
+    assert lido == compactar(resposta)
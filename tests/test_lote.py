@@ -0,0 +1,49 @@
+import pytest
+
+from lote import analisar_lote, analisar_lote_esteira, criar_esteira_lote
+
+CPFS = [f"{i:011d}" for i in range(1, 13)]
+
+
+def test_esteira_de_triagem_entrega_todos_os_cpfs(simulador, monkeypatch):
+    monkeypatch.setattr(simulador, "processos_por_cpf", lambda cpf: {CPFS[0]: 0, CPFS[1]: 8}.get(cpf, 2))
+    resultados = list(analisar_lote_esteira(CPFS, max_bdc=3, max_llm=4, max_risco=2))
+    assert sorted(r["CPF"] for r in resultados) == CPFS
+    assert not [r for r in resultados if "erro" in r]
+    por_cpf = {r["CPF"]: r for r in resultados}
+    assert por_cpf[CPFS[0]]["resumos"] == []
+    assert all(r["resumos"] and all(x["Resumo"] for x in r["resumos"]) for r in resultados if r["CPF"] != CPFS[0])
+    assert all(r["parecer"] for r in resultados)
+
+
+def test_esteira_com_fetch_em_lote(simulador):
+    esteira = criar_esteira_lote(max_bdc=2, max_llm=4, tamanho_lote_bdc=5)
+    resultados = list(analisar_lote_esteira(CPFS, esteira=esteira))
+    assert sorted(r["CPF"] for r in resultados) == CPFS
+    assert simulador.contadores["bdc"] < len(CPFS)
+
+
+def test_falha_em_uma_etapa_chega_a_saida_do_cpf(simulador, monkeypatch):
+    import lote
+
+    def interpretar(bdc_data):
+        raise ValueError("resposta ilegível")
+
+    monkeypatch.setattr(lote, "interpretar_dados_bdc", interpretar)
+    resultados = list(analisar_lote_esteira(CPFS[:3]))
+    assert sorted(resultados, key=lambda r: r["CPF"]) == [{"CPF": cpf, "erro": "resposta ilegível"} for cpf in CPFS[:3]]
+
+
+@pytest.mark.usefixtures("sem_threads_da_esteira")
+def test_consumidor_que_sai_cedo_nao_trava_a_esteira(simulador):
+    esteira = criar_esteira_lote(max_bdc=1, max_llm=1, max_risco=1)
+    resultados = analisar_lote_esteira([f"{i:011d}" for i in range(1, 200)], esteira=esteira)
+    next(resultados)
+    resultados.close()
+
+
+@pytest.mark.parametrize("max_bdc, max_llm", [(1, 1), (4, 8)])
+def test_lote_sem_esteira(simulador, max_bdc, max_llm):
+    resultados = list(analisar_lote(CPFS, max_bdc=max_bdc, max_llm=max_llm))
+    assert sorted(r["CPF"] for r in resultados) == CPFS
+    assert not [r for r in resultados if "erro" in r]
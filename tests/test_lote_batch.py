@@ -0,0 +1,50 @@
+import pytest
+
+from lote_batch import analisar_lote_batch, executar_batch
+
+CPFS = [f"{i:011d}" for i in range(1, 9)]
+
+
+@pytest.fixture
+def batch(simulador, monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_BATCH_DIRETORIO", str(tmp_path))
+    monkeypatch.setenv("OPENAI_BATCH_INTERVALO_S", "0.02")
+    monkeypatch.setattr(simulador, "latencia_batch", 0.05)
+    return simulador
+
+
+def ecoar_prompt(payload):
+    # Conclusão simulada que repete a mensagem do usuário: identifica a requisição respondida
+    return payload["messages"][-1]["content"], 1, 1
+
+
+def test_respostas_e_erros_voltam_pelo_custom_id(batch, monkeypatch):
+    monkeypatch.setattr(batch, "resposta_llm", ecoar_prompt)
+    monkeypatch.setattr(batch, "falhar_no_batch", lambda custom_id: custom_id in ("r-3", "r-7"))
+    monkeypatch.setenv("OPENAI_BATCH_MAX_REQUISICOES", "4")
+    requisicoes = {f"r-{i}": ([{"role": "user", "content": f"texto {i}"}], {"model": "gpt-teste"}) for i in range(10)}
+    resultados = executar_batch("teste", requisicoes)
+    assert batch.contadores["batches"] == 3
+    assert set(resultados) == set(requisicoes)
+    for custom_id, valor in resultados.items():
+        if custom_id in ("r-3", "r-7"):
+            assert isinstance(valor, RuntimeError) and "falha simulada" in str(valor)
+        else:
+            assert valor == f"texto {custom_id[2:]}"
+
+
+def test_duas_rodadas(batch):
+    resultados = list(analisar_lote_batch(CPFS))
+    assert [r["CPF"] for r in resultados] == CPFS
+    assert not [r for r in resultados if "erro" in r]
+    assert all(r["parecer"] and all(x["Resumo"] for x in r["resumos"]) for r in resultados)
+    # Uma rodada de resumos e uma de pareceres (dos CPFs que a pré-triagem manda ao LLM)
+    assert batch.contadores["batches"] == 2 and batch.contadores["llm"] == 0
+
+
+def test_falha_no_batch_chega_so_ao_cpf_afetado(batch, monkeypatch):
+    monkeypatch.setattr(batch, "falhar_no_batch", lambda custom_id: custom_id in ("resumo-0", "parecer-3"))
+    resultados = {r["CPF"]: r for r in analisar_lote_batch(CPFS)}
+    assert resultados[CPFS[0]]["erro"].startswith("Falha no resumo de decisão")
+    assert resultados[CPFS[3]]["erro"].startswith("Falha no parecer")
+    assert [cpf for cpf, r in resultados.items() if "erro" in r] == [CPFS[0], CPFS[3]]
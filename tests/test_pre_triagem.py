@@ -0,0 +1,43 @@
+import pytest
+
+from pre_triagem import ROTA_ALTO, ROTA_LLM, avaliar, sancao_ativa
+
+CONDENACAO = "JULGO PROCEDENTE A DENÚNCIA E CONDENO O RÉU ÀS PENAS DO ARTIGO 33 DA LEI 11.343/06, EM REGIME FECHADO"
+CUSTAS = "CONDENO A RÉ NAS CUSTAS, NOS TERMOS DO ART. 804"
+
+
+@pytest.mark.parametrize("status", ["Ativo", "ATIVA", "Vigente", "Mandado em aberto", "Pendente de cumprimento", "Foragido"])
+def test_status_ativos(status):
+    assert sancao_ativa(status)
+
+
+@pytest.mark.parametrize("status", ["Inativo", "INATIVA", "Desativado", "Revogada", "Cumprido", "NÃO VIGENTE", "Captivo", "", None])
+def test_status_inativos_ou_desconhecidos(status):
+    assert not sancao_ativa(status)
+
+
+def dados(processos, sancoes=0):
+    return {"Nome": "FULANO", "CPF": "1", "Processos": len(processos), "Sanções": sancoes, "PEP": False,
+            "Processos Criminais Detalhes": processos}
+
+
+def decisao(numero, conteudo):
+    return {"Número": numero, "TipoDecisao": "Condenação", "DecisionContent": conteudo}
+
+
+def test_sancao_inativa_nao_leva_a_rota_alta():
+    kyc = {"SanctionsHistory": [{"Source": "CNJ", "Details": {"Status": "Inativo"}}]}
+    assert avaliar(dados([]), [], kyc)["rota"] == ROTA_LLM
+
+
+def test_condenacoes_como_reu_levam_a_rota_alta():
+    processos = [{"Número": str(i), "É Réu": "Sim"} for i in range(3)]
+    decisoes = [decisao(str(i), CONDENACAO) for i in range(3)]
+    assert avaliar(dados(processos), decisoes, {})["rota"] == ROTA_ALTO
+
+
+def test_condenacoes_sem_ser_reu_ou_so_nas_custas_vao_para_o_llm():
+    processos = [{"Número": "1", "É Réu": "Não"}, {"Número": "2", "É Réu": "Sim"}]
+    decisoes = [decisao("1", CONDENACAO), decisao("1", CONDENACAO), decisao("2", CUSTAS), decisao("2", CUSTAS)]
+    avaliacao = avaliar(dados(processos, sancoes=1), decisoes, {})
+    assert avaliacao["rota"] == ROTA_LLM
@@ -0,0 +1,45 @@
+from prompt_risco import IndiceTextos, ajustar_payload_risco, deduplicar_decisoes
+
+INTEGRAL = (
+    "JULGO PROCEDENTE A PRETENSÃO PUNITIVA ESTATAL E CONDENO O RÉU NAS PENAS DO ARTIGO 33, CAPUT, "
+    "DA LEI 11.343/06, À PENA DE 5 ANOS DE RECLUSÃO EM REGIME INICIAL SEMIABERTO."
+)
+TRUNCADA = "JULGO PROCEDENTE A PRETENSAO PUNITIVA ESTATAL E CONDENO O REU NAS PENAS DO ARTIGO 33, CAPUT, DA LEI..."
+OUTRA = "ABSOLVO O ACUSADO COM FUNDAMENTO NO ARTIGO 386, INCISO VII, DO CÓDIGO DE PROCESSO PENAL, POR FALTA DE PROVAS."
+
+
+def decisao(numero, conteudo):
+    return {"Número": numero, "DecisionContent": conteudo}
+
+
+def test_versoes_da_mesma_decisao_viram_uma_com_o_texto_integral():
+    decisoes = [decisao("1", TRUNCADA), decisao("1", OUTRA), decisao("1", INTEGRAL)]
+    assert deduplicar_decisoes(decisoes) == [decisao("1", INTEGRAL), decisao("1", OUTRA)]
+
+
+def test_decisoes_de_processos_diferentes_ou_sem_numero_nao_sao_juntadas():
+    decisoes = [decisao("1", INTEGRAL), decisao("2", INTEGRAL), decisao(None, INTEGRAL), decisao(None, TRUNCADA)]
+    assert deduplicar_decisoes(decisoes) == decisoes
+
+
+def test_indice_textos_acha_o_primeiro_quase_identico():
+    indice = IndiceTextos()
+    indice.adicionar(OUTRA, "outra")
+    indice.adicionar(INTEGRAL, "integral")
+    assert indice.procurar(TRUNCADA) == "integral"
+    assert indice.procurar(OUTRA.lower()) == "outra"
+    assert indice.procurar("CONDENO O RÉU") is None
+
+
+def test_payload_dentro_do_orcamento_nao_e_alterado():
+    dados = {"Processos Criminais Detalhes": [{"Número": "1", "Decisão": INTEGRAL}, {"Número": "2", "Decisão": TRUNCADA}]}
+    novos, resumos, relatorio = ajustar_payload_risco(dados, [], orcamento_tokens=10_000)
+    assert novos == dados and relatorio["etapas"] == []
+
+
+def test_payload_acima_do_orcamento_referencia_textos_repetidos():
+    dados = {"Processos Criminais Detalhes": [{"Número": "1", "Decisão": INTEGRAL}, {"Número": "2", "Decisão": TRUNCADA}]}
+    novos, _, relatorio = ajustar_payload_risco(dados, [], orcamento_tokens=100)
+    assert relatorio["etapas"] == ["deduplicacao"] and relatorio["dentro_do_orcamento"]
+    assert novos["Processos Criminais Detalhes"][1]["Decisão"] == "[mesmo texto de Decisão do processo 1]"
+    assert dados["Processos Criminais Detalhes"][1]["Decisão"] == TRUNCADA
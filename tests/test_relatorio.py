@@ -0,0 +1,15 @@
+from relatorio import realcar_palavras_chave
+
+
+def test_realce_mantem_o_termo_encontrado():
+    texto = realcar_palavras_chave("Condenação a 4 anos de PRISÃO")
+    assert texto == (
+        "<span style='color:#e53935;font-weight:bold;'>Condenação</span> a 4 anos de "
+        "<span style='color:#e53935;font-weight:bold;'>PRISÃO</span>"
+    )
+    assert "\\1" not in texto
+
+
+def test_realce_de_texto_vazio():
+    assert realcar_palavras_chave(None) == ""
+    assert realcar_palavras_chave("sem termos") == "sem termos"
@@ -0,0 +1,58 @@
+import pytest
+
+from resultados import RepositorioResultados, linhas_triagem
+
+
+def kyc(*status):
+    return {"SanctionsHistory": [{"Source": "CNJ", "Details": {"Status": s}} for s in status]}
+
+
+def dados(cpf):
+    return {"Nome": "FULANO", "CPF": cpf, "Processos": 0, "Sanções": 1, "PEP": False, "Processos Criminais Detalhes": []}
+
+
+def test_sancao_inativa_nao_e_gravada_como_ativa():
+    linhas = linhas_triagem(dados("1"), [], kyc("Inativo", "Desativado", "Ativo"), [], "Risco: baixo")
+    assert [s["ativa"] for s in linhas["sancoes"]] == [False, False, True]
+
+
+def test_clientes_com_sancao_ativa_ignoram_sancoes_inativas(tmp_path):
+    pytest.importorskip("pyarrow")
+    repositorio = RepositorioResultados(str(tmp_path), dataset_bigquery="")
+    repositorio.registrar(dados("1"), [], kyc("Inativo"), [], "Risco: baixo")
+    repositorio.registrar(dados("2"), [], kyc("Vigente"), [], "Risco: alto")
+    repositorio.descarregar()
+    assert list(repositorio.clientes(sancao_ativa=True)["cpf"]) == ["2"]
+    assert list(repositorio.clientes(sancao_ativa=False)["cpf"]) == ["1"]
+
+
+def decisao(numero, data):
+    return {"Número": numero, "TipoDecisao": "Condenação", "DecisionContent": "CONDENO O RÉU", "DecisionDate": data}
+
+
+def test_datas_com_e_sem_fuso_na_mesma_coluna(tmp_path):
+    pytest.importorskip("pyarrow")
+    repositorio = RepositorioResultados(str(tmp_path), dataset_bigquery="")
+    decisoes = [decisao("1", "2021-03-04T00:00:00Z"), decisao("2", "2021/03/05"), decisao("3", "2021-03-06T10:00:00")]
+    repositorio.registrar(dados("1"), decisoes, {}, [], "Risco: alto")
+    repositorio.descarregar()
+    datas = repositorio.carregar("decisoes").sort_values("numero_processo")["data_decisao"]
+    assert [d.isoformat() for d in datas] == ["2021-03-04T00:00:00", "2021-03-05T00:00:00", "2021-03-06T10:00:00"]
+
+
+def test_falha_na_gravacao_mantem_as_triagens_no_buffer(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    repositorio = RepositorioResultados(str(tmp_path), tamanho_buffer=2, dataset_bigquery="")
+
+    def falhar(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    with monkeypatch.context() as m:
+        m.setattr(pq, "write_table", falhar)
+        repositorio.registrar(dados("1"), [], kyc("Ativo"), [], "Risco: alto")
+        repositorio.registrar(dados("2"), [], {}, [], "Risco: baixo")  # buffer cheio: a falha não chega aqui
+        with pytest.raises(OSError):
+            repositorio.descarregar()
+    repositorio.descarregar()
+    assert sorted(repositorio.carregar("triagens")["cpf"]) == ["1", "2"]
+    assert list(repositorio.carregar("sancoes")["cpf"]) == ["1"]
@@ -0,0 +1,88 @@
+import copy
+
+from retriagem import RepositorioSnapshots, diferencas
+
+
+def snapshot():
+    return {
+        "pessoa": {"Processos": 2, "Última Sanção": None, "Sanções": False, "PEP": False},
+        "processos": {
+            "0001": {"Situação": "ATIVO", "É Réu": "Sim"},
+            "0002": {"Situação": "ATIVO", "É Réu": "Não"},
+        },
+        "decisoes": {"a1": {"Processo": "0001", "DecisionDate": "2021-03-04", "TipoDecisao": "Condenação"}},
+        "sancoes": {},
+    }
+
+
+def test_snapshots_iguais_nao_tem_mudanca_material():
+    mudancas = diferencas(snapshot(), snapshot())
+    assert not mudancas["material"]
+    assert mudancas["pessoa"] == {}
+    assert mudancas["processos"] == {"novos": [], "alterados": [], "removidos": []}
+
+
+def test_diferencas_entre_processos_decisoes_e_sancoes():
+    anterior = snapshot()
+    atual = copy.deepcopy(anterior)
+    atual["processos"]["0002"]["Situação"] = "ARQUIVADO"
+    del atual["processos"]["0001"]
+    atual["processos"]["0003"] = {"Situação": "ATIVO", "É Réu": "Sim"}
+    atual["decisoes"]["b2"] = {"Processo": "0003", "DecisionDate": "2022-01-01", "TipoDecisao": "Condenação"}
+    atual["sancoes"]["s1"] = {"Fonte": "CNJ", "Status": "Ativo"}
+    mudancas = diferencas(anterior, atual)
+    assert mudancas["material"]
+    assert mudancas["processos"] == {"novos": ["0003"], "alterados": ["0002"], "removidos": ["0001"]}
+    assert mudancas["decisoes"] == {"novos": ["b2"], "alterados": [], "removidos": []}
+    assert mudancas["sancoes"]["novos"] == ["s1"]
+
+
+def test_mudanca_so_na_pessoa_e_material():
+    atual = snapshot()
+    atual["pessoa"]["PEP"] = True
+    mudancas = diferencas(snapshot(), atual)
+    assert mudancas["material"]
+    assert mudancas["pessoa"] == {"PEP": {"antes": False, "depois": True}}
+
+
+def test_repositorio_grava_substitui_e_remove(tmp_path):
+    repositorio = RepositorioSnapshots(str(tmp_path / "snapshots.sqlite3"))
+    assert repositorio.obter("1") is None
+    repositorio.gravar("1", "h1", snapshot(), {"parecer": "Risco: baixo"})
+    repositorio.gravar("1", "h2", snapshot(), {"parecer": "Risco: alto"})
+    repositorio.gravar("2", "h3", snapshot(), {"parecer": "Risco: baixo"})
+    salvo = repositorio.obter("1")
+    assert salvo["hash"] == "h2"
+    assert salvo["snapshot"] == snapshot()
+    assert salvo["resultado"] == {"parecer": "Risco: alto"}
+    assert repositorio.quantidade() == 2
+    assert repositorio.remover("1")
+    assert not repositorio.remover("1")
+    assert repositorio.obter("1") is None
+    assert repositorio.quantidade() == 1
+
+
+def test_retriagem_inalterada_registra_a_rota(simulador, monkeypatch, tmp_path):
+    import app
+    import retriagem
+
+    registradas = []
+    monkeypatch.setattr(retriagem, "registrar_triagem", lambda *args: registradas.append(args))
+    repositorio = RepositorioSnapshots(str(tmp_path / "snapshots.sqlite3"))
+    bdc_data = app.buscar_dados_bdc("40000000001")
+
+    _, _, parecer, info = retriagem.analisar_incremental("40000000001", bdc_data, repositorio)
+    assert info["status"] == "novo"
+    chamadas_llm = simulador.contadores["llm"]
+    _, _, parecer_repetido, info = retriagem.analisar_incremental("40000000001", bdc_data, repositorio)
+    assert info["status"] == "inalterado"
+    assert parecer_repetido == parecer
+    assert simulador.contadores["llm"] == chamadas_llm
+    assert registradas[1][5]["rota"] == registradas[0][5]["rota"] is not None
+
+    # Snapshot gravado antes de a avaliação ser guardada: a rota é recalculada
+    salvo = repositorio.obter("40000000001")
+    del salvo["resultado"]["avaliacao"]
+    repositorio.gravar("40000000001", salvo["hash"], salvo["snapshot"], salvo["resultado"])
+    retriagem.analisar_incremental("40000000001", bdc_data, repositorio)
+    assert registradas[2][5]["rota"] == registradas[0][5]["rota"]
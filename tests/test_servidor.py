@@ -0,0 +1,150 @@
+import json
+import queue
+import threading
+import time
+import urllib.request
+
+import pytest
+
+import servidor
+from servidor import CONCLUIDO, ERRO, ServicoTriagem, criar_servidor
+
+CPF = "12345678901"
+
+
+class PipelineFalsa:
+    """
+    Substitui app.pipeline_analise_cpf_stream: cada execução emite os eventos colocados em
+    sua fila (None encerra com "concluido"; uma exceção faz a pipeline falhar).
+    """
+    def __init__(self):
+        self.execucoes = queue.Queue()
+        self.chamadas = []
+
+    def __call__(self, cpf, forcar_atualizacao=False):
+        eventos = queue.Queue()
+        self.chamadas.append((cpf, forcar_atualizacao))
+        self.execucoes.put(eventos)
+        while True:
+            evento = eventos.get(timeout=5)
+            if evento is None:
+                break
+            if isinstance(evento, Exception):
+                raise evento
+            yield evento
+        yield ("concluido", ({"CPF": cpf}, [], f"parecer de {cpf}"))
+
+    def proxima(self) -> queue.Queue:
+        return self.execucoes.get(timeout=5)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    falsa = PipelineFalsa()
+    monkeypatch.setattr(servidor, "pipeline_analise_cpf_stream", falsa)
+    return falsa
+
+
+@pytest.fixture
+def servico():
+    servico = ServicoTriagem(max_analises=4, retencao=600)
+    yield servico
+    servico.encerrar()
+
+
+def test_pedidos_simultaneos_do_mesmo_cpf_sao_agrupados(pipeline, servico):
+    primeiro = servico.solicitar(CPF)
+    execucao = pipeline.proxima()
+    assert servico.solicitar(CPF) is primeiro
+    outro_cpf = servico.solicitar("98765432100")
+    assert outro_cpf is not primeiro
+    execucao.put(None)
+    pipeline.proxima().put(None)
+    assert primeiro.aguardar_fim(5) and primeiro.status == CONCLUIDO
+    assert primeiro.pedidos == 2 and servico.estado()["pedidos_agrupados"] == 1
+    assert primeiro.resultado["parecer"] == f"parecer de {CPF}"
+    assert pipeline.chamadas.count((CPF, False)) == 1
+    # Terminado, o próximo pedido do CPF é uma nova execução
+    assert servico.solicitar(CPF) is not primeiro
+
+
+def test_pedido_forcado_so_se_junta_a_execucao_forcada(pipeline, servico):
+    normal = servico.solicitar(CPF)
+    execucao_normal = pipeline.proxima()
+    forcado = servico.solicitar(CPF, forcar_atualizacao=True)
+    execucao_forcada = pipeline.proxima()
+    assert forcado is not normal
+    # Com uma execução forçada em andamento, pedidos normais e forçados se juntam a ela
+    assert servico.solicitar(CPF) is forcado
+    assert servico.solicitar(CPF, forcar_atualizacao=True) is forcado
+    assert pipeline.chamadas == [(CPF, False), (CPF, True)]
+    execucao_normal.put(None)
+    execucao_forcada.put(None)
+    assert normal.aguardar_fim(5) and forcado.aguardar_fim(5)
+    assert (normal.pedidos, forcado.pedidos) == (1, 3)
+
+
+def test_long_polling_devolve_so_eventos_novos(pipeline, servico):
+    trabalho = servico.solicitar(CPF)
+    execucao = pipeline.proxima()
+    assert not trabalho.aguardar(desde=0, espera=0.05)  # nada novo até o prazo
+
+    threading.Timer(0.05, execucao.put, args=(("dados", {"Nome": "FULANO"}),)).start()
+    assert trabalho.aguardar(desde=0, espera=5)
+    estado = trabalho.como_dict()
+    assert (estado["eventos"], estado["proximo"]) == ([("dados", {"Nome": "FULANO"})], 1)
+
+    execucao.put(("resumo", {"Indice": 0}))
+    execucao.put(None)
+    assert trabalho.aguardar_fim(5)
+    estado = trabalho.como_dict(desde=1)
+    assert [tipo for tipo, _ in estado["eventos"]] == ["resumo", "concluido"]
+    assert estado["proximo"] == 3 and estado["status"] == CONCLUIDO
+    # Trabalho terminado: aguardar retorna na hora, mesmo sem eventos novos
+    assert trabalho.aguardar(desde=3, espera=5)
+
+
+def test_erro_na_pipeline_termina_o_trabalho(pipeline, servico):
+    trabalho = servico.solicitar(CPF)
+    pipeline.proxima().put(RuntimeError("BigDataCorp indisponível"))
+    assert trabalho.aguardar_fim(5)
+    assert (trabalho.status, trabalho.erro) == (ERRO, "BigDataCorp indisponível")
+    assert trabalho.como_dict()["resultado"] is None
+
+
+def test_api_http(pipeline, servico):
+    http = criar_servidor(servico, porta=0)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{http.server_port}"
+
+    def pedir(caminho, corpo=None):
+        dados = json.dumps(corpo).encode("utf-8") if corpo is not None else None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(base + caminho, data=dados), timeout=10) as r:
+                return r.status, json.loads(r.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    try:
+        assert pedir("/analises", {"cpf": "123"})[0] == 400
+        status, trabalho = pedir("/analises", {"cpf": "123.456.789-01", "assincrono": True})
+        assert status == 202 and trabalho["cpf"] == CPF
+        execucao = pipeline.proxima()
+        threading.Timer(0.05, execucao.put, args=(("dados", {"Nome": "FULANO"}),)).start()
+        status, estado = pedir(f"/analises/{trabalho['id']}?desde=0&espera=5")
+        assert status == 200 and estado["eventos"] == [["dados", {"Nome": "FULANO"}]] and estado["proximo"] == 1
+        # Pedido síncrono do mesmo CPF: agrupado, responde com o resultado quando terminar
+        respostas = queue.Queue()
+        threading.Thread(target=lambda: respostas.put(pedir("/analises", {"cpf": CPF})), daemon=True).start()
+        prazo = time.monotonic() + 5
+        while servico.obter(trabalho["id"]).pedidos < 2:
+            assert time.monotonic() < prazo
+            time.sleep(0.005)
+        execucao.put(None)
+        status, resultado = respostas.get(timeout=5)
+        assert status == 200 and resultado["parecer"] == f"parecer de {CPF}"
+        assert pedir("/saude")[1]["pedidos_agrupados"] == 1
+        assert pedir("/analises/inexistente")[0] == 404
+    finally:
+        http.shutdown()
+        http.server_close()